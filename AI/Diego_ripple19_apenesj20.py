@@ -2,6 +2,8 @@ import random
 import math
 import sys
 import time
+import os
+import unittest
 sys.path.append("..")  # so other modules can be found in parent dir
 from Player import *
 from Constants import *
@@ -10,7 +12,18 @@ from Ant import UNIT_STATS
 from Move import Move
 from GameState import *
 from AIPlayerUtils import *
-from random import shuffle
+from MinimaxAgent import MinimaxAgent
+from NetworkWeights import readWeights, writeWeights
+try:
+    import numpy
+except ImportError:
+    # leaves are evaluated one at a time without numpy
+    numpy = None
+
+# leaves evaluated by the network at once (see leafBatchSize)
+LEAF_BATCH_SIZE = 8
+# the learned network weights used when FINAL is 1
+WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Diego_weights.bin")
 
 
 ##
@@ -19,10 +32,12 @@ from random import shuffle
 # deciding a valid move based on a given game state. This class has methods that
 # will be implemented by students in Dr. Nuxoll's AI course. 
 #
+# The search itself is shared with the Max agent (see MinimaxAgent.py).
+#
 # Variables:
 #   playerId - The id of the player.
 ##
-class AIPlayer(Player):
+class AIPlayer(MinimaxAgent):
     INPUTS = 10
     NODES = 25
     FINAL = 0  # 0: Set random weights and use back propagation. 1: Use final weights and exclude back propagation
@@ -44,11 +59,6 @@ class AIPlayer(Player):
     ##
     def __init__(self, inputPlayerId):
         super(AIPlayer,self).__init__(inputPlayerId, "Diego")
-        self.depth_limit = 3
-        self.me = 0
-        self.move = None
-        self.nextMove = None
-        self.prunedMoves = 0
         self.alpha = 0.7
         self.currentNeuralOutput = 0
         self.currentEvalOutput = 0
@@ -57,6 +67,11 @@ class AIPlayer(Player):
         self.outputBiasWeight = 0
         self.inputWeights = []  # 2D array
         self.outputWeights = []  # 1D array
+        # the weights as numpy arrays (see networkArrays), None when out of date
+        self.weightArrays = None
+        # the file the weights were loaded from (see loadWeights) and its time
+        self.weightsFile = None
+        self.weightsTime = None
         self.hiddenValues = [0] * self.NODES
         self.inputValues = [0] * self.INPUTS
         self.gamesPlayed = 0
@@ -126,41 +141,6 @@ class AIPlayer(Player):
         else:
             return [(0, 0)]
 
-    ##
-    # getMove
-    # Description: Gets the next move from the Player.
-    #
-    # Parameters:
-    #   currentState - The state of the current game waiting for the player's move (GameState)
-    #
-    # Return: The Move to be made
-    ##
-    def getMove(self, currentState):
-        self.me = currentState.whoseTurn
-        # rotate to the next move
-        self.move = self.nextMove
-        # set number of pruned nodes to zero
-        self.prunedMoves = 0
-        # if the list of moves is empty or move holds an enemy move, do minimax()
-        if self.move is None or self.move["minmax"] == -1:
-            root = {"move": None, "state": currentState, "value": 0, "min": -1000, "max": 1000, "parent": None, "depth": 0,
-                    "minmax": 1, "next-move": None}
-            # root has no move associated with it so automatically update self.move to minimax["next-move"]
-            self.move = self.minimax(root, 0)["next-move"]
-            # if minimax returns no moves, do an end move
-            if self.move is None:
-                self.nextMove = None  # done so the code at the start of getMove work
-                return Move(END, None, None)
-            else:
-                self.nextMove = self.move["next-move"]
-        else:
-            # so move is not None AND move is our move
-            self.nextMove = self.move["next-move"]
-        # if you want the number of pruned moves to be printed, use the two lines below
-        # if self.prunedMoves != 0:
-        #    print("Pruned ", self.prunedMoves, " moves")
-        return self.move["move"]
-
     ##
     # getAttack
     # Description: Gets the attack to be made from the Player
@@ -174,6 +154,23 @@ class AIPlayer(Player):
         # Attack a random enemy.
         return enemyLocations[random.randint(0, len(enemyLocations) - 1)]
 
+    ##
+    # getSearchSettings
+    #
+    # what the worker processes of a parallel search need to search like this
+    # agent (see ParallelSearch.py); while the network is still learning the
+    # search has to stay in this process
+    #
+    def getSearchSettings(self):
+        if self.FINAL == 0:
+            return None
+        settings = super(AIPlayer,self).getSearchSettings()
+        settings.update({"FINAL": self.FINAL,
+                         "inputWeights": list(self.inputWeights), "inputBiasWeights": list(self.inputBiasWeights),
+                         "outputWeights": list(self.outputWeights), "outputBiasWeight": self.outputBiasWeight,
+                         "weightArrays": None})
+        return settings
+
     ##
     # registerWin
     #
@@ -182,8 +179,7 @@ class AIPlayer(Player):
     #
     def registerWin(self, hasWon):
         # reset these variables so it does not interfere with the next game
-        self.move = None
-        self.nextMove = None
+        self.resetSearch()
         # for neural network use
         self.gamesPlayed += 1
         # print average error
@@ -197,7 +193,9 @@ class AIPlayer(Player):
             self.printWeights()
             if self.gamesPlayed > 9:
                 self.FINAL = 1
-        pass
+        else:
+            # pick up weights trained since the game started
+            self.reloadWeights()
 
     ##
     # evaluateState
@@ -284,157 +282,6 @@ class AIPlayer(Player):
         value = (ourPoints - enemyPoints) / (ourPoints + enemyPoints) 
         return value
 
-    ##
-    # expandNode
-    #
-    # This function takes a node (dictionary) as input finds all the legal moves from that state
-    # and creates a list of new node with states resulting from each of those nodes and returns that list
-    #
-    def expandNode(self, node):
-        moves = listAllLegalMoves(node["state"])
-        states = []
-        for move in moves:
-            newNode = {"move":move}
-            newNode["state"] = self.getNextStateAdversarial(node["state"], newNode["move"])
-            newNode["value"] = 0
-            newNode["min"] = node["min"]
-            newNode["max"] = node["max"]
-            newNode["parent"] = node
-            newNode["depth"] = node["depth"]+1
-            if move.moveType == END:
-                newNode["minmax"] = -1 * node["minmax"]
-            else:
-                newNode["minmax"] = node["minmax"]
-            newNode["next-move"] = None
-            states.append(newNode)
-        return states
-
-    ##
-    # evalListNodes
-    #
-    # This function takes a list of nodes and takes the best node dependent on 
-    # the move being a min or max move. If a node has a "minmax" of 1 it is a max move,
-    # if a node has a "minmax" of -1 it is a min move.
-    #
-    def evalListNodes(self, nodes):
-        if nodes and len(nodes) > 1:
-            randomNode = nodes[0]
-            if randomNode["minmax"] == 1: 
-                bestNodeValue = -1
-                for node in nodes:
-                    if node["value"] >= bestNodeValue:
-                        bestNodeValue = node["value"]
-            elif randomNode["minmax"] == -1: 
-                bestNodeValue = 1
-                for node in nodes:
-                    if node["value"] <= bestNodeValue:
-                        bestNodeValue = node["value"]
-            return bestNodeValue
-        elif nodes:
-            return nodes[0]["value"]
-        else:
-            return -1
-
-
-    ##
-    # minimax
-    #
-    # This function preforms minimax search
-    # It takes a node and the depth
-    # The nodes are expanded until the depth limit is reached
-    # Then the values of the nodes are propagated up based on being the best min or max move
-    # The method returns a node that contains a sequence of moves (when depth == 0)
-    # This assumes both players are rational
-    # Alpha-beta pruning is used to make this process faster by pruning nodes that for certain
-    # do not hold better outcomes
-    #
-    def minimax(self, node, depth):
-        newNodes = self.expandNode(node)
-        shuffle(newNodes)
-        # create pruning counter to see how many nodes get pruned
-        counter = 0
-        # it is depth + 1 since we just expanded the node and are
-        # now evaluating nodes at depth + 1
-        if depth+1 < self.depth_limit:
-            # if the next set of nodes are inside the depth limit,
-            for n in newNodes:
-                # !!! update neural network heruistic !!!
-                # increment pruning counter
-                counter += 1
-                # update the bounds of each newNode since a previous newNode could have updated node's bounds
-                n["min"] = node["min"]
-                n["max"] = node["max"]
-                # minimax updates the min and max bounds of the parent node, not the children
-                if node["minmax"] == 1:                   
-                    temp = node["min"]  # used so we don't do minimax() twice
-                    node["min"] = max(self.minimax(n, depth+1), node["min"])
-                    # if the value was updated, update the next-move value to n
-                    if temp != node["min"]:
-                        node["next-move"] = n
-                    # if the bounds cross each other, prune remaining nodes
-                    # if min bound equals 1, just return it
-                    if node["min"] > node["max"] or node["min"] == 1: 
-                        # updated global variable
-                        self.prunedMoves += len(newNodes) - counter
-                        if depth == 0:
-                            return node
-                        else: 
-                            return node["min"]
-                else: # here the same happens for "minmax" == -1
-                    temp = node["max"]
-                    node["max"] = min(self.minimax(n, depth+1), node["max"])
-                    if temp != node["max"]:
-                        node["next-move"] = n
-                    if node["min"] > node["max"]:
-                        self.prunedMoves += len(newNodes) - counter
-                        if depth == 0:
-                            return node
-                        else:
-                            return node["max"]
-        else:
-            # else find the best value for min/max
-            for n in newNodes:
-                # !!! update neural network heuristic !!!
-                # increment pruning counter
-                counter += 1
-                if node["minmax"] == 1:
-                    temp = node["min"]
-                    if self.FINAL == 0:
-                        self.backPropagate(n["state"])
-                        node["min"] = max(self.evaluateState(n["state"]), node["min"])
-                    else:
-                        node["min"] = max(self.getOutputValue(n["state"]), node["min"])
-                    # if the bounds cross each other, prune remaining nodes
-                    if node["min"] > node["max"]:
-                        self.prunedMoves += len(newNodes) - counter
-                        return node["min"]
-                    # if the value was updated, update the next-move value to n
-                    if temp != node["min"]:
-                        node["next-move"] = n
-                    if node["min"] == 1:
-                        return node["min"]
-                else: # here the same happens for "minmax" == -1
-                    temp = node["max"]
-                    if self.FINAL == 0:
-                        self.backPropagate(n["state"])
-                        node["max"] = min(self.evaluateState(n["state"]), node["max"])
-                    else:
-                        node["max"] = min(self.getOutputValue(n["state"]), node["max"])
-                    if node["min"] > node["max"]:
-                        self.prunedMoves += len(newNodes) - counter
-                        return node["max"]
-                    # if the value was updated, update the next-move value to n
-                    if temp != node["max"]:
-                        node["next-move"] = n
-        # if we are not at depth 0 we return a value, otherwise we return a node
-        if depth > 0:
-            if node["minmax"] == 1:
-                return node["min"]
-            else:
-                return node["max"]
-        else:
-            # when we've finished minimax, return the root node with all the updated values
-            return node
 
     ##
     # getStateInputs
@@ -544,7 +391,8 @@ class AIPlayer(Player):
     ##
 
     def initializeNetwork(self):
-        random.seed(time.clock())
+        self.weightArrays = None
+        self.weightsFile = None
         # reset weights (if necessary)
         self.inputWeights = [0] * (self.NODES * self.INPUTS)
         self.outputWeights = [0] * self.NODES
@@ -560,88 +408,54 @@ class AIPlayer(Player):
     ##
     # initializeFinalNetwork()
     # FOR NEURAL NETWORKS
-    # Sets initial weights values learned from neural network testing
+    # Sets the weights to the values learned from neural network testing,
+    # kept in WEIGHTS_FILE (see NetworkWeights.py)
     ##
 
     def initializeFinalNetwork(self):
-        self.inputWeights = [-0.2781678553056542, 0.29665497642667465, 0.42787119011983243, 0.8270532309127439,
-                             0.6254641885232817, -0.5166575827637829, 0.7425280317029119, -0.11299387439879607,
-                             0.7931291182081868, -0.17764701164268212, -0.5327301102214645, 0.19487191880186033,
-                             -1.0740971250539095, 0.6051578467782516, 0.6981160590173097, 0.7962289863591607,
-                             0.7167200915156313, -0.03569936849848813, -0.571721544777044, -0.5323764519711219,
-                             -0.12391073852356785, 0.7145884565338465, -0.7435615069017898, 0.026932894297235787,
-                             0.22750281358500338, -0.5961221393708238, -1.006233929065173, -0.26137057816005105,
-                             -0.490498618588832, -0.5369042684280148, -0.23153458977614721, -0.3993304882818629,
-                             -1.3088779943320354, 0.21016461410183798, 0.6370623112044109, -0.534060456791071,
-                             0.1811224251756425, -0.7790452334948254, 0.08360233258734873, -0.5816613782566042,
-                             -0.365580056603378, -0.6166779538061542, 1.8905996690605837, -0.19120379810798335,
-                             0.17547476658368855, 0.5397733860088795, -0.21661472753256, 0.016027261366507714,
-                             -0.19029479480670974, -0.06961408960731387, 0.5051210373992279, 0.20015265200080173,
-                             -0.6575537890911226, -0.6652682525862432, -0.11839857614762953, -0.553276035154666,
-                             0.4401451057408008, -0.792535103113869, 0.6099945301189794, -0.012089301926623865,
-                             0.31601921792015425, 0.6157349047181129, -1.8565248921186408, 0.9445405691815555,
-                             -0.35331957720529295, 0.0700474549897477, -0.2289032770905645, 0.21534535909582875,
-                             0.197065565411537, -0.35466327923164076, -0.7228058469573685, -0.20291375191554403,
-                             1.1200601482317374, -0.3738689871898857, -0.7028100752288401, -0.5993318233907579,
-                             -0.2505262098504256, 0.8819849164409892, 0.21440893125387855, 0.7707864316023809,
-                             -0.6312491460311573, 0.08682192283758518, 1.5362460273515544, -0.7212755763473963,
-                             -0.5451122110085475, 0.1305865849049965, 0.05106415668713476, -0.128530933576501,
-                             -1.8787394204799555, -0.9817378916077305, -0.5278624350047482, -0.46343092423960497,
-                             -1.5442672661207482, -0.2027204839988108, -0.4117983283951422, 0.30811331387008734,
-                             -0.12939630479914274, 0.44019923773104175, 0.4535601419381985, 1.0426909253869667,
-                             -0.41939425617315496, -0.8863841840747053, 0.15884647363937968, -0.01267942137560592,
-                             0.019681044562838826, -0.7362636691956822, -0.5698375754218087, -0.9325561355455106,
-                             -0.2734388763565631, -0.7265885871527975, 0.35336956712506823, 0.28627111239849523,
-                             0.7072523657294083, -0.27755222856077827, -0.6693995832515731, 0.3482938703251111,
-                             0.06858491343647595, -0.7079507367597698, -0.14681876942765126, 0.1460275422090924,
-                             -0.03201895220498965, -0.266892937073763, -1.6515134316714348, -0.5469401984164409,
-                             0.5908528462335083, 0.46259997538285186, -0.5905130421868673, -0.690294167076429,
-                             0.7065093513050781, -0.3148017372733469, -0.5252331562489756, -0.7951657703663447,
-                             -0.22744407528417004, 1.2084978883030935, -0.9261519881136577, -0.5311675058944989,
-                             -0.2826717364234586, -0.11953477730754478, -0.4022420848657305, -0.7269178411437218,
-                             -0.7317865048688322, -0.03465499686537327, 0.43490227830696027, -0.1141362114136772,
-                             0.1004945950074199, -0.41037925943588316, -0.3940107751781822, 0.24374377702070224,
-                             -0.33727414732834954, -0.40931540012614837, 0.5782119992308317, -0.2691054640768666,
-                             0.679835677991694, -0.4618841057048102, -0.34575513209936926, 0.4624579311227241,
-                             0.3763094354457867, -0.41030085483843814, -1.1010250974972484, -0.9465901551922665,
-                             1.0251559350307022, 0.8211071891841237, -0.34325362484138516, -0.2637436428180884,
-                             -0.3047374327426449, 0.36741132304349916, 0.6103744657945552, 0.06381489007783533,
-                             0.8827383730281587, 0.7238153963788674, 0.784970461740233, -0.9188526096741978,
-                             1.4211657541538005, -1.1800687606896458, -0.4184815377462033, 0.4060125554222894,
-                             -0.3927500389864438, -0.18736515291517802, -0.24249127891196207, -0.14398055670566778,
-                             -0.6543070672611677, 0.891637110066642, 0.198511465819935, 0.5849356015072301,
-                             0.47100610839513346, -0.6909227823858162, 0.5892939829444852, -0.17211787472261053,
-                             -0.4161167920297748, 0.621194731930679, 0.6996550871288816, -0.8747843846537493,
-                             0.9259161309714766, 0.6024433268171151, -0.18357764771341403, -0.5863399425873853,
-                             -0.7256970454958355, 0.6936464411196341, 0.7625975675580963, -0.45546977114031995,
-                             -0.5575406368049476, -0.17488820288574103, 0.022294087793096055, 0.32150856813716305,
-                             0.3125022527528067, 0.6168390351975322, 0.8737652316979759, -0.43080655138283924,
-                             1.199190344188106, 0.11381110531810446, 0.2678106646133407, 0.2775598022174424,
-                             1.1100216617110603, 0.8544170616837538, -0.5485815769435624, -0.02314166433365337,
-                             -0.04854810254816493, 0.3456233436004858, 0.7356548013011063, 0.7648576458395717,
-                             -0.702746728691288, -0.5663421908944241, 1.0554493655758397, 0.04315624248028066,
-                             -0.7954435643003797, -0.4978457925256438, -0.036559714878072476, -0.6922095835939972,
-                             0.4877739123745504, -0.5746067831721068, -0.999949676477011, 0.7525048183824024,
-                             2.082602340557908, -0.04834652380880529, 0.3579214023606864, -0.5912929486001784,
-                             -0.15362329474660427, 0.6056744356233638, 0.6725946777692976, 0.20532572928779996,
-                             0.4098706047556628, 0.1373136512979228, 0.29225931677563216, 0.35881814765026504,
-                             -0.3924398583578563, 0.0032370507983459965, 0.8239435006338915, -0.05645708025891507,
-                             -0.8818176307263844, 0.4888989021417712]
-        self.outputWeights = [0.006390390223166474, 0.4668115313258867, 0.3034559305352658, 1.4302135344186073,
-                              -1.9305201861107868, 1.0084365051418716, 2.007596645171674, -1.2889493986322627,
-                              -1.9462459836736474, 1.5455690821369514, -0.8392348709612163, -0.8637195943371151,
-                              2.0605009506829473, 1.2458338161703808, -0.5303781998981747, -0.32163423873653324,
-                              0.8192162922110997, -1.532750853410977, -0.2362735420212691, -0.3968212590994018,
-                              -0.48917449853309947, -1.3057151861364635, -0.6206218157086754, -2.198031274058388,
-                              -0.05960103381477103]
-        self.inputBiasWeights = [1.0129722842338729, -0.02450900417919737, 0.4071666531886748, 0.934964628484609,
-                                 -0.6264231745909831, 0.5570752239093206, 0.5625550452675864, -0.7996692754254171,
-                                 -0.8484259510443861, -0.25329472710729967, -0.8743218141783536, 0.8518390535874437,
-                                 0.620544457726544, -0.912541948841004, 0.48243219043678837, -0.08286593090556285,
-                                 0.09046763907154218, 0.3132660761677234, 0.8490885421148814, -0.25235191863845285,
-                                 -0.5322048248728336, -0.5986447436643908, -0.24470227771032416, -0.7137035378557804,
-                                 -0.3818914417583937]
-        self.outputBiasWeight = -0.6695046131047603
+        self.loadWeights(WEIGHTS_FILE)
+
+    ##
+    # loadWeights()
+    # FOR NEURAL NETWORKS
+    # Sets the weights to the ones in a file written by
+    # NetworkWeights.writeWeights (e.g., by NetworkTrainer.py). The file is
+    # memory-mapped and its time is remembered so reloadWeights() can tell
+    # when it changes. The weights are read-only, so backPropagate() can only
+    # be used after initializeNetwork().
+    ##
+
+    def loadWeights(self, path):
+        self.weightArrays = None
+        weights = readWeights(path)
+        self.inputWeights = weights["inputWeights"]
+        self.inputBiasWeights = weights["inputBiasWeights"]
+        self.outputWeights = weights["outputWeights"]
+        self.outputBiasWeight = weights["outputBiasWeight"]
+        self.weightsFile = path
+        self.weightsTime = os.path.getmtime(path)
+
+    ##
+    # reloadWeights()
+    # FOR NEURAL NETWORKS
+    # Loads the weights again if they came from a file that has changed since
+    # (called between games, so new weights are picked up without restarting)
+    ##
+
+    def reloadWeights(self):
+        if self.weightsFile is not None and os.path.exists(self.weightsFile) and \
+                os.path.getmtime(self.weightsFile) != self.weightsTime:
+            self.loadWeights(self.weightsFile)
+
+    ##
+    # saveWeights()
+    # FOR NEURAL NETWORKS
+    # Writes the current weights to a file that loadWeights() can read
+    ##
+
+    def saveWeights(self, path):
+        writeWeights(path, {"inputWeights": self.inputWeights, "inputBiasWeights": self.inputBiasWeights,
+                            "outputWeights": self.outputWeights, "outputBiasWeight": self.outputBiasWeight})
 
     ##
     # getOutputValue()
@@ -674,6 +488,39 @@ class AIPlayer(Player):
         output = 1/(1+math.pow(math.e, -sum))
         return output
 
+    ##
+    # getOutputValues()
+    # The output of the neural network for each of a list of GameStates.
+    # With numpy, the inputs of all the states are stacked into one matrix so
+    # the whole batch takes a single pass through the network (as
+    # NetworkTrainer.forward does); without it each state goes through
+    # getOutputValue(). Both give the same values up to rounding.
+    ##
+
+    def getOutputValues(self, states):
+        if numpy is None:
+            return [self.getOutputValue(state) for state in states]
+        inputWeights, inputBiases, outputWeights, outputBias = self.networkArrays()
+        inputs = numpy.array([self.getStateInputs(state) for state in states], dtype=float)
+        # one row per state, one column per hidden node
+        hidden = 1/(1+numpy.exp(-(inputs @ inputWeights.T + inputBiases)))
+        return (1/(1+numpy.exp(-(hidden @ outputWeights + outputBias)))).tolist()
+
+    ##
+    # networkArrays()
+    # Returns the weights as numpy arrays: the NODES x INPUTS input weights,
+    # the hidden node biases, the output weights and the output bias.
+    # They are rebuilt only after the weights change.
+    ##
+
+    def networkArrays(self):
+        if self.weightArrays is None:
+            self.weightArrays = (numpy.array(self.inputWeights, dtype=float).reshape(self.NODES, self.INPUTS),
+                                 numpy.array(self.inputBiasWeights, dtype=float),
+                                 numpy.array(self.outputWeights, dtype=float),
+                                 float(self.outputBiasWeight))
+        return self.weightArrays
+
     ##
     # backPropagate()
     # This function updates every weight using the method below
@@ -717,6 +564,7 @@ class AIPlayer(Player):
 
         # update output node bias weight
         self.outputBiasWeight = self.outputBiasWeight + self.alpha*delta
+        self.weightArrays = None
 
 
 
@@ -744,130 +592,69 @@ class AIPlayer(Player):
         print(self.outputBiasWeight)
 
     ##
-    # getNextState
+    # usesTranspositions
     #
-    # Author:  Jordan Goldey (Class of 2017)
+    # while the network is still learning every leaf is used to train it, so
+    # no values are reused
     #
-    # Description: Creates a copy of the given state and modifies the inventories in
-    # it to reflect what they would look like after a given move.  For efficiency,
-    # only the inventories are modified and the board is set to None.  The original
-    # (given) state is not modified. It NOW correctly reflects how to food is picked
-    # up in the game
+    def usesTranspositions(self):
+        return self.FINAL != 0
+
+    ##
+    # leafBatchSize
     #
-    # CAVEAT: To facilitate longer term analysis without having to take enemy moves
-    # into consideration, MOVE_ANT commands do not cause the hasMoved property of
-    # the ant to change to True.  Furthermore the END move type is ignored.
+    # the network evaluates the leaves LEAF_BATCH_SIZE at a time, so few
+    # leaves past a cutoff are evaluated
     #
-    # Parameters:
-    #   currentState - A clone of the current state (GameState)
-    #   move - The move that the agent would take (Move)
+    def leafBatchSize(self):
+        return LEAF_BATCH_SIZE if self.FINAL != 0 else 1
+
+    ##
+    # evaluateNodes
     #
-    # Return: A clone of what the state would look like if the move was made
-    ##
-    def getNextState(self, currentState, move):
-        # variables I will need
-        myGameState = currentState.fastclone()
-        myInv = getCurrPlayerInventory(myGameState)
-        me = myGameState.whoseTurn
-        myAnts = myInv.ants
-        myTunnels = myInv.getTunnels()
-        myAntHill = myInv.getAnthill()
-
-        # If enemy ant is on my anthill or tunnel update capture health
-        ant = getAntAt(myGameState, myAntHill.coords)
-        if ant is not None:
-            if ant.player != me:
-                myAntHill.captureHealth -= 1
-
-        # If an ant is built update list of ants
-        antTypes = [WORKER, DRONE, SOLDIER, R_SOLDIER]
-        if move.moveType == BUILD:
-            if move.buildType in antTypes:
-                ant = Ant(myInv.getAnthill().coords, move.buildType, me)
-                myInv.ants.append(ant)
-                # Update food count depending on ant built
-                if move.buildType == WORKER:
-                    myInv.foodCount -= 1
-                elif move.buildType == DRONE or move.buildType == R_SOLDIER:
-                    myInv.foodCount -= 2
-                elif move.buildType == SOLDIER:
-                    myInv.foodCount -= 3
-            # ants are no longer allowed to build tunnels, so this is an error
-            elif move.buildType == TUNNEL:
-                print("Attempted tunnel build in getNextState()")
-                return currentState
-
-        # If an ant is moved update their coordinates and has moved
-        elif move.moveType == MOVE_ANT:
-            newCoord = move.coordList[-1]
-            startingCoord = move.coordList[0]
-            for ant in myAnts:
-                if ant.coords == startingCoord:
-                    ant.coords = newCoord
-                    ant.hasMoved = False
-                    # If an ant is carrying food and ends on the anthill or tunnel drop the food
-                    # THIS CODE IS NOT WHAT GAME.PY DOES
-                    # if ant.carrying and ant.coords == myInv.getAnthill().coords:
-                    #     myInv.foodCount += 1
-                    #     ant.carrying = False
-                    # for tunnels in myTunnels:
-                    #     if ant.carrying and (ant.coords == tunnels.coords):
-                    #         myInv.foodCount += 1
-                    #         ant.carrying = False
-                    # # If an ant doesn't have food and ends on the food grab food
-                    # if not ant.carrying and ant.type == WORKER:
-                    #     foods = getConstrList(myGameState, 2, [FOOD])
-                    #     for food in foods:
-                    #         if food.coords == ant.coords:
-                    #             ant.carrying = True
-                    # If my ant is close to an enemy ant attack it
-                    attackable = listAttackable(ant.coords, UNIT_STATS[ant.type][RANGE])
-                    for coord in attackable:
-                        foundAnt = getAntAt(myGameState, coord)
-                        if foundAnt is not None:  # If ant is adjacent my ant
-                            if foundAnt.player != me:  # if the ant is not me
-                                foundAnt.health = foundAnt.health - UNIT_STATS[ant.type][ATTACK]  # attack
-                                # If an enemy is attacked and looses all its health remove it from the other players
-                                # inventory
-                                if foundAnt.health <= 0:
-                                    myGameState.inventories[1 - me].ants.remove(foundAnt)
-                                # If attacked an ant already don't attack any more
-                                break
-        return myGameState
-
-    ##
-    # getNextStateAdversarial
+    # while the network is still learning it is trained on each leaf, which
+    # is valued with evaluateState; after that the leaves are valued by the
+    # network (see MinimaxAgent.evaluateNodes and evaluateStates)
     #
-    # Description: This is the same as getNextState (above) except that it properly
-    # updates the hasMoved property on ants and the END move is processed correctly.
-    # It has been updated to reflect this description.
+    # Return: the values, in the order of the nodes
     #
-    # Parameters:
-    #   currentState - A clone of the current state (GameState)
-    #   move - The move that the agent would take (Move)
+    def evaluateNodes(self, nodes):
+        if self.FINAL != 0:
+            return super(AIPlayer,self).evaluateNodes(nodes)
+        values = []
+        for n in nodes:
+            self.backPropagate(n.state)
+            values.append(self.evaluateState(n.state))
+        return values
+
+    ##
+    # evaluateStates
     #
-    # Return: A clone of what the state would look like if the move was made
-    ##
-    def getNextStateAdversarial(self, currentState, move):
-        # variables I will need
-        nextState = self.getNextState(currentState, move)
-        myInv = getCurrPlayerInventory(nextState)
-        myAnts = myInv.ants
-
-        # If an ant is moved update their coordinates and has moved
-        if move.moveType == MOVE_ANT:
-            # startingCoord = move.coordList[0]
-            startingCoord = move.coordList[len(move.coordList) - 1]
-            for ant in myAnts:
-                if ant.coords == startingCoord:
-                    ant.hasMoved = True
-        elif move.moveType == END:
-            for ant in myAnts:
-                ant.hasMoved = False
-            nextState.whoseTurn = 1 - currentState.whoseTurn
-        ## NEW STUFF
-        elif move.moveType == BUILD:
-            for ant in myAnts:
-                if ant.coords == myInv.getAnthill().coords:
-                    ant.hasMoved = True
-        return nextState
+    # sends a batch of states through the network (see getOutputValues)
+    #
+    def evaluateStates(self, states):
+        return self.getOutputValues(states)
+
+
+##
+# test_network
+#
+# python -m unittest Diego_ripple19_apenesj20 (from the AI folder)
+#
+@unittest.skipIf(numpy is None, "getOutputValues needs numpy to batch the states")
+class test_network(unittest.TestCase):
+
+    def testBatchMatchesOneAtATime(self):
+        from Benchmark import buildCorpus
+        states = buildCorpus(games = 2, plies = 60, every = 3)
+        learning = AIPlayer(PLAYER_ONE)
+        trained = AIPlayer(PLAYER_ONE)
+        trained.initializeFinalNetwork()
+        for player in (learning, trained):
+            single = [player.getOutputValue(state) for state in states]
+            self.assertTrue(numpy.allclose(player.getOutputValues(states), single))
+            self.assertTrue(numpy.allclose(player.getOutputValues(states[:1]), single[:1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,15 @@
+import heapq
 import random
+import unittest
+from collections import OrderedDict
 from Constants import *
 from Ant import *
 from Construction import *
 from Move import *
+from BoardTables import ALL_COORDS, ADJACENT, ATTACKABLE, CELL_BITS, QUEEN_CELLS, cellIndex
+from Bitboard import Bitboards, maskToCoords
+from DistanceTable import getDistanceTable
+from Zobrist import stateHash, antKey, constrKey, foodKey, TURN_KEYS
 
 #
 # AIPlayerUtils.py
@@ -15,6 +22,14 @@ from Move import *
 # these routines safe for a GameState that has been generated via the
 # GameState.fastclone method.
 #
+# getNextState and getNextStateAdversarial return plain clones, which can be
+# changed by hand.  Searches can ask for indexed ones instead (indexed=True):
+# those carry a coordinate index (see GameState.buildIndex) that getAntAt and
+# getConstrAt use instead of scanning the inventories, and their Zobrist hash
+# (see Zobrist.py) in hashValue, both kept up to date from the state they were
+# made from.  If you modify the ants or constructions of such a state by hand,
+# call its clearIndex() method and set its hashValue to None.
+#
 
 ##
 # legalCoord
@@ -114,6 +129,14 @@ def getConstrList(currentState,
 #
 # Return:  the construct at the coordinate or None if there is none
 def getConstrAt(state, coords):
+    #use the coordinate index if the state has one
+    constrIndex = getattr(state, 'constrIndex', None)
+    if constrIndex is not None:
+        try:
+            return constrIndex.get(coords)
+        except TypeError:   #unhashable coords (e.g., a list) never match
+            return None
+
     #get a list of all constructs
     allConstrs = getConstrList(state)
 
@@ -136,6 +159,14 @@ def getConstrAt(state, coords):
 #
 # Return:  the ant at the coordinate or None if there is none
 def getAntAt(state, coords) -> Ant:
+    #use the coordinate index if the state has one
+    antIndex = getattr(state, 'antIndex', None)
+    if antIndex is not None:
+        try:
+            return antIndex.get(coords)
+        except TypeError:   #unhashable coords (e.g., a list) never match
+            return None
+
     #get a list of all constructs
     allAnts = getAntList(state)
 
@@ -191,6 +222,12 @@ def getWinner(currentState):
 # Return: a list of all legal coords that are adjacent to the given space
 #
 def listAdjacent(coord):
+    #look the answer up for cells on the board (see BoardTables.py)
+    try:
+        return list(ADJACENT[coord])
+    except (KeyError, TypeError):
+        pass
+
     #catch invalid inputs
     if not legalCoord(coord):
         return []
@@ -221,6 +258,13 @@ def listAdjacent(coord):
 # coord - the coordinate of the attacking ant
 # dist - the attack range of the attacking ant
 def listAttackable(coord, dist = 1):
+    #look the answer up for cells on the board (see BoardTables.py)
+    try:
+        if dist >= 0:
+            return list(ATTACKABLE[dist][coord])
+    except (KeyError, TypeError, IndexError):
+        pass
+
     res = []
 
     # goes L-R across board, offset by 1 for range()
@@ -247,9 +291,18 @@ def listAttackable(coord, dist = 1):
 #    state        - a GameState object 
 #    coords       - where the ant is
 #    movement     - movement points the ant has
+#    ignoresGrass - whether the ant ignores the movement cost of grass
+#    boards       - Bitboards of the state to use instead of looking at each
+#                   cell (optional, see Bitboard.py)
 #
 # Return:  a list of coords (tuples)   
-def listReachableAdjacent(state, coords, movement, ignoresGrass = False):
+def listReachableAdjacent(state, coords, movement, ignoresGrass = False, boards = None):
+    if boards is not None:
+        try:
+            return boards.reachableAdjacent(coords, movement, ignoresGrass)
+        except (KeyError, TypeError):
+            pass
+
     #build a list of all adjacent cells
     oneStep = listAdjacent(coords)
 
@@ -274,20 +327,32 @@ def listReachableAdjacent(state, coords, movement, ignoresGrass = False):
 # answer.  This method does not take queen ant movement restrictions
 # into account.
 #
+# By default only one shortest path to each reachable destination is returned
+# (see listShortestMovementPaths).  Pass allPaths=True to get every legal path,
+# including the many duplicates that lead to the same destination.
+#
 # Parameters:
 #    currentState - current game state
 #    coords       - where the ant is
 #    movement     - movement points ant has remaining
+#    ignoresGrass - whether the ant ignores the movement cost of grass
+#    allPaths     - whether to list every path instead of one per destination
+#    boards       - Bitboards of currentState (optional, see Bitboard.py)
 #
 # Return: a list of lists of coords (tuples). Each sub-list of tuples is an
 # acceptable set of coords for a Move object
-# TODO: I think this method could be sped up to improve computation time
-def listAllMovementPaths(currentState, coords, movement, ignoresGrass = False):
+def listAllMovementPaths(currentState, coords, movement, ignoresGrass = False, allPaths = False,
+                         boards = None):
+    if not allPaths:
+        return listShortestMovementPaths(currentState, coords, movement, ignoresGrass, boards = boards)
+
     #base case: ant can't move any further
     if (movement <= 0): return []
 
     #construct a list of all valid one-step moves
-    adjCells = listReachableAdjacent(currentState, coords, movement, ignoresGrass)
+    if boards is None:
+        boards = Bitboards.fromGameState(currentState)
+    adjCells = listReachableAdjacent(currentState, coords, movement, ignoresGrass, boards)
     oneStepMoves = []
     for cell in adjCells:
         oneStepMoves.append([coords, cell])
@@ -305,7 +370,7 @@ def listAllMovementPaths(currentState, coords, movement, ignoresGrass = False):
             cost = CONSTR_STATS[constrAtDest.type][MOVE_COST]
 
         #get a list of all moves that will extend this one
-        extensions = listAllMovementPaths(currentState, moveCoords, movement - cost, ignoresGrass)
+        extensions = listAllMovementPaths(currentState, moveCoords, movement - cost, ignoresGrass, True, boards)
 
         #create new moves by adding each extension to the base move
         for ext in extensions:
@@ -320,55 +385,99 @@ def listAllMovementPaths(currentState, coords, movement, ignoresGrass = False):
     return validMoves
 
 
+##
+# listShortestMovementPaths
+#
+# calculates one cheapest legal path to every cell a single ant can reach from
+# a given position.  The reachable cells are found with a bitboard flood fill
+# (see Bitboard.py) so, unlike the recursive listAllMovementPaths(allPaths=True),
+# each destination appears only once.  As with listAllMovementPaths the ant
+# doesn't actually have to be there.
+#
+# Parameters:
+#    currentState - current game state
+#    coords       - where the ant is
+#    movement     - movement points ant has remaining
+#    ignoresGrass - whether the ant ignores the movement cost of grass
+#    isQueen      - if True, paths never leave the queen's territory
+#    boards       - Bitboards of currentState (optional; pass them when
+#                   listing paths for several ants of the same state)
+#
+# Return: a list of lists of coords (tuples), one per destination in order of
+# movement cost, ending with the zero-step move [coords].  Each sub-list of
+# tuples is an acceptable set of coords for a Move object
+def listShortestMovementPaths(currentState, coords, movement, ignoresGrass = False, isQueen = False,
+                              boards = None):
+    #base case: ant can't move at all
+    if (movement <= 0): return []
+    if isQueen and not isPathOkForQueen([coords]): return []
+
+    #an ant off the board can't go anywhere
+    if not legalCoord(coords):
+        return [[coords]]
+
+    if boards is None:
+        boards = Bitboards.fromGameState(currentState)
+    validMoves = boards.shortestPaths(tuple(coords), movement, ignoresGrass, isQueen)
+
+    #Append the zero-step move (used to activate attack on adjacent foe)
+    validMoves.append([coords])
+
+    return validMoves
+
+
 ##
 # stepsToReach
 #
 # calculates the shortest distance between two cells taking
-# movement costs into account.
+# movement costs into account.  Ants are not treated as obstacles.
+#
+# The answer is looked up in the all-pairs table for the game's layout of
+# constructions (see DistanceTable.py), which is computed once per game.
 #
 #Parameters:
 #   currentState   - The state of the game (GameState)
 #   src            - starting position (an x,y coord)
 #   dst            - destination position (an x,y coord)
+#   ignoresGrass   - whether every step should cost 1
 #
 # Return: the costs in steps (an integer) or -1 on invalid input
-def stepsToReach(currentState, src, dst):
+def stepsToReach(currentState, src, dst, ignoresGrass = False):
     #check for invalid input
     if (not legalCoord(src)): return -1
     if (not legalCoord(dst)): return -1
 
-    #a dictionary of already visted cells and the corresponding cost to reach
+    try:
+        return getDistanceTable(currentState).steps(tuple(src), tuple(dst), ignoresGrass)
+    except (KeyError, TypeError, IndexError):
+        #a construction is not on the board; search this state directly
+        pass
+
+    #a dictionary of the cheapest known cost to reach each cell
     visited = { src : 0 }
-    #a list of to be processed cells
-    queue = [ src ]
+    #cells to be processed, cheapest first
+    heap = [ (0, src) ]
 
-    #this loops processes cells in the queue until it is empty
-    while(len(queue) > 0):
-        cell = queue.pop(0)
+    while (len(heap) > 0):
+        dist, cell = heapq.heappop(heap)
+        #skip cells that were queued again with a cheaper cost
+        if (dist > visited[cell]): continue
 
         #if this cell is our destination we are done
         if (cell == dst):
-            return visited[cell]
+            return dist
 
         #calc distance to all cells adj to this one assuming we reach them
         #from this one
-        nextSteps = listAdjacent(cell)
-        for newCell in nextSteps:
+        for newCell in listAdjacent(cell):
             constrAtDest = getConstrAt(currentState, newCell)
             cost = 1  #default
-            if constrAtDest != None:
+            if constrAtDest != None and not ignoresGrass:
                 cost = CONSTR_STATS[constrAtDest.type][MOVE_COST]
-            dist = visited[cell] + cost
-
-            #if the new distance is best so far, update the visited dict
-            if (newCell in visited):
-                if (dist < visited[newCell]):
-                    visited[newCell] = dist
-            #if we've never seen this cell before also update dict and
-            #enqueue this new cell to be processed at a future loop iteration
-            else:
-                visited[newCell] = dist
-                queue.append(newCell)
+            newDist = dist + cost
+            if (newCell not in visited or newDist < visited[newCell]):
+                visited[newCell] = newDist
+                heapq.heappush(heap, (newDist, newCell))
 
     #we should never reach this point
     return -1
@@ -492,6 +601,15 @@ def listAllBuildMoves(currentState):
 # Return: True if the is okay
 #
 def isPathOkForQueen(path):
+    #look each cell up in the queen's bitmask (see BoardTables.py)
+    try:
+        for coord in path:
+            if not QUEEN_CELLS & CELL_BITS[coord]:
+                return False
+        return True
+    except (KeyError, TypeError):
+        pass
+
     for coord in path:
         if (coord[1] == BOARD_LENGTH / 2 - 1) \
         or (coord[1] == BOARD_LENGTH / 2):
@@ -506,10 +624,13 @@ def isPathOkForQueen(path):
 #
 # Parameters:
 #   currentState - the current state
+#   allPaths     - list every path to each destination rather than one
+#                  (see listAllMovementPaths)
 #
 # Returns:  a list of Move objects
-def listAllMovementMoves(currentState):
+def listAllMovementMoves(currentState, allPaths = False):
     result = []
+    boards = Bitboards.fromGameState(currentState)
 
     #first get all MOVE_ANT moves for each ant in the inventory
     myInv = getCurrPlayerInventory(currentState)
@@ -517,22 +638,37 @@ def listAllMovementMoves(currentState):
         #skip ants that have already moved
         if (ant.hasMoved): continue
 
+        #one path per destination; queens are kept in their territory
+        #while searching
+        if not allPaths:
+            paths = listShortestMovementPaths(currentState,
+                                              ant.coords,
+                                              UNIT_STATS[ant.type][MOVEMENT],
+                                              UNIT_STATS[ant.type][IGNORES_GRASS],
+                                              ant.type == QUEEN,
+                                              boards)
+            for path in paths:
+                result.append(Move(MOVE_ANT, path, None))
+            continue
+
         #create a Move object for each valid movement path
-        allPaths = listAllMovementPaths(currentState,
-                                        ant.coords,
-                                        UNIT_STATS[ant.type][MOVEMENT],
-                                        UNIT_STATS[ant.type][IGNORES_GRASS])
+        paths = listAllMovementPaths(currentState,
+                                     ant.coords,
+                                     UNIT_STATS[ant.type][MOVEMENT],
+                                     UNIT_STATS[ant.type][IGNORES_GRASS],
+                                     True,
+                                     boards)
 
         #remove moves that take the queen out of her territory
         if (ant.type == QUEEN):
             tmpList = []
-            for path in allPaths:
+            for path in paths:
                 if (isPathOkForQueen(path)):
                     tmpList.append(path)
-            allPaths = tmpList
+            paths = tmpList
 
         #construct the list of moves using the paths
-        for path in allPaths:
+        for path in paths:
             result.append(Move(MOVE_ANT, path, None))
 
     return result
@@ -544,18 +680,121 @@ def listAllMovementMoves(currentState):
 # determines all the legal moves that can be made by the player
 # whose turn it currently is.
 #
+# If the caller passes a MoveCache (below) the result for a state that has
+# been seen before is rebuilt from the cache instead of being generated again.
+#
 # Parameters:
 #   currentState - the current state
+#   allPaths     - list every movement path to each destination rather than
+#                  one (see listAllMovementPaths)
+#   cache        - the caller's MoveCache, or None to not cache the moves
 #
 # Returns:  a list of Move objects
-def listAllLegalMoves(currentState):
+def listAllLegalMoves(currentState, allPaths = False, cache = None):
+    if cache is not None:
+        key = (stateHash(currentState), allPaths)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
     result = []
-    result.extend(listAllMovementMoves(currentState))
+    result.extend(listAllMovementMoves(currentState, allPaths))
     result.extend(listAllBuildMoves(currentState))
     result.append(Move(END, None, None))
+
+    if cache is not None:
+        cache.put(key, result)
     return result
 
 
+##
+# MoveCache
+#
+# A bounded, least-recently-used cache that maps a state hash (see
+# Zobrist.stateHash) to the legal moves for that state.  Moves are stored as
+# tuples and every hit builds new Move objects, so callers are free to modify
+# the moves they get back (Game.py rewrites coordList for player two).
+#
+# Each agent that wants its moves cached owns one, so no other player's
+# moves are affected.  States are looked up by stateHash, which trusts the
+# hashValue a state carries: only use a cache for states that aren't changed
+# by hand after they are made (e.g., a search's own states).
+#
+# Variables:
+#   maxSize - the most entries kept (0 disables the cache)
+#   hits    - number of lookups answered from the cache
+#   misses  - number of lookups that were not
+#
+class MoveCache(object):
+
+    def __init__(self, maxSize = 0):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    ##
+    # get
+    #
+    # Return: a fresh list of Move objects for the key, or None if the key is
+    # not cached
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return [Move(moveType, None if coordList is None else list(coordList), buildType)
+                for (moveType, coordList, buildType) in entry]
+
+    ##
+    # put
+    #
+    # stores a copy of a list of moves, evicting the least recently used entry
+    # if the cache is full
+    def put(self, key, moves):
+        if self.maxSize <= 0:
+            return
+        self.entries[key] = tuple((move.moveType,
+                                   None if move.coordList is None else tuple(move.coordList),
+                                   move.buildType)
+                                  for move in moves)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    ##
+    # resize
+    #
+    # changes the maximum number of entries, evicting as needed
+    def resize(self, maxSize):
+        self.maxSize = maxSize
+        while len(self.entries) > max(maxSize, 0):
+            self.entries.popitem(last=False)
+
+    ##
+    # clear
+    #
+    # empties the cache and resets the counters
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    ##
+    # Return: the fraction of lookups that were hits
+    def hitRate(self):
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def __str__(self):
+        return "<MoveCache: %d/%d entries, %d hits, %d misses>" % \
+               (len(self.entries), self.maxSize, self.hits, self.misses)
+
+
 
 ##
 # Return: a reference to the inventory of the player whose turn it is
@@ -621,23 +860,30 @@ def getEnemyInv(self, currentState):
 # Parameters:
 #   currentState - A clone of the current state (GameState)
 #   move - The move that the agent would take (Move)
+#   indexed - give the clone a coordinate index and its hashValue (see the
+#             note at the top of this file)
 #
 # Return: A clone of what the state would look like if the move was made
 ##
-def getNextState(currentState, move):
+def getNextState(currentState, move, indexed = False):
     # variables I will need
-    myGameState = currentState.fastclone()
+    myGameState = currentState.fastclone(indexed)
+    antIndex = myGameState.antIndex
+    hashValue = stateHash(currentState) if indexed else 0
     myInv = getCurrPlayerInventory(myGameState)
     me = myGameState.whoseTurn
     myAnts = myInv.ants
     myTunnels = myInv.getTunnels()
     myAntHill = myInv.getAnthill()
+    foodCount = myInv.foodCount
 
     # If enemy ant is on my anthill or tunnel update capture health
     ant = getAntAt(myGameState, myAntHill.coords)
     if ant is not None:
         if ant.player != me:
+            hashValue ^= constrKey(myAntHill, me)
             myAntHill.captureHealth -= 1
+            hashValue ^= constrKey(myAntHill, me)
 
     # If an ant is built update list of ants
     antTypes = [WORKER, DRONE, SOLDIER, R_SOLDIER]
@@ -645,6 +891,9 @@ def getNextState(currentState, move):
         if move.buildType in antTypes:
             ant = Ant(myInv.getAnthill().coords, move.buildType, me)
             myInv.ants.append(ant)
+            if indexed and ant.coords not in antIndex:
+                antIndex[ant.coords] = ant
+            hashValue ^= antKey(ant)
             # Update food count depending on ant built
             if move.buildType == WORKER:
                 myInv.foodCount -= 1
@@ -663,6 +912,11 @@ def getNextState(currentState, move):
         startingCoord = move.coordList[0]
         for ant in myAnts:
             if ant.coords == startingCoord:
+                hashValue ^= antKey(ant)
+                if indexed:
+                    if antIndex.get(startingCoord) is ant:
+                        del antIndex[startingCoord]
+                    antIndex[newCoord] = ant
                 ant.coords = newCoord
                 # TODO: should this be set true? Design decision
                 ant.hasMoved = False
@@ -680,19 +934,29 @@ def getNextState(currentState, move):
                     for food in foods:
                         if food.coords == ant.coords:
                             ant.carrying = True
+                hashValue ^= antKey(ant)
                 # If my ant is close to an enemy ant attack it
                 attackable = listAttackable(ant.coords, UNIT_STATS[ant.type][RANGE])
                 for coord in attackable:
                     foundAnt = getAntAt(myGameState, coord)
                     if foundAnt is not None:  # If ant is adjacent my ant
                         if foundAnt.player != me:  # if the ant is not me
+                            hashValue ^= antKey(foundAnt)
                             foundAnt.health = foundAnt.health - UNIT_STATS[ant.type][ATTACK]  # attack
                             # If an enemy is attacked and looses all its health remove it from the other players
                             # inventory
                             if foundAnt.health <= 0:
                                 myGameState.inventories[1 - me].ants.remove(foundAnt)
+                                if indexed:
+                                    del antIndex[foundAnt.coords]
+                            else:
+                                hashValue ^= antKey(foundAnt)
                             # If attacked an ant already don't attack any more
                             break
+    if indexed:
+        if myInv.foodCount != foodCount:
+            hashValue ^= foodKey(me, foodCount) ^ foodKey(me, myInv.foodCount)
+        myGameState.hashValue = hashValue
     return myGameState
 
 ##
@@ -704,27 +968,223 @@ def getNextState(currentState, move):
 # Parameters:
 #   currentState - A clone of the current state (GameState)
 #   move - The move that the agent would take (Move)
+#   indexed - as in getNextState
 #
 # Return: A clone of what the state would look like if the move was made
 ##
-def getNextStateAdversarial(currentState, move):
+def getNextStateAdversarial(currentState, move, indexed = False):
     # variables I will need
-    nextState = getNextState(currentState, move)
+    nextState = getNextState(currentState, move, indexed)
     myInv = getCurrPlayerInventory(nextState)
     myAnts = myInv.ants
+    hashValue = nextState.hashValue if indexed else 0
 
     # If an ant is moved update their coordinates and has moved
     if move.moveType == MOVE_ANT:
         startingCoord = move.coordList[0]
         for ant in myAnts:
             if ant.coords == startingCoord:
+                hashValue ^= antKey(ant)
                 ant.hasMoved = True
+                hashValue ^= antKey(ant)
     elif move.moveType == END:
         for ant in myAnts:
+            hashValue ^= antKey(ant)
             ant.hasMoved = False
+            hashValue ^= antKey(ant)
         nextState.whoseTurn = 1 - currentState.whoseTurn
+        hashValue ^= TURN_KEYS[currentState.whoseTurn] ^ TURN_KEYS[nextState.whoseTurn]
+    if indexed and nextState is not currentState:
+        nextState.hashValue = hashValue
     return nextState
 
+
+#kinds of changes recorded by applyMove and taken back by undoMove
+_UNDO_ATTR = 0      #(kind, object, attribute name, old value)
+_UNDO_APPEND = 1    #(kind, list) an item was appended to the list
+_UNDO_REMOVE = 2    #(kind, list, index, item) an item was removed from the list
+_UNDO_INDEX = 3     #(kind, dict, key, old value or _NOT_INDEXED)
+_NOT_INDEXED = object()
+
+#food spent by getNextState on each buildable ant type
+_BUILD_FOOD = {WORKER : 1, DRONE : 2, SOLDIER : 3, R_SOLDIER : 2}
+
+##
+# _setAttr
+#
+# sets an attribute of an object, recording the old value in undo
+#
+def _setAttr(undo, obj, name, value):
+    undo.append((_UNDO_ATTR, obj, name, getattr(obj, name)))
+    setattr(obj, name, value)
+
+##
+# _setIndex
+#
+# sets (value given) or deletes (value is _NOT_INDEXED) an entry of a
+# coordinate index, recording the old entry in undo
+#
+def _setIndex(undo, index, key, value):
+    undo.append((_UNDO_INDEX, index, key, index.get(key, _NOT_INDEXED)))
+    if value is _NOT_INDEXED:
+        del index[key]
+    else:
+        index[key] = value
+
+##
+# applyMove
+#
+# Description: Makes a move on the given state in place, with exactly the
+# same result as getNextStateAdversarial (including the order of the
+# inventories), and returns a record of what was changed so that undoMove can
+# restore the state.  A search can use this pair to walk the game tree on a
+# single state instead of cloning a state for every node.
+#
+# The coordinate index and hashValue of the state are kept up to date if the
+# state has them.
+#
+# Parameters:
+#   state - the GameState to modify
+#   move - the move to make (Move)
+#
+# Return: the undo record for the move (pass it to undoMove)
+##
+def applyMove(state, move):
+    undo = [(_UNDO_ATTR, state, 'hashValue', state.hashValue)]
+    # ants are no longer allowed to build tunnels, so this is an error
+    if move.moveType == BUILD and move.buildType == TUNNEL:
+        print("Attempted tunnel build in applyMove()")
+        return undo
+
+    antIndex = state.antIndex
+    hashValue = state.hashValue
+    hashed = hashValue is not None
+    myInv = getCurrPlayerInventory(state)
+    me = state.whoseTurn
+    myAnts = myInv.ants
+    myAntHill = myInv.getAnthill()
+    foodCount = myInv.foodCount
+
+    # If enemy ant is on my anthill update capture health
+    ant = getAntAt(state, myAntHill.coords)
+    if ant is not None and ant.player != me:
+        if hashed:
+            hashValue ^= constrKey(myAntHill, me)
+        _setAttr(undo, myAntHill, 'captureHealth', myAntHill.captureHealth - 1)
+        if hashed:
+            hashValue ^= constrKey(myAntHill, me)
+
+    # If an ant is built add it and pay for it
+    if move.moveType == BUILD:
+        if move.buildType in _BUILD_FOOD:
+            ant = Ant(myAntHill.coords, move.buildType, me)
+            myAnts.append(ant)
+            undo.append((_UNDO_APPEND, myAnts))
+            if antIndex is not None and ant.coords not in antIndex:
+                _setIndex(undo, antIndex, ant.coords, ant)
+            if hashed:
+                hashValue ^= antKey(ant)
+            _setAttr(undo, myInv, 'foodCount', myInv.foodCount - _BUILD_FOOD[move.buildType])
+
+    # If an ant is moved update its coordinates, food and attack
+    elif move.moveType == MOVE_ANT:
+        newCoord = move.coordList[-1]
+        startingCoord = move.coordList[0]
+        myTunnels = myInv.getTunnels()
+        for ant in myAnts:
+            if ant.coords == startingCoord:
+                if hashed:
+                    hashValue ^= antKey(ant)
+                if antIndex is not None:
+                    if antIndex.get(startingCoord) is ant:
+                        _setIndex(undo, antIndex, startingCoord, _NOT_INDEXED)
+                    _setIndex(undo, antIndex, newCoord, ant)
+                _setAttr(undo, ant, 'coords', newCoord)
+                _setAttr(undo, ant, 'hasMoved', False)
+                # If an ant is carrying food and ends on the anthill or tunnel drop the food
+                if ant.carrying and (newCoord == myAntHill.coords or
+                                     any(tunnel.coords == newCoord for tunnel in myTunnels)):
+                    _setAttr(undo, myInv, 'foodCount', myInv.foodCount + 1)
+                    _setAttr(undo, ant, 'carrying', False)
+                # If an ant doesn't have food and ends on the food grab food
+                if not ant.carrying and ant.type == WORKER:
+                    for food in getConstrList(state, 2, [FOOD]):
+                        if food.coords == newCoord:
+                            _setAttr(undo, ant, 'carrying', True)
+                            break
+                if hashed:
+                    hashValue ^= antKey(ant)
+                # If my ant is close to an enemy ant attack the first one found
+                attackable = listAttackable(ant.coords, UNIT_STATS[ant.type][RANGE])
+                for coord in attackable:
+                    foundAnt = getAntAt(state, coord)
+                    if foundAnt is not None and foundAnt.player != me:
+                        if hashed:
+                            hashValue ^= antKey(foundAnt)
+                        _setAttr(undo, foundAnt, 'health', foundAnt.health - UNIT_STATS[ant.type][ATTACK])
+                        # If it has lost all its health remove it from the other player's inventory
+                        if foundAnt.health <= 0:
+                            enemyAnts = state.inventories[1 - me].ants
+                            position = enemyAnts.index(foundAnt)
+                            del enemyAnts[position]
+                            undo.append((_UNDO_REMOVE, enemyAnts, position, foundAnt))
+                            if antIndex is not None:
+                                _setIndex(undo, antIndex, foundAnt.coords, _NOT_INDEXED)
+                        elif hashed:
+                            hashValue ^= antKey(foundAnt)
+                        break
+
+        # as in getNextStateAdversarial, mark the ants at the start of the move
+        for ant in myAnts:
+            if ant.coords == startingCoord:
+                if hashed:
+                    hashValue ^= antKey(ant)
+                _setAttr(undo, ant, 'hasMoved', True)
+                if hashed:
+                    hashValue ^= antKey(ant)
+
+    # At the end of the turn the other player's ants may move
+    elif move.moveType == END:
+        for ant in myAnts:
+            if hashed:
+                hashValue ^= antKey(ant)
+            _setAttr(undo, ant, 'hasMoved', False)
+            if hashed:
+                hashValue ^= antKey(ant)
+        _setAttr(undo, state, 'whoseTurn', 1 - me)
+        if hashed:
+            hashValue ^= TURN_KEYS[me] ^ TURN_KEYS[1 - me]
+
+    if hashed:
+        if myInv.foodCount != foodCount:
+            hashValue ^= foodKey(me, foodCount) ^ foodKey(me, myInv.foodCount)
+        state.hashValue = hashValue
+    return undo
+
+##
+# undoMove
+#
+# Description: Takes back a move made with applyMove.  Moves must be undone
+# in the reverse of the order they were made.
+#
+# Parameters:
+#   state - the GameState given to applyMove
+#   undo - the record returned by applyMove
+##
+def undoMove(state, undo):
+    for change in reversed(undo):
+        kind = change[0]
+        if kind == _UNDO_ATTR:
+            setattr(change[1], change[2], change[3])
+        elif kind == _UNDO_APPEND:
+            change[1].pop()
+        elif kind == _UNDO_REMOVE:
+            change[1].insert(change[2], change[3])
+        elif change[3] is _NOT_INDEXED:
+            del change[1][change[2]]
+        else:
+            change[1][change[2]] = change[3]
+
     
 ##
 # returns a character representation of a given ant
@@ -819,109 +1279,155 @@ def asciiPrintState(state):
     print(" food: " + str(p1Food) + "/" + str(p2Food))
 
 
-class GraphNode:
-
-    def __init__(self, parent=None, coords=None, f=0.0, g=0.0, h=0.0):
-        self.parent = parent
-        self.coords = coords
-        self.f = f
-        self.g = g
-        self.h = h
-
-    def __hash__(self):
-        return hash(self.coords)
-
-    def __eq__(self, other):
-        if self.coords == other.coords:
-            return True
-        return False
-
-    def __str__(self):
-        return str(self.coords)
-
-
 ##
 # aStarSearchPath
 #
-# Create a path towards from start to goal
-# CAVEAT: THIS DOES NOT TAKE INTO ACCOUNT GRASS RIGHT NOW
+# Create a path towards from start to goal for the ant at start.  The search
+# is A* with the real movement costs (grass costs more unless the ant ignores
+# it) and other ants as obstacles.
+#
+# The path stops next to the goal (which is usually occupied, e.g., by a
+# target ant) and is cut off where the ant runs out of movement points, so it
+# is a legal coordList for a MOVE_ANT this turn.  If the ant is already next
+# to the goal the path is just [start].
+#
 # CAVEAT: A-STAR SEARCH IS SLOWER THAN createPathToward() BECAUSE THIS IS OPTIMAL
 #         AND createPathTowards() IS GREEDY FOR TIME EFFICIENCY
 #
+# Parameters:
+#   currentState - the state of the game (GameState)
+#   start - the coords of the ant to move
+#   goal - the coords to move toward
+#
+# Return: the path (a list of coords), [] if start is the goal or False if
+# there is no ant at start or no way to reach the goal
 ##
 def aStarSearchPath(currentState, start, goal):
-    start = GraphNode(coords=start)
-    goal = GraphNode(coords=goal)
+    return aStarSearchPaths(currentState, [(start, goal)])[0]
 
-    ant = getAntAt(currentState, start.coords)
-
-    antMovement = UNIT_STATS[ant.type][MOVEMENT]
-    antMovement = antMovement + 1
+##
+# aStarSearchPaths
+#
+# the batch version of aStarSearchPath: finds a path for each (start, goal)
+# pair on the same state, sharing the work of reading the board
+#
+# Parameters:
+#   currentState - the state of the game (GameState)
+#   pairs - a list of (start, goal) coords
+#
+# Return: a list with the result of aStarSearchPath for each pair
+##
+def aStarSearchPaths(currentState, pairs):
+    boards = Bitboards.fromGameState(currentState)
+    #cost of stepping into each cell, indexed by cellIndex
+    stepCosts = [1] * len(ALL_COORDS)
+    for cost, mask in boards.stepCosts:
+        for coords in maskToCoords(mask):
+            stepCosts[cellIndex(coords)] = cost
+
+    results = []
+    for start, goal in pairs:
+        ant = getAntAt(currentState, start)
+        if ant is None:
+            results.append(False)
+            continue
+        results.append(_aStar(tuple(start), tuple(goal), boards.occupied, stepCosts,
+                              UNIT_STATS[ant.type][MOVEMENT],
+                              UNIT_STATS[ant.type][IGNORES_GRASS]))
+    return results
 
-    if start.coords == goal.coords:
+##
+# _aStar
+#
+# the search done by aStarSearchPaths for one ant
+#
+# Parameters:
+#   start, goal - on-board coords
+#   occupied - mask of the cells with ants (see Bitboard.py)
+#   stepCosts - cost of stepping into each cell, indexed by cellIndex
+#   movement - the ant's movement points
+#   ignoresGrass - whether every step costs the ant 1
+#
+# Return: see aStarSearchPath
+##
+def _aStar(start, goal, occupied, stepCosts, movement, ignoresGrass):
+    if start == goal:
         return []
 
-    start.f = start.g + approxDist(start.coords, goal.coords)
-    open_list = [start, ]
-    closed_list = list()
-    current = start
-
-    while open_list:
-        if current == goal:
-            return construct_path(current, antMovement)
-
-        current = open_list.pop(open_list.index(min(open_list, key=lambda x: x.f)))
-
-        if current in closed_list:
+    #cheapest known cost and predecessor of each cell
+    costs = { start : 0 }
+    parents = { start : None }
+    closed = set()
+    #(estimated total cost, tie breaker, cell); the tie breaker keeps the
+    #order cells were found in and avoids comparing coords
+    heap = [ (approxDist(start, goal), 0, start) ]
+    counter = 1
+
+    while heap:
+        f, order, current = heapq.heappop(heap)
+        if current in closed:
             continue
+        closed.add(current)
 
-        for neighbor in neighbors(currentState, current, goal):
+        for neighbor in ADJACENT[current]:
+            #stop next to the goal
             if neighbor == goal:
-                return construct_path(current, antMovement)
-            if neighbor in open_list:
-                other = next((x for x in open_list if x.coords == neighbor.coords), None)
-                if next((x for x in open_list if x.coords == neighbor.coords), None) is not None:
-                    if other.f < neighbor.f:
-                        continue
-            if neighbor in closed_list:
-                other = next((x for x in open_list if x.coords == neighbor.coords), None)
-                if next((x for x in open_list if x.coords == neighbor.coords), None) is not None:
-                    if other.f < neighbor.f:
-                        continue
-                    else:
-                        open_list.append(neighbor)
-                else:
-                    open_list.append(neighbor)
-            else:
-                open_list.append(neighbor)
-
-        closed_list.append(current)
+                return _pathTo(current, parents, stepCosts, movement, ignoresGrass)
+            if neighbor in closed or CELL_BITS[neighbor] & occupied:
+                continue
+            cost = 1
+            if not ignoresGrass:
+                cost = stepCosts[cellIndex(neighbor)]
+            newCost = costs[current] + cost
+            if newCost < costs.get(neighbor, newCost + 1):
+                costs[neighbor] = newCost
+                parents[neighbor] = current
+                heapq.heappush(heap, (newCost + approxDist(neighbor, goal), counter, neighbor))
+                counter += 1
 
     return False
 
+##
+# _pathTo
+#
+# Return: the path from the start of an _aStar search to cell, cut off where
+# the ant runs out of movement points
+##
+def _pathTo(cell, parents, stepCosts, movement, ignoresGrass):
+    path = []
+    while cell is not None:
+        path.append(cell)
+        cell = parents[cell]
+    path.reverse()
+
+    #keep the steps the ant can afford this turn
+    spent = 0
+    for i in range(1, len(path)):
+        spent += 1 if ignoresGrass else stepCosts[cellIndex(path[i])]
+        if spent > movement:
+            return path[:i]
+    return path
 
-def neighbors(currentState, node, goal):
-    bors = [GraphNode(coords=y) for y in listReachAdj(currentState, node.coords, goal.coords)]
-    for bor in bors:
-        bor.g = node.g + 1
-        bor.f = bor.g + approxDist(bor.coords, goal.coords)
-        bor.parent = node
-    return bors
 
+class GraphNode:
 
-def construct_path(node, antMovement):
-    path = [node, ]
-    normalPath = list()
-    while node.parent is not None:
-        node = node.parent
-        path.append(node)
+    def __init__(self, parent=None, coords=None, f=0.0, g=0.0, h=0.0):
+        self.parent = parent
+        self.coords = coords
+        self.f = f
+        self.g = g
+        self.h = h
 
-    for x in path:
-        normalPath.append(x.coords)
+    def __hash__(self):
+        return hash(self.coords)
 
-    li = normalPath[::-1]
+    def __eq__(self, other):
+        if self.coords == other.coords:
+            return True
+        return False
 
-    return li if len(li) <= antMovement else li[:antMovement]
+    def __str__(self):
+        return str(self.coords)
 
 
 def listReachAdj(state, coords, givenAntCoords):
@@ -939,3 +1445,104 @@ def listReachAdj(state, coords, givenAntCoords):
             candMoves.append(cell)
 
     return candMoves
+
+
+##
+# _testCorpus
+#
+# Return: seeded mid-game states (with boards) for the tests below (see
+#         Benchmark.buildCorpus)
+#
+def _testCorpus():
+    from Benchmark import buildCorpus
+    return buildCorpus(games = 4, plies = 80, every = 4)
+
+
+##
+# test_movementPaths
+#
+# python -m unittest AIPlayerUtils
+#
+class test_movementPaths(unittest.TestCase):
+
+    def testShortestPathsReachEveryDestination(self):
+        for state in _testCorpus():
+            for ant in state.inventories[state.whoseTurn].ants:
+                stats = UNIT_STATS[ant.type]
+                paths = listAllMovementPaths(state, ant.coords, stats[MOVEMENT], stats[IGNORES_GRASS])
+                everyPath = listAllMovementPaths(state, ant.coords, stats[MOVEMENT], stats[IGNORES_GRASS], True)
+                ends = [path[-1] for path in paths]
+                self.assertEqual(len(ends), len(set(ends)))
+                self.assertEqual(set(ends), set(path[-1] for path in everyPath))
+
+    def testShortestPathsAreLegal(self):
+        for state in _testCorpus():
+            for ant in state.inventories[state.whoseTurn].ants:
+                stats = UNIT_STATS[ant.type]
+                for path in listAllMovementPaths(state, ant.coords, stats[MOVEMENT], stats[IGNORES_GRASS]):
+                    self.assertEqual(path[0], ant.coords)
+                    cost = 0
+                    for before, cell in zip(path, path[1:]):
+                        self.assertIn(cell, listAdjacent(before))
+                        self.assertIsNone(getAntAt(state, cell))
+                        constr = getConstrAt(state, cell)
+                        if constr is not None and not stats[IGNORES_GRASS]:
+                            cost += CONSTR_STATS[constr.type][MOVE_COST]
+                        else:
+                            cost += 1
+                    self.assertLessEqual(cost, stats[MOVEMENT])
+
+
+
+##
+# test_applyMove
+#
+class test_applyMove(unittest.TestCase):
+
+    # indexed, hashed copies of the test states
+    def states(self):
+        from Zobrist import hashState
+        states = []
+        for state in _testCorpus():
+            state = state.fastclone(True)
+            state.hashValue = hashState(state)
+            states.append(state)
+        return states
+
+    def testUndoRestoresState(self):
+        from Serialization import encodeState
+        for state in self.states():
+            before = encodeState(state)
+            hashValue = state.hashValue
+            antIndex = dict(state.antIndex)
+            for move in listAllLegalMoves(state):
+                undoMove(state, applyMove(state, move))
+                self.assertEqual(encodeState(state), before)
+                self.assertEqual(state.hashValue, hashValue)
+                self.assertEqual(state.antIndex, antIndex)
+
+    def testSameAsGetNextStateAdversarial(self):
+        from Serialization import encodeState
+        for state in self.states():
+            for move in listAllLegalMoves(state):
+                expected = encodeState(getNextStateAdversarial(state, move))
+                undo = applyMove(state, move)
+                self.assertEqual(encodeState(state), expected)
+                undoMove(state, undo)
+
+    def testIncrementalHashMatchesRecompute(self):
+        from Zobrist import hashState
+        for state in self.states():
+            for move in listAllLegalMoves(state):
+                nextState = getNextStateAdversarial(state, move, True)
+                self.assertEqual(nextState.hashValue, hashState(nextState))
+                undo = applyMove(state, move)
+                self.assertEqual(state.hashValue, hashState(state))
+                indexed = state.fastclone(True)
+                self.assertEqual(dict((coords, (ant.type, ant.player)) for coords, ant in state.antIndex.items()),
+                                 dict((coords, (ant.type, ant.player)) for coords, ant in indexed.antIndex.items()))
+                undoMove(state, undo)
+
+
+if __name__ == '__main__':
+    unittest.main()
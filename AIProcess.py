@@ -0,0 +1,225 @@
+import os, sys, random, importlib, traceback
+import multiprocessing
+from Player import Player
+
+#
+# AIProcess.py
+#
+# Runs an AIPlayer in its own worker process so that a move that takes too
+# long can really be stopped.  A thread that overruns its time limit can't be
+# killed and keeps using the CPU (and can still set the game's move when it
+# finally finishes); a process can be.
+#
+# The game talks to the worker over a pipe.  Each request is a
+# (method name, arguments) tuple and each reply is (True, return value) or
+# (False, the traceback of the exception the AI raised).  The worker sends
+# None once its AIPlayer has been created.  The method "seedRandom" seeds the
+# worker's random module instead of calling the AIPlayer.
+#
+# Used by Game when AIs are isolated (python Game.py ... --isolate --timeout 5).
+#
+
+#workers are spawned, not forked: the game may be running Tk and other
+#threads, which a forked child would inherit in an unknown state
+_context = multiprocessing.get_context("spawn")
+
+
+##
+#AITimeoutError
+#Description: Raised when an AI doesn't answer within its time limit.  Its
+#   worker has already been restarted when this is raised.
+##
+class AITimeoutError(Exception):
+    pass
+
+
+##
+# _serve
+#
+# Description: The main loop of a worker process.  Loads the AIPlayer the
+#              same way Game.loadAIs does and answers requests until it is
+#              sent None.
+#
+# Parameters:
+#   conn - the worker's end of the pipe (Connection)
+#   moduleName - the AI module to load from the AI folder
+#   playerId - the id to give the AIPlayer
+#   author - the AIPlayer's name (differs from the module's for copies)
+#
+def _serve(conn, moduleName, playerId, author):
+    os.chdir('AI')
+    sys.path.insert(0, os.getcwd())
+    player = importlib.import_module(moduleName).AIPlayer(playerId)
+    sys.path.pop(0)
+    os.chdir('..')
+    player.author = author
+    conn.send(None)
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        method, args = request
+        try:
+            if method == "seedRandom":
+                reply = (True, random.seed(*args))
+            else:
+                reply = (True, getattr(player, method)(*args))
+        except Exception:
+            reply = (False, traceback.format_exc())
+        conn.send(reply)
+    conn.close()
+
+
+##
+#AIProcess
+#Description: A Player that forwards every call to an AIPlayer running in a
+#   worker process.  The worker (and so the AIPlayer's memory) lasts from
+#   game to game until it has to be restarted after a timeout or crash.
+#
+#Variables:
+#   moduleName - the module the AIPlayer is loaded from
+#   restarts - the number of times the worker has been restarted
+##
+class AIProcess(Player):
+
+    ##
+    #__init__
+    #Description: Starts a worker for the same AI as an already loaded player
+    #
+    #Parameters:
+    #   player - the AIPlayer (loaded in this process) to run in the worker
+    ##
+    def __init__(self, player):
+        super(AIProcess, self).__init__(player.playerId, player.author)
+        self.moduleName = type(player).__module__
+        self.restarts = 0
+        self.process = None
+        self.conn = None
+        self.start()
+
+    ##
+    #start
+    #Description: Starts the worker and waits for the AIPlayer to be created,
+    #   so loading the AI never counts against a move's time limit
+    ##
+    def start(self):
+        self.conn, childConn = _context.Pipe()
+        self.process = _context.Process(target=_serve, daemon=True,
+                                        args=(childConn, self.moduleName, self.playerId, self.author))
+        self.process.start()
+        childConn.close()
+        self.conn.recv()
+
+    ##
+    #restart
+    #Description: Kills the worker, whatever it's doing, and starts a new one
+    ##
+    def restart(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+        self.restarts += 1
+        self.start()
+
+    ##
+    #close
+    #Description: Asks the worker to exit (killing it if it doesn't)
+    ##
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+
+    ##
+    #call
+    #Description: Runs a method of the AIPlayer in the worker
+    #
+    #Parameters:
+    #   method - the name of the method (string)
+    #   args - the arguments (tuple of picklable objects)
+    #   timeout - seconds to wait for the answer, or None to wait forever
+    #
+    #Return: what the method returned, or None if it raised an exception or
+    #   the worker died (the traceback is printed)
+    ##
+    def call(self, method, args, timeout = None):
+        try:
+            self.conn.send((method, args))
+            if timeout is not None and not self.conn.poll(timeout):
+                self.restart()
+                raise AITimeoutError('%s: %s timeout [%s seconds] exceeded!' % (self.author, method, timeout))
+            ok, result = self.conn.recv()
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            print("AI ERROR: %s: worker process died during %s" % (self.author, method))
+            self.restart()
+            return None
+        if not ok:
+            print(result)
+            return None
+        return result
+
+    ##
+    #getPlacement
+    #
+    #Parameters:
+    #   currentState - The state of the current game (GameState)
+    #   timeout - seconds the AI has to answer, or None for no limit
+    #
+    #Return: The coordinates to place at (raises AITimeoutError if it took
+    #   too long)
+    ##
+    def getPlacement(self, currentState, timeout = None):
+        return self.call("getPlacement", (currentState,), timeout)
+
+    ##
+    #getMove
+    #
+    #Parameters:
+    #   currentState - The state of the current game (GameState)
+    #   timeout - seconds the AI has to answer, or None for no limit
+    #
+    #Return: The Move to be made (raises AITimeoutError if it took too long)
+    ##
+    def getMove(self, currentState, timeout = None):
+        return self.call("getMove", (currentState,), timeout)
+
+    ##
+    #getAttack
+    #
+    #Parameters:
+    #   currentState - The state of the current game (GameState)
+    #   attackingAnt - The ant making the attack (Ant)
+    #   enemyLocations - The coordinates of the enemies it can attack
+    #   timeout - seconds the AI has to answer, or None for no limit
+    #
+    #Return: The coordinates to attack (raises AITimeoutError if it took too
+    #   long)
+    ##
+    def getAttack(self, currentState, attackingAnt, enemyLocations, timeout = None):
+        return self.call("getAttack", (currentState, attackingAnt, enemyLocations), timeout)
+
+    def registerWin(self, hasWon):
+        return self.call("registerWin", (hasWon,))
+
+    def getSearchStats(self):
+        return self.call("getSearchStats", ())
+
+    ##
+    #seedRandom
+    #Description: Seeds the random numbers the AI uses in its worker
+    ##
+    def seedRandom(self, seed):
+        return self.call("seedRandom", (seed,))
@@ -0,0 +1,376 @@
+import os, sys, time, json, random, argparse
+from Constants import *
+from GameState import GameState
+from Building import Building
+from Construction import Construction
+from Ant import Ant, UNIT_STATS
+from AIPlayerUtils import *
+from GameRecorder import recordedStates
+from CompactState import CompactState
+
+#
+# Benchmark.py
+#
+# Speed benchmarks for the engine and the AIPlayerUtils functions the agents
+# spend their time in, plus whole headless games between fixed agents.
+#
+# The functions run over a corpus of mid-game states made by playing random
+# legal moves from random layouts.  Everything is seeded, so every run times
+# the same work.  Each benchmark reports operations per second (the best of
+# a few rounds) and is compared against a stored baseline; a benchmark that
+# got more than --tolerance slower is a regression and the run exits with
+# status 1.
+#
+#   python Benchmark.py --save      # record the baseline on this machine
+#   python Benchmark.py             # compare against it
+#
+# Baselines are only comparable on the machine (and Python) they were
+# recorded on, and with the same corpus, so none is kept in the repository;
+# comparing without one is an error (status 2), not a pass.
+#
+# --corpus FILE benchmarks the play phase states of games recorded with
+# python Game.py ... --record FILE instead of the random ones.
+#
+
+#seed of the corpus and of the games
+BENCH_SEED = 20190311
+
+#where the baseline is kept by default
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+#the corpus: number of random games, the most plies played in each, and how
+#often (in plies) a state is kept
+CORPUS_GAMES = 12
+CORPUS_PLIES = 120
+CORPUS_EVERY = 8
+
+#the headless games played by the game benchmarks: (name, player one, player two)
+GAME_MATCHES = (("gameFoodGatherer", "Simple Food Gatherer", "Booger"),
+                ("gameMinimax", "Max", "Booger"))
+
+
+##
+# randomLayout
+#
+# Return: a GameState at the start of the play phase with anthills, tunnels,
+#         grass and food placed at random (using rnd) on a consistent board
+#
+def randomLayout(rnd):
+    state = GameState.getBlankState()
+    used = set()
+
+    def freeCell(rows):
+        while True:
+            coords = (rnd.randint(0, BOARD_LENGTH - 1), rnd.randint(rows[0], rows[1]))
+            if coords not in used:
+                used.add(coords)
+                return coords
+
+    def place(constr, inv):
+        state.board[constr.coords[0]][constr.coords[1]].constr = constr
+        inv.constrs.append(constr)
+
+    sides = ((0, 3), (6, 9))
+    neutral = state.inventories[NEUTRAL]
+    for player in (PLAYER_ONE, PLAYER_TWO):
+        inv = state.inventories[player]
+        hill = Building(freeCell(sides[player]), ANTHILL, player)
+        tunnel = Building(freeCell(sides[player]), TUNNEL, player)
+        place(hill, inv)
+        place(tunnel, inv)
+        for i in range(9):
+            place(Construction(freeCell(sides[player]), GRASS), neutral)
+        for ant in (Ant(hill.coords, QUEEN, player), Ant(tunnel.coords, WORKER, player)):
+            state.board[ant.coords[0]][ant.coords[1]].ant = ant
+            inv.ants.append(ant)
+        inv.foodCount = 1
+    for player in (PLAYER_ONE, PLAYER_TWO):
+        for i in range(2):
+            place(Construction(freeCell(sides[1 - player]), FOOD), neutral)
+    state.phase = PLAY_PHASE
+    return state
+
+##
+# withBoard
+#
+# Return: a copy of a state (e.g., a fastclone()d one) with its board filled
+#         in, like the states Game hands to the agents
+#
+def withBoard(state):
+    copy = state.fastclone()
+    board = GameState.getBlankState().board
+    for inv in copy.inventories:
+        for constr in inv.constrs:
+            board[constr.coords[0]][constr.coords[1]].constr = constr
+        for ant in inv.ants:
+            board[ant.coords[0]][ant.coords[1]].ant = ant
+    copy.board = board
+    return copy
+
+##
+# buildCorpus
+#
+# Return: a list of mid-game states (with boards) from random games (every
+#         legal move is equally likely), the same list for the same arguments
+#
+def buildCorpus(seed = BENCH_SEED, games = CORPUS_GAMES, plies = CORPUS_PLIES, every = CORPUS_EVERY):
+    rnd = random.Random(seed)
+    corpus = []
+    for game in range(games):
+        state = randomLayout(rnd)
+        for ply in range(1, plies + 1):
+            state = getNextStateAdversarial(state, rnd.choice(listAllLegalMoves(state)))
+            if getWinner(state) is not None:
+                break
+            if ply % every == 0:
+                corpus.append(withBoard(state))
+    return corpus
+
+
+##
+# _antQueries
+#
+# Return: [(state, ant, target cell)] - every ant of the player whose turn it
+#         is in every corpus state, with a random cell to head for
+#
+def _antQueries(corpus, rnd):
+    queries = []
+    for state in corpus:
+        for ant in state.inventories[state.whoseTurn].ants:
+            target = (rnd.randint(0, BOARD_LENGTH - 1), rnd.randint(0, BOARD_LENGTH - 1))
+            queries.append((state, ant, target))
+    return queries
+
+#Each benchmark below takes the corpus and returns a function that does one
+#batch of operations and returns how many it did.
+
+def benchClone(corpus):
+    def run():
+        for state in corpus:
+            state.clone()
+        return len(corpus)
+    return run
+
+def benchFastclone(corpus):
+    def run():
+        for state in corpus:
+            state.fastclone()
+        return len(corpus)
+    return run
+
+def benchCompactClone(corpus):
+    compacts = [CompactState.fromGameState(state) for state in corpus]
+    def run():
+        for state in compacts:
+            state.clone()
+        return len(compacts)
+    return run
+
+def benchListAllLegalMoves(corpus):
+    def run():
+        for state in corpus:
+            listAllLegalMoves(state)
+        return len(corpus)
+    return run
+
+def benchListAllMovementPaths(corpus):
+    queries = _antQueries(corpus, random.Random(BENCH_SEED))
+    def run():
+        for state, ant, target in queries:
+            listAllMovementPaths(state, ant.coords, UNIT_STATS[ant.type][MOVEMENT],
+                                 UNIT_STATS[ant.type][IGNORES_GRASS])
+        return len(queries)
+    return run
+
+def benchGetNextState(corpus):
+    moves = [(state, move) for state in corpus for move in listAllLegalMoves(state)[:8]]
+    def run():
+        for state, move in moves:
+            getNextState(state, move)
+        return len(moves)
+    return run
+
+def benchStepsToReach(corpus):
+    queries = _antQueries(corpus, random.Random(BENCH_SEED))
+    def run():
+        for state, ant, target in queries:
+            stepsToReach(state, ant.coords, target, UNIT_STATS[ant.type][IGNORES_GRASS])
+        return len(queries)
+    return run
+
+def benchCreatePathToward(corpus):
+    queries = _antQueries(corpus, random.Random(BENCH_SEED))
+    def run():
+        for state, ant, target in queries:
+            createPathToward(state, ant.coords, target, UNIT_STATS[ant.type][MOVEMENT])
+        return len(queries)
+    return run
+
+def benchAStarSearchPath(corpus):
+    queries = _antQueries(corpus, random.Random(BENCH_SEED))
+    def run():
+        for state, ant, target in queries:
+            aStarSearchPath(state, ant.coords, target)
+        return len(queries)
+    return run
+
+#name : benchmark, in the order they are run
+MICRO_BENCHMARKS = (("clone", benchClone),
+                    ("fastclone", benchFastclone),
+                    ("compactClone", benchCompactClone),
+                    ("listAllLegalMoves", benchListAllLegalMoves),
+                    ("listAllMovementPaths", benchListAllMovementPaths),
+                    ("getNextState", benchGetNextState),
+                    ("stepsToReach", benchStepsToReach),
+                    ("createPathToward", benchCreatePathToward),
+                    ("aStarSearchPath", benchAStarSearchPath))
+
+
+##
+# gameBenchmark
+#
+# Return: a function that plays one seeded headless game between the given
+#         agents (loaded by a Game without a GUI) and returns 1
+#
+def gameBenchmark(game, author1, author2):
+    from Game import GameData
+    players = dict((player[0].author, player[0]) for player in game.players)
+    match = GameData(players[author1], players[author2], 1)
+    def run():
+        random.seed(BENCH_SEED)
+        game.setup(match, 0)
+        game.currentPlayerScores = [[author1, 0, 0], [author2, 0, 0]]
+        game.runGame()
+        game.errored = False
+        return 1
+    return run
+
+
+##
+# measure
+#
+# Description: times a benchmark.  In each round the batch is run at least
+#              once and repeated until minTime seconds have passed.
+#
+# Return: the most operations per second seen in any round
+#
+def measure(run, rounds, minTime):
+    best = 0.0
+    for i in range(rounds):
+        ops = 0
+        start = time.perf_counter()
+        while True:
+            ops += run()
+            elapsed = time.perf_counter() - start
+            if elapsed >= minTime:
+                break
+        best = max(best, ops / elapsed)
+    return best
+
+##
+# runBenchmarks
+#
+# Parameters:
+#   names - the benchmarks to run (None for all)
+#   games - False to skip the headless game benchmarks
+#   rounds - rounds per benchmark
+#   minTime - seconds per round for the function benchmarks
+#   corpus - the states to benchmark the functions on (None for buildCorpus())
+#
+# Return: {benchmark name : operations per second}
+#
+def runBenchmarks(names = None, games = True, rounds = 3, minTime = 0.25, corpus = None):
+    results = {}
+    if corpus is None:
+        corpus = buildCorpus()
+    for name, bench in MICRO_BENCHMARKS:
+        if names is None or name in names:
+            results[name] = measure(bench(corpus), rounds, minTime)
+            print("%-22s %12.1f ops/sec" % (name, results[name]))
+
+    wanted = [match for match in GAME_MATCHES if names is None or match[0] in names]
+    if games and wanted:
+        from Game import Game
+        game = Game(testing=True, commandLine=False)
+        for name, author1, author2 in wanted:
+            # short games are repeated for a second to steady the timing
+            results[name] = measure(gameBenchmark(game, author1, author2), rounds, 1.0)
+            print("%-22s %12.4f games/sec" % (name, results[name]))
+    return results
+
+##
+# compare
+#
+# Description: prints each result next to its baseline
+#
+# Return: the names of the benchmarks more than tolerance slower than the
+#         baseline
+#
+def compare(results, baseline, tolerance):
+    regressions = []
+    print("\n%-22s %14s %14s %8s" % ("benchmark", "ops/sec", "baseline", "change"))
+    for name in results:
+        if name not in baseline:
+            print("%-22s %14.2f %14s %8s" % (name, results[name], "-", "-"))
+            continue
+        change = results[name] / baseline[name] - 1
+        flag = ""
+        if change < -tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("%-22s %14.2f %14.2f %+7.1f%%%s" % (name, results[name], baseline[name], change * 100, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Antics engine benchmarks')
+    parser.add_argument('--baseline', metavar='FILE', default=BASELINE_FILE,
+                        help='baseline results to compare against (default %(default)s)')
+    parser.add_argument('--save', action='store_true', default=False,
+                        help='store these results as the baseline instead of comparing')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fraction slower than the baseline that counts as a regression (default %(default)s)')
+    parser.add_argument('--rounds', type=int, default=3, help='rounds per benchmark (default %(default)s)')
+    parser.add_argument('--no-games', action='store_false', dest='games', default=True,
+                        help='skip the headless game benchmarks')
+    parser.add_argument('--only', metavar='NAME', nargs='*', default=None,
+                        help='run only the named benchmarks')
+    parser.add_argument('--corpus', metavar='FILE', default=None,
+                        help='benchmark the states of recorded games (see GameRecorder.py) instead of random ones')
+    parser.add_argument('--every', type=int, default=CORPUS_EVERY,
+                        help='with --corpus, use every EVERY-th recorded state (default %(default)s)')
+    args = parser.parse_args()
+
+    corpus = None
+    if args.corpus is not None:
+        corpus = recordedStates(args.corpus, args.every)
+
+    # the AIs are loaded from the AI folder next to this file
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    results = runBenchmarks(args.only, args.games, args.rounds, corpus = corpus)
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print("\nBaseline saved to " + args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline at %s (record one with --save)" % args.baseline)
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\n%d regression(s): %s" % (len(regressions), ", ".join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+from Constants import *
+from Construction import CONSTR_STATS
+from BoardTables import ALL_COORDS, ADJACENT, CELL_BITS, QUEEN_CELLS
+
+#
+# Bitboard.py
+#
+# The board has 100 cells, so any set of cells fits in one Python int with
+# bit cellIndex(coords) (see BoardTables.py) standing for each cell.  A
+# Bitboards object holds such masks for the ants and constructions of a
+# state, and moving a whole set of cells one step in every direction is a
+# handful of shifts, which makes flood filling the cells an ant can reach
+# much cheaper than looking at the cells one at a time.
+#
+
+#every cell on the board
+FULL = (1 << (BOARD_LENGTH * BOARD_LENGTH)) - 1
+
+#the leftmost and rightmost columns (used to stop shifts wrapping around)
+FIRST_COLUMN = sum(CELL_BITS[(0, y)] for y in range(BOARD_LENGTH))
+LAST_COLUMN = sum(CELL_BITS[(BOARD_LENGTH - 1, y)] for y in range(BOARD_LENGTH))
+
+#TERRITORY[player] - the rows on a player's side of the board, where the
+#GUI lets their queen move
+TERRITORY = [sum(CELL_BITS[coord] for coord in ALL_COORDS if coord[1] < BOARD_LENGTH // 2 - 1),
+             sum(CELL_BITS[coord] for coord in ALL_COORDS if coord[1] > BOARD_LENGTH // 2)]
+
+#NEIGHBOR_BITS[cellIndex] - the bits of the cells next to a cell, in
+#listAdjacent order
+NEIGHBOR_BITS = [tuple(CELL_BITS[adjacent] for adjacent in ADJACENT[coord])
+                 for coord in ALL_COORDS]
+
+##
+# neighbors
+#
+# Return: the mask of every cell next to a cell in mask
+#
+def neighbors(mask):
+    return (((mask << 1) & ~FIRST_COLUMN) | ((mask >> 1) & ~LAST_COLUMN) |
+            (mask << BOARD_LENGTH) | (mask >> BOARD_LENGTH)) & FULL
+
+##
+# maskToCoords
+#
+# Return: the coordinates of the cells in mask, in cellIndex order
+#
+def maskToCoords(mask):
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(ALL_COORDS[low.bit_length() - 1])
+        mask ^= low
+    return result
+
+##
+# countCells
+#
+# Return: the number of cells in mask
+#
+def countCells(mask):
+    return bin(mask).count("1")
+
+
+##
+#Bitboards
+#Description: Cell masks for the ants and constructions of a GameState.  The
+#   masks are a snapshot; they are not updated when the state changes.
+#
+#Variables:
+#   ants - [mask of PLAYER_ONE's ants, mask of PLAYER_TWO's ants]
+#   occupied - mask of every cell with an ant
+#   grass - mask of the grass
+#   food - mask of the food
+#   tunnels - [PLAYER_ONE's tunnels, PLAYER_TWO's tunnels]
+#   anthills - [PLAYER_ONE's anthill, PLAYER_TWO's anthill]
+#   stepCosts - list of (cost, mask) pairs: the movement points needed to step
+#       into each cell in mask
+##
+class Bitboards(object):
+
+    def __init__(self):
+        self.ants = [0, 0]
+        self.occupied = 0
+        self.grass = 0
+        self.food = 0
+        self.tunnels = [0, 0]
+        self.anthills = [0, 0]
+        self.stepCosts = [(1, FULL)]
+
+    ##
+    #fromGameState
+    #Description: Builds the masks from the inventories of a state (the board
+    #   is not used, so fastclone()d states are fine).  Cells are assumed to
+    #   hold at most one construction, as they do in a legal game.
+    #
+    #Return: the Bitboards of the state
+    ##
+    @staticmethod
+    def fromGameState(state):
+        boards = Bitboards()
+        constrMasks = {}
+        for inv in state.inventories:
+            for constr in inv.constrs:
+                key = (constr.type, inv.player)
+                constrMasks[key] = constrMasks.get(key, 0) | CELL_BITS[constr.coords]
+            if inv.player == PLAYER_ONE or inv.player == PLAYER_TWO:
+                antMask = 0
+                for ant in inv.ants:
+                    antMask |= CELL_BITS[ant.coords]
+                boards.ants[inv.player] = antMask
+        boards.occupied = boards.ants[PLAYER_ONE] | boards.ants[PLAYER_TWO]
+
+        #sort the constructions into masks and group the cells by the cost
+        #of stepping into them
+        costs = {1 : FULL}
+        for (constrType, player), mask in constrMasks.items():
+            if constrType == GRASS:
+                boards.grass |= mask
+            elif constrType == FOOD:
+                boards.food |= mask
+            elif constrType == TUNNEL and player != NEUTRAL:
+                boards.tunnels[player] |= mask
+            elif constrType == ANTHILL and player != NEUTRAL:
+                boards.anthills[player] |= mask
+            cost = CONSTR_STATS[constrType][MOVE_COST]
+            if cost != 1:
+                costs[1] &= ~mask
+                costs[cost] = costs.get(cost, 0) | mask
+        boards.stepCosts = sorted(costs.items())
+        return boards
+
+    ##
+    #reachableLayers
+    #Description: Flood fills out from a cell through the cells without ants.
+    #
+    #Parameters:
+    #   coords - the starting cell
+    #   movement - the movement points available (int)
+    #   ignoresGrass - if True every step costs 1
+    #   allowed - mask of the cells the ant may enter
+    #
+    #Return: a list whose entry c is the mask of the cells that cost exactly
+    #   c movement points to reach (entry 0 is the starting cell)
+    ##
+    def reachableLayers(self, coords, movement, ignoresGrass = False, allowed = FULL):
+        stepCosts = [(1, FULL)] if ignoresGrass else self.stepCosts
+        enterable = allowed & ~self.occupied
+        start = CELL_BITS[coords]
+        layers = [start]
+        reached = start
+        for cost in range(1, movement + 1):
+            layer = 0
+            for stepCost, mask in stepCosts:
+                if stepCost <= cost:
+                    layer |= neighbors(layers[cost - stepCost]) & mask
+            layer &= enterable & ~reached
+            layers.append(layer)
+            reached |= layer
+        return layers
+
+    ##
+    #reachable
+    #
+    #Return: the mask of every cell reachable from coords (including coords
+    #   itself), see reachableLayers
+    ##
+    def reachable(self, coords, movement, ignoresGrass = False, allowed = FULL):
+        result = 0
+        for layer in self.reachableLayers(coords, movement, ignoresGrass, allowed):
+            result |= layer
+        return result
+
+    ##
+    #reachableAdjacent
+    #
+    #Return: the cells next to coords without an ant that can be entered
+    #   with the given movement points, in listAdjacent order
+    ##
+    def reachableAdjacent(self, coords, movement, ignoresGrass = False):
+        enterable = 0
+        if ignoresGrass:
+            if movement >= 1:
+                enterable = FULL
+        else:
+            for stepCost, mask in self.stepCosts:
+                if stepCost <= movement:
+                    enterable |= mask
+        enterable &= ~self.occupied
+        return [cell for cell in ADJACENT[coords] if CELL_BITS[cell] & enterable]
+
+    ##
+    #shortestPaths
+    #Description: Finds one cheapest path to every cell an ant can move to.
+    #
+    #Parameters:
+    #   coords - where the ant is
+    #   movement - the movement points available (int)
+    #   ignoresGrass - if True every step costs 1
+    #   isQueen - if True the path stays in the queen's territory
+    #       (see AIPlayerUtils.isPathOkForQueen)
+    #
+    #Return: a list of paths (lists of coords starting with coords), one per
+    #   destination, ordered by cost and then by cell
+    ##
+    def shortestPaths(self, coords, movement, ignoresGrass = False, isQueen = False):
+        allowed = QUEEN_CELLS if isQueen else FULL
+        layers = self.reachableLayers(coords, movement, ignoresGrass, allowed)
+        stepCosts = [(1, FULL)] if ignoresGrass else self.stepCosts
+
+        #extend the path to a neighbor in the right layer to reach each cell
+        pathTo = {layers[0] : [coords]}
+        paths = []
+        for cost in range(1, len(layers)):
+            remaining = layers[cost]
+            while remaining:
+                bit = remaining & -remaining
+                remaining ^= bit
+                index = bit.bit_length() - 1
+                for stepCost, mask in stepCosts:
+                    if bit & mask:
+                        break
+                layer = layers[cost - stepCost]
+                for previous in NEIGHBOR_BITS[index]:
+                    if previous & layer:
+                        break
+                path = pathTo[previous] + [ALL_COORDS[index]]
+                pathTo[bit] = path
+                paths.append(path)
+        return paths
@@ -0,0 +1,87 @@
+from Constants import *
+from Ant import UNIT_STATS
+
+#
+# BoardTables.py
+#
+# Board geometry that never changes during a game, computed once at import:
+# the neighbors of every cell, the cells an ant can attack from every cell
+# for every attack range, and the cells a queen is allowed to enter.
+# AIPlayerUtils.listAdjacent, listAttackable and isPathOkForQueen look their
+# answers up here.
+#
+# Cells are identified by (x, y) tuples.  Tables that are indexed by cell
+# number use cellIndex.
+#
+
+#Number of cells on the board
+NUM_CELLS = BOARD_LENGTH * BOARD_LENGTH
+
+##
+# cellIndex
+#
+# converts an x,y coordinate to the number of its cell (row by row)
+#
+def cellIndex(coords):
+    return coords[1] * BOARD_LENGTH + coords[0]
+
+#the longest attack range of any ant
+MAX_RANGE = max(stats[RANGE] for stats in UNIT_STATS)
+
+#every coordinate on the board, in cellIndex order
+ALL_COORDS = tuple((x, y) for y in range(BOARD_LENGTH) for x in range(BOARD_LENGTH))
+
+##
+# onBoard
+#
+# Return: True if x, y is a cell on the board
+#
+def onBoard(x, y):
+    return 0 <= x < BOARD_LENGTH and 0 <= y < BOARD_LENGTH
+
+##
+# _adjacent
+#
+# Return: the on-board cells next to coord, in the order listAdjacent has
+# always returned them
+#
+def _adjacent(coord):
+    result = []
+    for delta in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        newX = coord[0] + delta[0]
+        newY = coord[1] + delta[1]
+        if onBoard(newX, newY):
+            result.append((newX, newY))
+    return tuple(result)
+
+##
+# _attackable
+#
+# Return: the on-board cells (other than coord) within taxicab distance dist
+# of coord, in the order listAttackable has always returned them
+#
+def _attackable(coord, dist):
+    result = []
+    for i in range(-dist, dist + 1):
+        yLen = dist - abs(i)
+        for j in range(-yLen, yLen + 1):
+            newCoord = (coord[0] + i, coord[1] + j)
+            if onBoard(newCoord[0], newCoord[1]) and newCoord != coord:
+                result.append(newCoord)
+    return tuple(result)
+
+
+#CELL_BITS[coords] - the bit of a cell in a board bitmask (1 << cellIndex)
+CELL_BITS = {coord : 1 << cellIndex(coord) for coord in ALL_COORDS}
+
+#ADJACENT[coords] - tuple of the cells next to coords
+ADJACENT = {coord : _adjacent(coord) for coord in ALL_COORDS}
+
+#ATTACKABLE[dist][coords] - tuple of the cells within dist of coords
+ATTACKABLE = [{coord : _attackable(coord, dist) for coord in ALL_COORDS}
+              for dist in range(MAX_RANGE + 1)]
+
+#bitmask of the cells a queen may enter (she must stay out of the two
+#middle rows of the board)
+QUEEN_CELLS = sum(CELL_BITS[coord] for coord in ALL_COORDS
+                  if coord[1] != BOARD_LENGTH // 2 - 1 and coord[1] != BOARD_LENGTH // 2)
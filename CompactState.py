@@ -0,0 +1,449 @@
+import os, sys, importlib, unittest
+from array import array
+from Constants import *
+from Ant import Ant, UNIT_STATS
+from Building import Building
+from Construction import Construction, CONSTR_STATS
+from Inventory import Inventory
+from Location import Location
+from GameState import GameState
+from BoardTables import ALL_COORDS, NUM_CELLS, cellIndex
+
+#
+# CompactState.py
+#
+# An array-backed representation of a GameState.  Every cell of the board is
+# stored as one slot in a handful of fixed-size typed arrays, so cloning a
+# state is a few flat copies of a hundred bytes each instead of rebuilding
+# 100 Location objects and every Ant/Building (see Benchmark.py, compactClone
+# against clone).
+#
+# The arrays are indexed by BoardTables.cellIndex.  The antType array doubles
+# as the occupancy map (NO_ANT means the cell is empty).
+#
+# A CompactState can be handed to the AIPlayerUtils helpers and to the
+# agents in place of a GameState.  They read it through a facade: the
+# inventories, board, antIndex and constrIndex attributes are those of an
+# ordinary GameState built from the arrays the first time one of them is
+# read (and again after the arrays change).  The facade is read-only -
+# changing its objects does not change the CompactState - so helpers that
+# make a new state from it (getNextState and the agents' own versions) start
+# with fastclone(), which returns an ordinary GameState, as does
+# toGameState().  applyMove/undoMove only work on GameStates.
+#
+
+#Value stored in the antType array for an empty cell
+NO_ANT = -1
+
+#Value stored in the constrType array for a cell without a construction
+NO_CONSTR = 0
+
+#Value stored in the constrHealth array for unowned constructions
+NO_HEALTH = -1
+
+
+##
+#CompactState
+#
+#Description: A compact, array-backed version of a GameState.
+#
+#Variables:
+#   antType      - ant type per cell (NO_ANT if the cell is empty)
+#   antOwner     - id of the player that owns the ant in each cell
+#   antHealth    - health of the ant in each cell
+#   antCarrying  - 1 if the ant in each cell is carrying food
+#   antMoved     - 1 if the ant in each cell has moved this turn
+#   antOrder     - creation order of each ant (keeps the inventory order)
+#   constrType   - construction type per cell (NO_CONSTR if there is none)
+#   constrOwner  - id of the player that owns each construction
+#   constrHealth - capture health of each building (NO_HEALTH if unowned)
+#   constrOrder  - creation order of each construction
+#   foodCounts   - [player one's food, player two's food]
+#   phase        - The current phase of the game.
+#   whoseTurn    - The ID of the Player who's turn it currently is.
+#   hashValue    - as in GameState (clones don't copy it)
+#   distanceTable - as in GameState (clones share it)
+##
+class CompactState(object):
+
+    ##
+    #__init__
+    #Description: Creates a new, empty CompactState
+    #
+    #Parameters:
+    #   inputPhase - The phase of the game (int)
+    #   inputTurn - The ID of the Player who's turn it is (int)
+    ##
+    def __init__(self, inputPhase = SETUP_PHASE_1, inputTurn = PLAYER_ONE):
+        self.antType = array('b', [NO_ANT]) * NUM_CELLS
+        self.antOwner = array('b', [0]) * NUM_CELLS
+        self.antHealth = array('b', [0]) * NUM_CELLS
+        self.antCarrying = array('b', [0]) * NUM_CELLS
+        self.antMoved = array('b', [0]) * NUM_CELLS
+        self.antOrder = array('H', [0]) * NUM_CELLS
+        self.constrType = array('b', [NO_CONSTR]) * NUM_CELLS
+        self.constrOwner = array('b', [0]) * NUM_CELLS
+        self.constrHealth = array('b', [NO_HEALTH]) * NUM_CELLS
+        self.constrOrder = array('H', [0]) * NUM_CELLS
+        self.foodCounts = [0, 0]
+        self.phase = inputPhase
+        self.whoseTurn = inputTurn
+        self.hashValue = None
+        self.distanceTable = None
+        self.nextOrder = 1
+        self._facade = None
+
+    ##
+    #fromGameState
+    #Description: Builds a CompactState from a GameState.  Only the
+    #   inventories are read so this is safe for fastclone()d states.
+    #
+    #Parameters:
+    #   state - the GameState to convert
+    #
+    #Return: a new CompactState
+    ##
+    @staticmethod
+    def fromGameState(state):
+        compact = CompactState(state.phase, state.whoseTurn)
+        for inv in state.inventories:
+            for constr in inv.constrs:
+                health = None
+                if type(constr) is Building:
+                    health = constr.captureHealth
+                compact.addConstr(constr.coords, constr.type, inv.player, health)
+            for ant in inv.ants:
+                compact.addAnt(ant.coords, ant.type, ant.player,
+                               ant.health, ant.carrying, ant.hasMoved)
+        compact.foodCounts[PLAYER_ONE] = state.inventories[PLAYER_ONE].foodCount
+        compact.foodCounts[PLAYER_TWO] = state.inventories[PLAYER_TWO].foodCount
+        compact.distanceTable = getattr(state, 'distanceTable', None)
+        return compact
+
+    ##
+    #clone
+    #Description: Returns a deep copy of itself
+    #
+    #Return: The CompactState identical to the original
+    ##
+    def clone(self):
+        newState = CompactState.__new__(CompactState)
+        newState.antType = self.antType[:]
+        newState.antOwner = self.antOwner[:]
+        newState.antHealth = self.antHealth[:]
+        newState.antCarrying = self.antCarrying[:]
+        newState.antMoved = self.antMoved[:]
+        newState.antOrder = self.antOrder[:]
+        newState.constrType = self.constrType[:]
+        newState.constrOwner = self.constrOwner[:]
+        newState.constrHealth = self.constrHealth[:]
+        newState.constrOrder = self.constrOrder[:]
+        newState.foodCounts = self.foodCounts[:]
+        newState.phase = self.phase
+        newState.whoseTurn = self.whoseTurn
+        newState.hashValue = None
+        newState.distanceTable = self.distanceTable
+        newState.nextOrder = self.nextOrder
+        newState._facade = None
+        return newState
+
+    ##
+    #fastclone
+    #Description: Returns an ordinary GameState without a board (see
+    #   GameState.fastclone), which the caller is free to change.  This is
+    #   how the AIPlayerUtils helpers and the agents make the next state.
+    #
+    #Parameters:
+    #   withIndex - if True, the coordinate indexes of the copy are built
+    ##
+    def fastclone(self, withIndex = False):
+        newState = self.toGameState(False)
+        if withIndex:
+            newState.buildIndex()
+        return newState
+
+    ##
+    #coordLookup
+    #Description: Returns the appropriate coordinates for the given
+    #   player to allow both players to play from top of the board.
+    #
+    #Return: Correct coordinate location for player
+    ##
+    def coordLookup(self, coords, playerId):
+        if coords == None or playerId == None:
+            return None
+
+        if playerId == PLAYER_ONE:
+            return coords
+        else:
+            return (BOARD_LENGTH - 1 - coords[0], BOARD_LENGTH - 1 - coords[1])
+
+    ##
+    #addAnt
+    #Description: Puts a new ant on the board.  Any ant already in the
+    #   cell is replaced.
+    #
+    #Parameters:
+    #   coords - where to put the ant
+    #   antType - the type of ant (see Constants.py)
+    #   player - the id of the player that owns the ant
+    #   health - the ant's health (defaults to full health)
+    #   carrying - whether the ant is carrying food
+    #   hasMoved - whether the ant has moved this turn
+    ##
+    def addAnt(self, coords, antType, player, health = None, carrying = False, hasMoved = False):
+        if health is None:
+            health = UNIT_STATS[antType][HEALTH]
+        index = cellIndex(coords)
+        self.antType[index] = antType
+        self.antOwner[index] = player
+        self.antHealth[index] = health
+        self.antCarrying[index] = 1 if carrying else 0
+        self.antMoved[index] = 1 if hasMoved else 0
+        self.antOrder[index] = self.nextOrder
+        self.nextOrder += 1
+        self._changed()
+
+    ##
+    #removeAnt
+    #Description: Removes the ant (if any) from the given cell
+    ##
+    def removeAnt(self, coords):
+        index = cellIndex(coords)
+        self.antType[index] = NO_ANT
+        self.antOrder[index] = 0
+        self._changed()
+
+    ##
+    #moveAnt
+    #Description: Moves the ant at src to dst.  The caller is responsible
+    #   for making sure the move is legal.
+    ##
+    def moveAnt(self, src, dst):
+        if src == dst:
+            return
+        srcIndex = cellIndex(src)
+        dstIndex = cellIndex(dst)
+        self.antType[dstIndex] = self.antType[srcIndex]
+        self.antOwner[dstIndex] = self.antOwner[srcIndex]
+        self.antHealth[dstIndex] = self.antHealth[srcIndex]
+        self.antCarrying[dstIndex] = self.antCarrying[srcIndex]
+        self.antMoved[dstIndex] = self.antMoved[srcIndex]
+        self.antOrder[dstIndex] = self.antOrder[srcIndex]
+        self.antType[srcIndex] = NO_ANT
+        self.antOrder[srcIndex] = 0
+        self._changed()
+
+    ##
+    #addConstr
+    #Description: Puts a new construction on the board
+    #
+    #Parameters:
+    #   coords - where to put the construction
+    #   constrType - the type of construction (see Constants.py)
+    #   player - the id of the player that owns it (NEUTRAL for grass/food)
+    #   captureHealth - capture health of a building (defaults to full)
+    ##
+    def addConstr(self, coords, constrType, player, captureHealth = None):
+        if captureHealth is None:
+            captureHealth = CONSTR_STATS[constrType][CAP_HEALTH]
+        if captureHealth is None:
+            captureHealth = NO_HEALTH
+        index = cellIndex(coords)
+        self.constrType[index] = constrType
+        self.constrOwner[index] = player
+        self.constrHealth[index] = captureHealth
+        self.constrOrder[index] = self.nextOrder
+        self.nextOrder += 1
+        self._changed()
+        self.distanceTable = None
+
+    ##
+    #isOccupied
+    #Description: Returns True if there is an ant at the given coords
+    ##
+    def isOccupied(self, coords):
+        return self.antType[cellIndex(coords)] != NO_ANT
+
+    ##
+    #getMoveCost
+    #Description: Returns the movement cost of entering the given cell
+    ##
+    def getMoveCost(self, coords):
+        constrType = self.constrType[cellIndex(coords)]
+        if constrType == NO_CONSTR:
+            return 1
+        return CONSTR_STATS[constrType][MOVE_COST]
+
+    ##
+    #setAntAttr
+    #Description: Updates health/carrying/hasMoved for the ant at coords.
+    #   Parameters left as None are unchanged.  An ant whose health drops
+    #   to zero or below is removed.
+    ##
+    def setAntAttr(self, coords, health = None, carrying = None, hasMoved = None):
+        index = cellIndex(coords)
+        if health is not None:
+            if health <= 0:
+                self.removeAnt(coords)
+                return
+            self.antHealth[index] = health
+        if carrying is not None:
+            self.antCarrying[index] = 1 if carrying else 0
+        if hasMoved is not None:
+            self.antMoved[index] = 1 if hasMoved else 0
+        self._changed()
+
+    ##
+    #toGameState
+    #Description: Builds an ordinary GameState equivalent to this
+    #   CompactState
+    #
+    #Parameters:
+    #   withBoard - False to leave the board out (like fastclone())
+    ##
+    def toGameState(self, withBoard = True):
+        inventories = self._buildInventories()
+        board = None
+        if withBoard:
+            board = [[Location((col, row)) for row in range(BOARD_LENGTH)]
+                     for col in range(BOARD_LENGTH)]
+            for inv in inventories:
+                for constr in inv.constrs:
+                    board[constr.coords[0]][constr.coords[1]].constr = constr
+                for ant in inv.ants:
+                    board[ant.coords[0]][ant.coords[1]].ant = ant
+        state = GameState(board, inventories, self.phase, self.whoseTurn)
+        state.distanceTable = self.distanceTable
+        return state
+
+    ##
+    #inventories, board, antIndex, constrIndex
+    #Description: the read-only facade (see the top of this file)
+    ##
+    @property
+    def inventories(self):
+        return self._getFacade().inventories
+
+    @property
+    def board(self):
+        return self._getFacade().board
+
+    @property
+    def antIndex(self):
+        return self._getFacade().antIndex
+
+    @property
+    def constrIndex(self):
+        return self._getFacade().constrIndex
+
+    def _getFacade(self):
+        if self._facade is None:
+            self._facade = self.toGameState()
+            self._facade.buildIndex()
+        return self._facade
+
+    # the arrays changed: the facade and hash no longer describe them
+    def _changed(self):
+        self._facade = None
+        self.hashValue = None
+
+    ##
+    # builds the Inventory objects, keeping ants and constructions in the
+    # order they were added
+    def _buildInventories(self):
+        ants = ([], [], [])
+        constrs = ([], [], [])
+        antType = self.antType
+        constrType = self.constrType
+        for index in range(NUM_CELLS):
+            if constrType[index] != NO_CONSTR:
+                owner = self.constrOwner[index]
+                coords = ALL_COORDS[index]
+                if constrType[index] == ANTHILL or constrType[index] == TUNNEL:
+                    constr = Building(coords, constrType[index], owner, self.constrHealth[index])
+                else:
+                    constr = Construction(coords, constrType[index])
+                constrs[owner].append((self.constrOrder[index], constr))
+            if antType[index] != NO_ANT:
+                owner = self.antOwner[index]
+                ant = Ant(ALL_COORDS[index], antType[index], owner)
+                ant.health = self.antHealth[index]
+                ant.carrying = self.antCarrying[index] == 1
+                ant.hasMoved = self.antMoved[index] == 1
+                ants[owner].append((self.antOrder[index], ant))
+
+        def ordered(items):
+            items.sort(key=lambda item: item[0])
+            return [item[1] for item in items]
+
+        return [Inventory(PLAYER_ONE, ordered(ants[PLAYER_ONE]),
+                          ordered(constrs[PLAYER_ONE]), self.foodCounts[PLAYER_ONE]),
+                Inventory(PLAYER_TWO, ordered(ants[PLAYER_TWO]),
+                          ordered(constrs[PLAYER_TWO]), self.foodCounts[PLAYER_TWO]),
+                Inventory(NEUTRAL, [], ordered(constrs[NEUTRAL]), 0)]
+
+
+##
+# test_compactState
+#
+# python -m unittest CompactState
+#
+class test_compactState(unittest.TestCase):
+
+    # (GameState, CompactState) pairs of seeded mid-game states
+    def states(self):
+        from Benchmark import buildCorpus
+        return [(state, CompactState.fromGameState(state))
+                for state in buildCorpus(games = 3, every = 10)]
+
+    def testRoundTrip(self):
+        from Serialization import encodeState
+        for state, compact in self.states():
+            self.assertEqual(encodeState(compact.toGameState()), encodeState(state))
+            self.assertEqual(encodeState(compact.clone().fastclone()), encodeState(state.fastclone()))
+            self.assertEqual(encodeState(compact), encodeState(state))
+
+    def testCloneIsIndependent(self):
+        state, compact = self.states()[0]
+        copy = compact.clone()
+        ant = state.inventories[state.whoseTurn].ants[0]
+        copy.setAntAttr(ant.coords, health = 0)
+        self.assertIsNone(getattr(copy, 'antIndex').get(ant.coords))
+        self.assertIsNotNone(compact.antIndex.get(ant.coords))
+
+    def testHelpersAgree(self):
+        from AIPlayerUtils import listAllLegalMoves, getNextState, getNextStateAdversarial, \
+            getWinner, stepsToReach
+        from TranspositionTable import moveKey
+        from Serialization import encodeState
+        from Zobrist import stateHash
+        for state, compact in self.states():
+            moves = listAllLegalMoves(state)
+            self.assertEqual([moveKey(move) for move in listAllLegalMoves(compact)],
+                             [moveKey(move) for move in moves])
+            self.assertEqual(stateHash(compact), stateHash(state))
+            self.assertEqual(getWinner(compact), getWinner(state))
+            for ant in compact.inventories[compact.whoseTurn].ants:
+                self.assertEqual(stepsToReach(compact, ant.coords, (0, 0)), stepsToReach(state, ant.coords, (0, 0)))
+            for move in moves:
+                self.assertEqual(encodeState(getNextState(compact, move)), encodeState(getNextState(state, move)))
+                self.assertEqual(encodeState(getNextStateAdversarial(compact, move, True)),
+                                 encodeState(getNextStateAdversarial(state, move, True)))
+
+    def testAgentsPlayIt(self):
+        from AIPlayerUtils import listAllLegalMoves
+        from TranspositionTable import moveKey
+        aiDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "AI")
+        if aiDir not in sys.path:
+            sys.path.insert(0, aiDir)
+        agent = importlib.import_module("Max_schutten19_apenesj20").AIPlayer(PLAYER_ONE)
+        agent.depth_limit = 2
+        for state, compact in self.states()[::4]:
+            move = agent.getMove(compact)
+            self.assertIn(moveKey(move), [moveKey(legal) for legal in listAllLegalMoves(compact)])
+            agent.resetSearch()
+
+
+if __name__ == '__main__':
+    unittest.main()
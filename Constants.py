@@ -45,6 +45,8 @@ MOVE_ANT = 0
 BUILD = 1
 END = 2
 UNDO = 3
+#a whole turn of moves, only made inside searches (see MacroMoves.py)
+MACRO = 4
 
 #Indices into unit stats
 MOVEMENT = 0
@@ -87,6 +89,8 @@ def moveTypeToStr(type):
         return "BUILD"
     elif (type == END):
         return "END"
+    elif (type == MACRO):
+        return "MACRO"
     else:
         return "???"
     
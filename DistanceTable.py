@@ -0,0 +1,235 @@
+import random, pickle, unittest
+from collections import OrderedDict
+from Constants import *
+from Construction import Construction, CONSTR_STATS
+from BoardTables import ALL_COORDS, ADJACENT, NUM_CELLS, cellIndex
+
+#
+# DistanceTable.py
+#
+# The movement cost between every pair of cells on the board.  Moving into a
+# cell costs the movement cost of the construction there (grass costs more)
+# or 1 for an empty cell; ants are not obstacles.  Constructions do not move
+# once the setup phase is over, so the table for a game is computed once
+# (Game primes it when play starts) and AIPlayerUtils.stepsToReach looks its
+# answers up here.
+#
+# Tables are cached by the layout of the costly cells.  Once the play phase
+# starts a state keeps its table (GameState.distanceTable) and its clones
+# share it, so the layout is only worked out once per state handed to an
+# agent rather than on every lookup.
+#
+
+#number of layouts whose tables are kept.  Each game has two (player two
+#sees the board flipped), and Benchmark's corpus has CORPUS_GAMES of them; a
+#table is about 80KB.
+CACHE_SIZE = 64
+
+#TAXICAB[cellIndex(src) * NUM_CELLS + cellIndex(dst)] - the cost between two
+#cells for an ant that ignores grass (every step costs 1 and ants are not
+#obstacles, so this is the same for every game)
+TAXICAB = [abs(src[0] - dst[0]) + abs(src[1] - dst[1])
+           for src in ALL_COORDS for dst in ALL_COORDS]
+
+
+##
+#DistanceTable
+#Description: All-pairs movement costs for one layout of constructions
+#
+#Variables:
+#   costs - list of the cost of stepping into each cell (by cellIndex)
+#   key - the layoutKey of the costs
+#   distances - flat list; distances[cellIndex(src) * NUM_CELLS +
+#       cellIndex(dst)] is the cost of the cheapest path from src to dst
+##
+class DistanceTable(object):
+
+    ##
+    #__init__
+    #Description: Computes the table with one Dijkstra search per cell.
+    #   Steps cost between 1 and the highest construction cost, so each search
+    #   keeps a bucket of cells for each total cost.
+    #
+    #Parameters:
+    #   costs - the cost of stepping into each cell, indexed by cellIndex
+    ##
+    def __init__(self, costs):
+        self.costs = list(costs)
+        self.key = tuple((cell, cost) for cell, cost in enumerate(self.costs) if cost != 1)
+        adjacent = [[cellIndex(coord) for coord in ADJACENT[coords]] for coords in ALL_COORDS]
+        distances = []
+        for src in range(NUM_CELLS):
+            dist = [-1] * NUM_CELLS
+            dist[src] = 0
+            buckets = [[src]]
+            cost = 0
+            while cost < len(buckets):
+                for cell in buckets[cost]:
+                    if dist[cell] != cost:
+                        continue
+                    for newCell in adjacent[cell]:
+                        newCost = cost + costs[newCell]
+                        if dist[newCell] == -1 or newCost < dist[newCell]:
+                            dist[newCell] = newCost
+                            while len(buckets) <= newCost:
+                                buckets.append([])
+                            buckets[newCost].append(newCell)
+                cost += 1
+            distances.extend(dist)
+        self.distances = distances
+
+    ##
+    #steps
+    #
+    #Parameters:
+    #   src - the starting cell (an on-board x,y tuple)
+    #   dst - the destination cell (an on-board x,y tuple)
+    #   ignoresGrass - if True every step costs 1
+    #
+    #Return: the cost of the cheapest path from src to dst
+    ##
+    def steps(self, src, dst, ignoresGrass = False):
+        index = cellIndex(src) * NUM_CELLS + cellIndex(dst)
+        if ignoresGrass:
+            return TAXICAB[index]
+        return self.distances[index]
+
+    ##
+    #__reduce__
+    #Description: Pickles a table by its layout, so states sent to other
+    #   processes (see ParallelSearch.py) don't carry every distance along;
+    #   the other end looks the table up in its own cache.
+    ##
+    def __reduce__(self):
+        return (_tableFor, (self.key,))
+
+
+##
+# layoutKey
+#
+# Return: a hashable description of the cells of a state whose movement cost
+# is not 1 (the first construction found in a cell decides its cost)
+#
+def layoutKey(state):
+    seen = set()
+    key = []
+    for inv in state.inventories:
+        for constr in inv.constrs:
+            if constr.coords in seen:
+                continue
+            seen.add(constr.coords)
+            cost = CONSTR_STATS[constr.type][MOVE_COST]
+            if cost != 1:
+                key.append((cellIndex(constr.coords), cost))
+    key.sort()
+    return tuple(key)
+
+
+#tables already computed, by layoutKey
+_tables = OrderedDict()
+
+##
+# _tableFor
+#
+# Return: the DistanceTable for a layoutKey, computing it the first time the
+# layout is seen
+#
+def _tableFor(key):
+    table = _tables.get(key)
+    if table is None:
+        costs = [1] * NUM_CELLS
+        for cell, cost in key:
+            costs[cell] = cost
+        table = DistanceTable(costs)
+        _tables[key] = table
+        while len(_tables) > CACHE_SIZE:
+            _tables.popitem(last=False)
+    else:
+        _tables.move_to_end(key)
+    return table
+
+##
+# getDistanceTable
+#
+# returns the DistanceTable for the constructions of a state, keeping it on
+# play phase states (see GameState.distanceTable)
+#
+# Parameters:
+#   state - a GameState (only the inventories are used)
+#
+# Return: the DistanceTable
+#
+def getDistanceTable(state):
+    table = getattr(state, "distanceTable", None)
+    if table is None:
+        table = _tableFor(layoutKey(state))
+        if state.phase == PLAY_PHASE:
+            state.distanceTable = table
+    return table
+
+##
+# primeDistanceTable
+#
+# computes the table for a game ahead of time so the first player to ask for
+# a distance doesn't pay for it.  Called by Game when the play phase starts.
+#
+def primeDistanceTable(state):
+    getDistanceTable(state)
+
+
+##
+# test_distanceTable
+#
+# python -m unittest DistanceTable
+#
+class test_distanceTable(unittest.TestCase):
+
+    # a play phase state with grass in random cells
+    def randomState(self, rnd):
+        from GameState import GameState
+        state = GameState.getBlankState()
+        cells = rnd.sample(ALL_COORDS, 18)
+        state.inventories[NEUTRAL].constrs = [Construction(coords, GRASS) for coords in cells]
+        state.phase = PLAY_PHASE
+        return state
+
+    def testMixedLayoutsStayWarm(self):
+        # more layouts than Benchmark's corpus, visited in turn by fresh states
+        _tables.clear()
+        seeds = range(2 * 12)
+        tables = [getDistanceTable(self.randomState(random.Random(seed))) for seed in seeds]
+        for i in range(3):
+            for seed, table in zip(seeds, tables):
+                self.assertIs(getDistanceTable(self.randomState(random.Random(seed))), table)
+        self.assertEqual(len(_tables), len(tables))
+
+    def testStateKeepsTable(self):
+        state = self.randomState(random.Random(1))
+        table = getDistanceTable(state)
+        self.assertIs(state.distanceTable, table)
+        self.assertIs(state.fastclone().distanceTable, table)
+        self.assertIs(state.clone().distanceTable, table)
+        self.assertIs(pickle.loads(pickle.dumps(state)).distanceTable, table)
+        # player two sees another layout
+        flipped = state.clone()
+        flipped.flipBoard()
+        self.assertIsNone(flipped.distanceTable)
+        self.assertEqual(getDistanceTable(flipped).key, layoutKey(flipped))
+
+    def testSetupStateNotKept(self):
+        state = self.randomState(random.Random(2))
+        state.phase = SETUP_PHASE_1
+        getDistanceTable(state)
+        self.assertIsNone(state.distanceTable)
+
+    def testSteps(self):
+        state = self.randomState(random.Random(3))
+        table = getDistanceTable(state)
+        grass = state.inventories[NEUTRAL].constrs[0].coords
+        for coords in ADJACENT[grass]:
+            self.assertEqual(table.steps(coords, grass), 2)
+            self.assertEqual(table.steps(coords, grass, True), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
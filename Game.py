@@ -21,6 +21,14 @@ import functools
 from functools import partial
 import copy
 import InfoScraper as Is
+from DistanceTable import primeDistanceTable
+import Tournament
+import ParallelSearch
+import IterativeDeepening
+import MacroMoves
+from AIProcess import AIProcess, AITimeoutError
+from GameStats import GameStats
+from GameRecorder import GameRecorder
 
 
 class GameData:
@@ -40,7 +48,7 @@ class Game(object):
     # Description: Initializes the game's attributes and UI.
     #
     ##
-    def __init__(self, testing=False):
+    def __init__(self, testing=False, commandLine=True):
         self.last_time = time.time()
         self.waitCond = threading.Condition()
 
@@ -73,6 +81,9 @@ class Game(object):
         self.restarted = False
         self.restartGameList = None
         self.parser_args = {}
+        self.headless = False
+        self.processes = 1
+        self.UI = None
 
         # Initializes tournament mode variables
         self.playerScores = []  # [[author,wins,losses], ...]
@@ -85,6 +96,15 @@ class Game(object):
         self.playersReversed = False  # whether the players are currently swapped
         self.timeoutOn       = False
         self.timeout_limit   = 1
+        self.isolateAIs      = False  # run each AI in its own worker process
+        self.aiProcesses     = {}     # {AIPlayer : its AIProcess}
+        self.stats           = GameStats()  # agent latencies and search counters
+        self.statsPath       = None   # file to write self.stats to when the games are done
+        self.seed            = None   # games are seeded from this when it is set
+        self.gamesStarted    = 0      # number of games set up (numbers the game seeds)
+        self.gameSeed        = None   # the seed of the current game
+        self.recorder        = None   # GameRecorder of the games, when they are recorded
+        self.recordPath      = None   # file to write the recordings to when the games are done
         self.autorestart     = False
         self.pauseOnStart    = False
         self.pauseConditions = []
@@ -96,7 +116,14 @@ class Game(object):
         self.antUnitStatsInfo = Is.getAntStats()
         self.loadAIs()
         self.playerNamesCheckList = [ai[0].author for ai in self.players]
+        # games run by a Tournament worker don't come from the command line
+        if not commandLine:
+            return
         self.processCommandLine()
+        # headless mode plays the command line games without a GUI and exits
+        if self.headless:
+            self.runHeadless()
+            return
         # setup GUI
         # this has to be done in the main thread because Tkinter is dumb
         if testing:
@@ -182,7 +209,7 @@ class Game(object):
                 print('    "' + player[0].author + '"')
             # Assume if we got here it was a command line argument because the gui
             # is populated from the AI list
-            self.UI.onClose()
+            self.closeOnError()
             # sys.exit(0)
 
         self.gamesToPlayLock.acquire()
@@ -225,7 +252,7 @@ class Game(object):
                 print('    "' + player[0].author + '"')
             # Assume if we got here it was a command line argument because the gui
             # is populated from the AI list
-            self.UI.onClose()
+            self.closeOnError()
             # sys.exit(0)
 
         self.gamesToPlayLock.acquire()
@@ -261,7 +288,7 @@ class Game(object):
                     print('    "' + thisPlayer[0].author + '"')
                 # Assume if we got here it was a command line argument because the gui
                 # is populated from the AI list
-                self.UI.onClose()
+                self.closeOnError()
                 # sys.exit(0)
 
         # now that we have the AI's make all pairs
@@ -314,7 +341,7 @@ class Game(object):
                 print('    "' + thisPlayer[0].author + '"')
             # Assume if we got here it was a command line argument because the gui
             # is populated from the AI list
-            self.UI.onClose()
+            self.closeOnError()
             # sys.exit(0)
 
         # get named AI
@@ -351,7 +378,7 @@ class Game(object):
                 print('    "' + thisPlayer[0].author + '"')
             # Assume if we got here it was a command line argument because the gui
             # is populated from the AI list
-            self.UI.onClose()
+            self.closeOnError()
             # sys.exit(0)
 
         # get original agent
@@ -369,11 +396,38 @@ class Game(object):
         self.gamesToPlayLock.release()
         self.generalWake()
 
+    ##
+    # closeOnError
+    #
+    # Description: Shuts down after a bad command line argument, closing the
+    #              GUI if there is one
+    #
+    ##
+    def closeOnError(self):
+        if self.UI is not None:
+            self.UI.onClose()
+        else:
+            sys.exit(1)
+
     def postProcessCommandLine(self):
         # graphics
         if self.ee_seasonal:
             self.UI.setSeasonalGraphics()
         # games
+        self.queueCommandLineGames()
+        if self.parser_args["RR"] or self.parser_args["RRall"] or self.parser_args["self"] or self.parser_args["all"] or \
+                self.parser_args["twoP"]:
+            self.UI.showFrame(2)
+            self.UI.statsHandler.timeLabel.Reset()
+            self.UI.statsHandler.timeLabel.Start()
+
+    ##
+    # queueCommandLineGames
+    #
+    # Description: Adds the games asked for on the command line to the game queue
+    #
+    ##
+    def queueCommandLineGames(self):
         if self.parser_args["twoP"]:
             if "human" == self.parser_args["players"][0].lower():
                 self.startHumanVsAI(self.parser_args["players"][1])
@@ -390,11 +444,6 @@ class Game(object):
             self.startAllOther(self.parser_args["numgames"], self.parser_args["players"][0])
         elif self.parser_args["self"]:
             self.startSelf(self.parser_args["numgames"], self.parser_args["players"][0])
-        if self.parser_args["RR"] or self.parser_args["RRall"] or self.parser_args["self"] or self.parser_args["all"] or \
-                self.parser_args["twoP"]:
-            self.UI.showFrame(2)
-            self.UI.statsHandler.timeLabel.Reset()
-            self.UI.statsHandler.timeLabel.Start()
 
     ##
     # processCommandLine
@@ -416,9 +465,17 @@ class Game(object):
     #           Useful Command Flags:
     #           -v >> Verbose print out game records to console
     #           -h >> Print the command option help page
+    #           --headless >> Play the games without the GUI and print the scores
+    #           -j >> Number of processes to play headless games on
+    #           --timeout >> Seconds an AI has to make each move
+    #           --isolate >> Run each AI in its own process (so timeouts can stop it)
+    #           --stats >> Write agent timings and search counters to a .json or .csv file
+    #           --seed >> Seed the random numbers so the games can be played again
+    #           --record >> Write a recording of every game to a file (see GameRecorder.py)
     #
     #           Example:
     #           python Game.py --2P -p <AIName1> <AIName2> -n <number of games>
+    #           python Game.py --headless --RRall -n <number of games> -j <number of processes>
     #
     ##
     def processCommandLine(self):
@@ -448,6 +505,30 @@ class Game(object):
                             help='February, March, October, December')
         parser.add_argument('-r', '--rules', action='store_true', dest='rules_request', default=False,
                             help='print the rules for the game (includes unit stats, hot keys...)')
+        parser.add_argument('--headless', action='store_true', dest='headless', default=False,
+                            help='play the games without the GUI, then print the scores and exit')
+        parser.add_argument('-j', '--processes', metavar='PROCESSES', type=int, dest='processes', default=1,
+                            help='number of processes to play headless games on (default 1)')
+        parser.add_argument('--timeout', metavar='SECONDS', type=float, dest='timeout', default=None,
+                            help='an AI that takes longer than this to make a move loses')
+        parser.add_argument('--isolate', action='store_true', dest='isolate', default=False,
+                            help='run each AI in its own process, which is killed and restarted if it times out')
+        parser.add_argument('--stats', metavar='FILE', type=str, dest='stats', default=None,
+                            help='when the games are done, write how long each agent took per call and how much it '
+                                 'searched to FILE (CSV if it ends in .csv, JSON otherwise)')
+        parser.add_argument('--seed', metavar='SEED', type=int, dest='seed', default=None,
+                            help='seed the random numbers (game N is seeded with SEED + N) so runs can be repeated')
+        parser.add_argument('--record', metavar='FILE', type=str, dest='record', default=None,
+                            help='when the games are done, write every placement, move and attack to FILE')
+        parser.add_argument('--search-processes', metavar='PROCESSES', type=int, dest='searchProcesses',
+                            default=None, help='number of processes each AI that supports it splits its search '
+                                               'over (not with -j or --isolate)')
+        parser.add_argument('--move-time', metavar='SECONDS', type=float, dest='moveTime', default=None,
+                            help='seconds each AI that supports it searches per move, going deeper while time '
+                                 'is left (default: half the --timeout, if there is one)')
+        parser.add_argument('--macro-moves', action='store_true', dest='macroMoves', default=False,
+                            help='each AI that supports it searches whole turns as single moves instead of '
+                                 'one ant at a time (each ply is a whole turn, so best with --move-time)')
 
         args = parser.parse_args()
         self.parser_args["numgames"] = args.numgames
@@ -476,6 +557,60 @@ class Game(object):
             self.ee_seasonal = True
         if (args.RR or args.RRall or args.self or args.all or args.twoP) and args.numgames is None:
             parser.error('Flags not valid without number of games (-n)')
+        if args.headless:
+            if not (args.RR or args.RRall or args.self or args.all or args.twoP):
+                parser.error('Headless mode needs a game type (--RR, --RRall, --self, --all or --2p)')
+            if args.players is not None and 'human' in [p.lower() for p in args.players]:
+                parser.error('Human not allowed in headless mode')
+            self.headless = True
+        if args.processes < 1:
+            parser.error('Processes must be a positive number')
+        if args.processes > 1 and not args.headless:
+            parser.error('Multiple processes are only supported in headless mode (--headless)')
+        self.processes = args.processes
+        if args.timeout is not None:
+            if args.timeout <= 0:
+                parser.error('Timeout must be a positive number of seconds')
+            self.timeoutOn = True
+            self.timeout_limit = args.timeout
+        if args.isolate:
+            if args.processes > 1:
+                parser.error('Isolated AIs (--isolate) can not be used with multiple processes (-j)')
+            self.isolateAIs = True
+        self.statsPath = args.stats
+        if args.searchProcesses is not None:
+            if args.searchProcesses < 1:
+                parser.error('Search processes must be a positive number')
+            # for the AIs created from now on (copies, reloads) and those already loaded
+            ParallelSearch.setDefaultProcesses(args.searchProcesses)
+            for player in self.players:
+                if hasattr(player[0], "searchProcesses"):
+                    player[0].searchProcesses = args.searchProcesses
+        moveTime = args.moveTime
+        if moveTime is not None and moveTime <= 0:
+            parser.error('Move time must be a positive number of seconds')
+        if moveTime is None and args.timeout is not None:
+            # leave the AIs time to spare under the limit
+            moveTime = args.timeout / 2
+        if moveTime is not None:
+            IterativeDeepening.setDefaultMoveTime(moveTime)
+            for player in self.players:
+                if hasattr(player[0], "moveTime"):
+                    player[0].moveTime = moveTime
+        if args.macroMoves:
+            MacroMoves.setDefaultMacroMoves(True)
+            for player in self.players:
+                if hasattr(player[0], "macroMoves"):
+                    player[0].macroMoves = True
+        if args.seed is not None:
+            self.seed = args.seed
+            # load the AIs again so anything random they set up when created
+            # (e.g., network weights) comes from the seed too
+            random.seed(args.seed)
+            self.loadAIs()
+        if args.record is not None:
+            self.recordPath = args.record
+            self.recorder = GameRecorder()
         if args.twoP:
             if len(args.players) != 2:
                 parser.error('Only two agents allowed')
@@ -661,6 +796,9 @@ class Game(object):
 
             self.UI.statsHandler.stopCurLogItem(True)
 
+            if len(self.gamesToPlay) == 0:
+                self.writeStats()
+
             if len(self.gamesToPlay) == 0 and self.autorestart:
                 # self.UI.restartPressed()
                 self.restarted = True
@@ -676,7 +814,60 @@ class Game(object):
 
             
 
-    def setup(self, game, count):
+    ##
+    # runHeadless
+    # Description: Plays every queued game without a GUI.  Used for large
+    #       tournaments on machines without a display.  With more than one
+    #       process the games are shared out by Tournament.runTournament.
+    #
+    # Return: the tournament score table (string), which is also printed
+    #
+    ##
+    def runHeadless(self):
+        self.queueCommandLineGames()
+
+        if self.processes > 1:
+            Tournament.runTournament(self, self.processes)
+
+        while len(self.gamesToPlay) > 0:
+            game = self.gamesToPlay.pop(0)
+            self.hasHumanPlayer = False
+
+            self.currentPlayerScores = []
+            self.currentPlayerScores.append([self.truncateName(game.p1.author, 24), 0, 0])
+            self.currentPlayerScores.append([self.truncateName(game.p2.author, 24), 0, 0])
+
+            for j in range(game.n):
+                self.setup(game, j)
+                self.runGame()
+                self.errored = False
+                self.resolveEndGame()
+                if self.verbose: print(self.tournamentStr(True), "\n")
+
+        self.closeAIProcesses()
+        self.writeStats()
+        self.printTournament()
+        return self.tournamentStr(False)
+
+    ##
+    # setup
+    #
+    # Description: Gets ready to play a game
+    #
+    # Parameters:
+    #   game - the GameData of the match being played
+    #   count - the number of games of the match already played
+    #   seed - the random seed of the game; if None and the Game has a seed,
+    #          the seed is the Game's seed plus the number of games set up
+    #
+    def setup(self, game, count, seed = None):
+        if seed is None and self.seed is not None:
+            seed = self.seed + self.gamesStarted
+        self.gamesStarted += 1
+        self.gameSeed = seed
+        if seed is not None:
+            random.seed(seed)
+
         self.state = GameState.getBlankState()
         self.state.phase = SETUP_PHASE_1
 
@@ -691,10 +882,58 @@ class Game(object):
             self.currentPlayers = self.currentPlayers[::-1]
             self.flipped = True
 
+        # AIs play through their worker processes when isolated
+        if self.isolateAIs:
+            self.currentPlayers = [self.getAIProcess(p) for p in self.currentPlayers]
+            if seed is not None:
+                for player in self.currentPlayers:
+                    if isinstance(player, AIProcess):
+                        player.seedRandom(seed)
+
+        if self.recorder is not None:
+            self.recorder.startGame([p.author for p in self.currentPlayers], seed)
+
         self.gameOver = False
         self.winner = None
         self.loser = None
 
+    ##
+    # getAIProcess
+    #
+    # Description: returns the AIProcess that runs the given AI, starting its
+    #              worker the first time the AI plays.  Humans are returned as is.
+    #
+    def getAIProcess(self, player):
+        if isinstance(player, HumanPlayer.HumanPlayer) or isinstance(player, AIProcess):
+            return player
+        if player not in self.aiProcesses:
+            self.aiProcesses[player] = AIProcess(player)
+        return self.aiProcesses[player]
+
+    ##
+    # closeAIProcesses
+    #
+    # Description: stops the worker processes of isolated AIs and of
+    #              parallel searches
+    #
+    def closeAIProcesses(self):
+        for aiProcess in self.aiProcesses.values():
+            aiProcess.close()
+        self.aiProcesses = {}
+        ParallelSearch.closePools()
+
+    ##
+    # writeStats
+    #
+    # Description: writes the agent statistics and the game recordings to
+    #              the files given on the command line, if there were any
+    #
+    def writeStats(self):
+        if self.statsPath is not None:
+            self.stats.write(self.statsPath)
+        if self.recordPath is not None:
+            self.recorder.write(self.recordPath)
+
     ##
     # kill
     #
@@ -785,7 +1024,10 @@ class Game(object):
                     targets += self.submittedSetup
                     self.submittedSetup = None
                 else:
-                    targets += currentPlayer.getPlacement(theState)
+                    answered, placement = self.callAI(currentPlayer, "getPlacement", theState)
+                    if not answered:
+                        return
+                    targets += placement
 
                 # only want to place as many targets as constructions to place
                 if len(targets) > len(constrsToPlace):
@@ -793,6 +1035,9 @@ class Game(object):
 
                 validPlace = self.isValidPlacement(constrsToPlace, targets)
                 if validPlace:
+                    if self.recorder is not None:
+                        self.recorder.recordPlacement([self.state.coordLookup(target, self.state.whoseTurn)
+                                                       for target in targets])
                     for target in targets:
                         # translate coords to match player
                         target = self.state.coordLookup(target, self.state.whoseTurn)
@@ -854,6 +1099,8 @@ class Game(object):
                                 p2inventory.foodCount = 1
                                 # change to play phase
                                 self.state.phase = PLAY_PHASE
+                                # grass no longer moves, so distances can be computed now
+                                primeDistanceTable(self.state)
 
                         # change player turn in state
                         self.state.whoseTurn = (self.state.whoseTurn + 1) % 2
@@ -863,10 +1110,11 @@ class Game(object):
                         # cause current player to lose game because AIs aren't allowed to make mistakes.
                         code = self.error(INVALID_PLACEMENT, targets, currentPlayer)
                         self.setWinner(1 - self.state.whoseTurn)
-                        self.UI.gameHandler.setInstructionText(code)
-                        # pause for the illegal move
-                        if self.pauseOnIllegalMove and not self.UI.paused:
-                            self.UI.pausePressed()
+                        if self.UI is not None:
+                            self.UI.gameHandler.setInstructionText(code)
+                            # pause for the illegal move
+                            if self.pauseOnIllegalMove and not self.UI.paused:
+                                self.UI.pausePressed()
 
             elif self.state.phase == PLAY_PHASE:
                 currentPlayer = self.currentPlayers[self.state.whoseTurn]
@@ -880,20 +1128,10 @@ class Game(object):
                     self.move = self.submittedMove
                     self.submittedMove = None
                 else:
-                    if self.timeoutOn:
-                        t = Thread(target=self.get_move, args=(currentPlayer, theState))
-                        t.daemon = True
-                        try:
-                            t.start()
-                            t.join(self.timeout_limit)
-                            if t.isAlive():
-                                raise Exception('function [get_move] timeout [%s seconds] exceeded!' % self.timeout_limit)
-                        except Exception as je:
-                            traceback.print_exc(limit=0)
-                            self.setWinner(1 - self.state.whoseTurn)
-                            return
-                    else:
-                        self.get_move(currentPlayer, theState)
+                    answered, self.move = self.callAI(currentPlayer, "getMove", theState)
+                    if not answered:
+                        return
+                    self.stats.recordSearch(currentPlayer)
 
                 if self.move != None and self.move.coordList != None:
                     for i in range(0, len(self.move.coordList)):
@@ -905,6 +1143,9 @@ class Game(object):
 
                 # complete the move if valid
                 if validMove:
+                    # (an UNDO is recorded only when there is a move to take back)
+                    if self.recorder is not None and (self.move.moveType != UNDO or len(self.undoStates) > 0):
+                        self.recorder.recordMove(self.move)
                     # check move type
                     if self.move.moveType == MOVE_ANT:
                         # record state in undo before applying move
@@ -932,6 +1173,8 @@ class Game(object):
                         # check and take action for attack (workers can not attack)
                         if antToMove.type != WORKER:
                             self.resolveAttack(antToMove, currentPlayer)
+                            if self.gameOver:
+                                return
 
                     elif self.move.moveType == BUILD:
                         # record state in undo before applying move
@@ -992,8 +1235,9 @@ class Game(object):
                         self.state.whoseTurn = (self.state.whoseTurn + 1) % 2
 
                         # notify player which AI is acting
-                        nextPlayerName = self.currentPlayers[self.state.whoseTurn].author
-                        self.UI.gameHandler.setInstructionText(nextPlayerName + "'s turn.")
+                        if self.UI is not None:
+                            nextPlayerName = self.currentPlayers[self.state.whoseTurn].author
+                            self.UI.gameHandler.setInstructionText(nextPlayerName + "'s turn.")
 
                         # if AI mode, pause to observe move until next or continue is clicked
                         self.pauseGame()
@@ -1004,17 +1248,18 @@ class Game(object):
                     if not type(currentPlayer) is HumanPlayer.HumanPlayer:
                         code = self.error(INVALID_MOVE, self.move, currentPlayer)
                         self.setWinner(1 - self.state.whoseTurn)
-                        self.UI.gameHandler.setInstructionText(code)
-                        # pause for the illegal move
-                        if self.pauseOnIllegalMove and not self.UI.paused:
-                            self.UI.pausePressed()
+                        if self.UI is not None:
+                            self.UI.gameHandler.setInstructionText(code)
+                            # pause for the illegal move
+                            if self.pauseOnIllegalMove and not self.UI.paused:
+                                self.UI.pausePressed()
                     elif validMove != None:
                         # if validMove is False and not None, clear move
                         currentPlayer.coordList = []
                         # self.ui.coordList = []
                         
                 # check for pause condition
-                if self.pauseConditionReached() and not self.UI.paused:
+                if self.UI is not None and self.pauseConditionReached() and not self.UI.paused:
                     self.UI.pausePressed()
                 
             # determine if if someone is a winner.
@@ -1024,8 +1269,40 @@ class Game(object):
             elif self.hasWon(PLAYER_TWO):
                 self.setWinner(PLAYER_TWO)
 
-    def get_move(self, currentPlayer, theState):
-        self.move = currentPlayer.getMove(theState)
+    ##
+    # callAI
+    #
+    # Description: calls getPlacement, getMove or getAttack of an AI, within
+    #              the time limit if there is one.  An isolated AI that runs
+    #              over is killed, not left running.  An AI that runs over
+    #              loses the game.
+    #
+    # Return: (False, None) if the AI ran out of time, else (True, what the
+    #         method returned)
+    #
+    def callAI(self, currentPlayer, method, *args):
+        callStart = time.perf_counter()
+        try:
+            if isinstance(currentPlayer, AIProcess):
+                result = getattr(currentPlayer, method)(*args, timeout=self.timeout_limit if self.timeoutOn else None)
+            elif self.timeoutOn:
+                answer = []
+                t = Thread(target=lambda: answer.append(getattr(currentPlayer, method)(*args)))
+                t.daemon = True
+                t.start()
+                t.join(self.timeout_limit)
+                if t.is_alive():
+                    raise AITimeoutError('%s: %s timeout [%s seconds] exceeded!'
+                                         % (currentPlayer.author, method, self.timeout_limit))
+                result = answer[0] if answer else None
+            else:
+                result = getattr(currentPlayer, method)(*args)
+        except AITimeoutError:
+            traceback.print_exc(limit=0)
+            self.setWinner(1 - self.state.whoseTurn)
+            return False, None
+        self.stats.recordCall(currentPlayer, method, time.perf_counter() - callStart)
+        return True, result
 
     def resolveEndGame(self):
         if self.UI is not None:
@@ -1067,6 +1344,8 @@ class Game(object):
     ##
     def setWinner(self, id):
         self.gameOver = True
+        if self.recorder is not None:
+            self.recorder.endGame(id)
         self.winner = self.currentPlayers[id].playerId
         self.loser = self.currentPlayers[1 - id].playerId
 
@@ -1116,8 +1395,14 @@ class Game(object):
                 attackCoord = self.submittedAttack
                 self.submittedAttack = None
             else:
-                attackCoord = self.state.coordLookup(
-                    currentPlayer.getAttack(theState, attackingAnt.clone(), validAttackCoords), theState.whoseTurn)
+                answered, attackCoord = self.callAI(currentPlayer, "getAttack", theState,
+                                                    attackingAnt.clone(), validAttackCoords)
+                if not answered:
+                    return
+                attackCoord = self.state.coordLookup(attackCoord, theState.whoseTurn)
+
+            if self.recorder is not None:
+                self.recorder.recordAttack(attackCoord)
 
             # decrement ants health
             attackedAnt = self.state.board[attackCoord[0]][attackCoord[1]].ant
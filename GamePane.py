@@ -7,6 +7,7 @@ from Move import *
 from Ant import *
 from GUIHandler import *
 from AIPlayerUtils import *
+from Bitboard import Bitboards, FULL, TERRITORY, maskToCoords
 from functools import partial
 import random
 import os
@@ -304,48 +305,23 @@ class GamePane:
     ##
     # highlightValidMoves
     #
-    # recursive method to highlight all moves
-    # an ant can make from a certain location
+    # highlights all the cells an ant can move to from a certain location
+    # (including the location itself), found with a bitboard flood fill
     #
     # location - a 2 tuple of integers representing a board coordinate
     #
     def highlightValidMoves(self, location, moveLeft, queen = False, ignoresGrass = False):
-        self.boardIcons[location[1]][location[0]].setImage(highlight=True)
+        state = self.handler.currentState
 
-        # if we're out of movement, then we're done
-        if moveLeft <= 0:
-            return
-
-        relatives = [(1, 0), (0, 1), (-1, 0), (0, -1)]
-
-        # highlight the neighbors if we can move there
-        for i in range(4):
-            to = (location[0] + relatives[i][0], location[1] + relatives[i][1])
-            # make sure the next coordinate is legal
-            if 0 <= to[0] <= 9 and 0 <= to[1] <= 9:
-                # queens can't move outside their home area
-                if queen:
-                    if self.handler.currentState.whoseTurn == PLAYER_ONE:
-                        if to[1] > 3:
-                            continue
-                    elif to[1] < 6:
-                        continue
-
-                # if there's an ant at that location, we can't move there
-                loc = self.handler.currentState.board[to[0]][to[1]]
-                if loc.ant is not None:
-                    continue
-
-                # if we don't have enough movement, we can't move there
-                if ignoresGrass:
-                    remainder = moveLeft - 1
-                else:
-                    remainder = moveLeft - loc.getMoveCost()
-                if remainder < 0:
-                    continue
+        # queens can't move outside their home area
+        allowed = FULL
+        if queen:
+            allowed = TERRITORY[state.whoseTurn]
 
-                # if there's no ant and we can move there, highlight it
-                self.highlightValidMoves(to, remainder, queen, ignoresGrass)
+        boards = Bitboards.fromGameState(state)
+        reachable = boards.reachable(location, max(moveLeft, 0), ignoresGrass, allowed)
+        for x, y in maskToCoords(reachable):
+            self.boardIcons[y][x].setImage(highlight=True)
 
     ##
     # clearHighlights
@@ -0,0 +1,488 @@
+import os, json, random, tempfile, unittest
+from Constants import *
+from GameState import GameState
+from Building import Building
+from Construction import Construction, CONSTR_STATS
+from Ant import Ant, UNIT_STATS
+from BoardTables import ALL_COORDS, cellIndex
+
+#
+# GameRecorder.py
+#
+# Records what happens in games so that they can be played back exactly, and
+# rebuilds the GameState at any point of a recorded game.
+#
+# A recording is one JSON object per game per line of a file:
+#
+#   {"v": 1, "seed": 1234, "players": ["Max", "Booger"],
+#    "events": [[0, 3, 14, ...], [1, 0, null, 23, 33], [2, 44], ...],
+#    "winner": 0}
+#
+# "players" are the authors in the order they played (player one first),
+# "seed" is the seed the game's random numbers came from (or null) and
+# "winner" is 0 or 1 (null if the game never finished).  Cells are stored as
+# their BoardTables.cellIndex in the game's coordinates (not flipped for
+# player two).  Each event is a list whose first entry is its kind:
+#
+#   [PLACEMENT, cell, cell, ...]               constructions placed in setup
+#   [MOVE, moveType, buildType, cell, ...]     a move that was made
+#   [ATTACK, cell]                             the ant that was attacked
+#
+# Only moves that were carried out are recorded; a move that lost the game
+# for being invalid is not, and neither is an UNDO with nothing to take back.
+# A recorded UNDO takes back the last MOVE_ANT or BUILD of the turn (and the
+# attack that followed it), as in Game.runGame.
+#
+# Files whose name ends in .bin hold the same recordings in the binary format
+# of Serialization.py instead, which is several times smaller.
+#
+
+#version of the recording format
+RECORD_VERSION = 1
+
+#kinds of events
+PLACEMENT = 0
+MOVE = 1
+ATTACK = 2
+
+
+##
+#GameRecorder
+#Description: Collects the recordings of the games played by a Game
+#
+#Variables:
+#   records - the finished recordings (dicts in the format above)
+#   current - the recording of the game being played, or None
+##
+class GameRecorder(object):
+
+    def __init__(self):
+        self.records = []
+        self.current = None
+
+    ##
+    #startGame
+    #Description: Starts recording a new game
+    #
+    #Parameters:
+    #   authors - the players' names, player one first
+    #   seed - the game's random seed, or None
+    ##
+    def startGame(self, authors, seed = None):
+        self.current = {"v": RECORD_VERSION, "seed": seed, "players": list(authors),
+                        "events": [], "winner": None}
+        self.records.append(self.current)
+
+    ##
+    #recordPlacement
+    #Description: Records constructions placed during setup
+    #
+    #Parameters:
+    #   coordsList - the cells, in the game's coordinates, in the order placed
+    ##
+    def recordPlacement(self, coordsList):
+        self.current["events"].append([PLACEMENT] + [cellIndex(coords) for coords in coordsList])
+
+    ##
+    #recordMove
+    #Description: Records a move (with its coordList in the game's coordinates)
+    ##
+    def recordMove(self, move):
+        coordList = move.coordList if move.coordList is not None else []
+        self.current["events"].append([MOVE, move.moveType, move.buildType] +
+                                      [cellIndex(coords) for coords in coordList])
+
+    ##
+    #recordAttack
+    #Description: Records the cell (in the game's coordinates) that was attacked
+    ##
+    def recordAttack(self, coords):
+        self.current["events"].append([ATTACK, cellIndex(coords)])
+
+    ##
+    #endGame
+    #Description: Records the winner (0 for player one, 1 for player two)
+    ##
+    def endGame(self, winner):
+        if self.current is not None:
+            self.current["winner"] = winner
+
+    ##
+    #write
+    #Description: Writes every recording to a file, one game per line (or in
+    #   the binary format if the path ends in .bin)
+    ##
+    def write(self, path):
+        if path.lower().endswith(".bin"):
+            import Serialization
+            Serialization.writeRecords(path, self.records)
+            return
+        with open(path, "w") as f:
+            for record in self.records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+##
+# loadRecords
+#
+# Return: the list of recordings in a file written by GameRecorder.write
+#         (JSON lines or binary)
+#
+def loadRecords(path):
+    import Serialization
+    if Serialization.isRecordsFile(path):
+        return Serialization.readRecords(path)
+    records = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("v") != RECORD_VERSION:
+                raise ValueError("unsupported recording version: " + str(record.get("v")))
+            records.append(record)
+    return records
+
+
+##
+#GameReplay
+#Description: Plays a recorded game back on a GameState, applying the rules
+#   exactly the way Game.runGame and Game.resolveAttack do (the agents are
+#   not needed).
+#
+#Variables:
+#   record - the recording being played
+#   state - the GameState after the events applied so far
+#   eventIndex - the number of events applied
+#   undoStates - the states before each MOVE_ANT and BUILD of the turn (only
+#       kept when the recording has UNDO moves)
+##
+class GameReplay(object):
+
+    def __init__(self, record):
+        self.record = record
+        self.state = GameState.getBlankState()
+        self.state.phase = SETUP_PHASE_1
+        self.eventIndex = 0
+        self.constrsToPlace = self.setupConstrs(PLAYER_ONE, True)
+        self.undoable = any(event[0] == MOVE and event[1] == UNDO for event in record["events"])
+        self.undoStates = []
+
+    ##
+    #setupConstrs
+    #
+    #Return: the constructions a player places in a setup phase
+    ##
+    def setupConstrs(self, player, firstPhase):
+        if firstPhase:
+            return [Building(None, ANTHILL, player), Building(None, TUNNEL, player)] + \
+                   [Construction(None, GRASS) for i in range(0, 9)]
+        return [Construction(None, FOOD) for i in range(0, 2)]
+
+    ##
+    #done
+    #
+    #Return: True once every event has been applied
+    ##
+    def done(self):
+        return self.eventIndex >= len(self.record["events"])
+
+    ##
+    #step
+    #Description: Applies the next event
+    #
+    #Return: the GameState afterwards (the replay's own state; clone it to
+    #   keep it)
+    ##
+    def step(self):
+        event = self.record["events"][self.eventIndex]
+        self.eventIndex += 1
+        if event[0] == PLACEMENT:
+            self.applyPlacement([ALL_COORDS[cell] for cell in event[1:]])
+        elif event[0] == MOVE:
+            self.applyMove(event[1], event[2], [ALL_COORDS[cell] for cell in event[3:]])
+        elif event[0] == ATTACK:
+            self.applyAttack(ALL_COORDS[event[1]])
+        else:
+            raise ValueError("unknown event: " + str(event))
+        return self.state
+
+    ##
+    #states
+    #Description: Applies the remaining events one at a time
+    #
+    #Return: a generator of (event number, clone of the state after it)
+    ##
+    def states(self):
+        while not self.done():
+            self.step()
+            yield self.eventIndex, self.state.clone()
+
+    ##
+    #stateAt
+    #
+    #Return: a clone of the state after the given number of events (0 is the
+    #   empty board); the replay must not already be past that point
+    ##
+    def stateAt(self, eventCount):
+        if eventCount < self.eventIndex:
+            raise ValueError("replay is already past event %d" % eventCount)
+        while self.eventIndex < eventCount:
+            self.step()
+        return self.state.clone()
+
+    ##
+    #finalState
+    #
+    #Return: a clone of the state at the end of the recording
+    ##
+    def finalState(self):
+        return self.stateAt(len(self.record["events"]))
+
+    def applyPlacement(self, targets):
+        state = self.state
+        for target in targets:
+            constr = self.constrsToPlace.pop(0)
+            constr.coords = target
+            state.board[target[0]][target[1]].constr = constr
+            if constr.type == ANTHILL or constr.type == TUNNEL:
+                state.inventories[state.whoseTurn].constrs.append(constr)
+            else:
+                state.inventories[NEUTRAL].constrs.append(constr)
+
+        if self.constrsToPlace:
+            return
+        if state.phase == SETUP_PHASE_1:
+            if state.whoseTurn == PLAYER_ONE:
+                self.constrsToPlace = self.setupConstrs(PLAYER_TWO, True)
+            else:
+                self.constrsToPlace = self.setupConstrs(PLAYER_ONE, False)
+                state.phase = SETUP_PHASE_2
+        elif state.phase == SETUP_PHASE_2:
+            if state.whoseTurn == PLAYER_ONE:
+                self.constrsToPlace = self.setupConstrs(PLAYER_TWO, False)
+            else:
+                # queens on the anthills, workers on the tunnels
+                for player in (PLAYER_ONE, PLAYER_TWO):
+                    inv = state.inventories[player]
+                    for ant in (Ant(inv.constrs[0].coords, QUEEN, player),
+                                Ant(inv.constrs[1].coords, WORKER, player)):
+                        state.board[ant.coords[0]][ant.coords[1]].ant = ant
+                        inv.ants.append(ant)
+                    inv.foodCount = 1
+                state.phase = PLAY_PHASE
+        state.whoseTurn = (state.whoseTurn + 1) % 2
+
+    def applyMove(self, moveType, buildType, coordList):
+        if moveType == UNDO:
+            self.state = self.undoStates.pop()
+            return
+        state = self.state
+        if self.undoable and (moveType == MOVE_ANT or moveType == BUILD):
+            self.undoStates.append(state.clone())
+        if moveType == MOVE_ANT:
+            start = coordList[0]
+            end = coordList[-1]
+            ant = state.board[start[0]][start[1]].ant
+            ant.coords = (end[0], end[1])
+            ant.hasMoved = True
+            state.board[start[0]][start[1]].ant = None
+            state.board[end[0]][end[1]].ant = ant
+        elif moveType == BUILD:
+            coord = coordList[0]
+            inv = state.inventories[state.whoseTurn]
+            if buildType == TUNNEL:
+                inv.foodCount -= CONSTR_STATS[buildType][BUILD_COST]
+                state.board[coord[0]][coord[1]].constr = Building(coord, TUNNEL, state.whoseTurn)
+            else:
+                inv.foodCount -= UNIT_STATS[buildType][COST]
+                ant = Ant(coord, buildType, state.whoseTurn)
+                ant.hasMoved = True
+                state.board[coord[0]][coord[1]].ant = ant
+                inv.ants.append(ant)
+        elif moveType == END:
+            self.undoStates = []
+            for ant in state.inventories[state.whoseTurn].ants:
+                constr = state.board[ant.coords[0]][ant.coords[1]].constr
+                if constr is not None:
+                    if type(constr) is Building and not constr.player == state.whoseTurn:
+                        constr.captureHealth -= 1
+                    elif constr.type == FOOD and ant.type == WORKER:
+                        ant.carrying = True
+                    elif (constr.type == ANTHILL or constr.type == TUNNEL) and ant.carrying == True:
+                        state.inventories[state.whoseTurn].foodCount += 1
+                        ant.carrying = False
+                ant.hasMoved = False
+            state.whoseTurn = (state.whoseTurn + 1) % 2
+
+    ##
+    #applyAttack
+    #Description: The ant that moved last (the attacker) attacks the ant in
+    #   the given cell
+    ##
+    def applyAttack(self, coords):
+        state = self.state
+        attacker = self.lastMovedAnt()
+        attacked = state.board[coords[0]][coords[1]].ant
+        attacked.health -= UNIT_STATS[attacker.type][ATTACK]
+        if attacked.health <= 0:
+            state.board[coords[0]][coords[1]].ant = None
+            state.inventories[(state.whoseTurn + 1) % 2].ants.remove(attacked)
+
+    ##
+    #lastMovedAnt
+    #
+    #Return: the ant at the end of the last recorded move (attacks always
+    #   follow the move of the attacking ant)
+    ##
+    def lastMovedAnt(self):
+        for i in range(self.eventIndex - 2, -1, -1):
+            event = self.record["events"][i]
+            if event[0] == MOVE and event[1] == MOVE_ANT:
+                end = ALL_COORDS[event[-1]]
+                return self.state.board[end[0]][end[1]].ant
+        raise ValueError("attack without a move")
+
+
+##
+# recordedStates
+#
+# Return: a list of the play phase states (clones, with boards) from every
+#         game in a recording file, e.g., as a benchmark corpus
+#
+# Parameters:
+#   path - the recording file
+#   every - keep every this many states of each game
+#
+def recordedStates(path, every = 1):
+    states = []
+    for record in loadRecords(path):
+        replay = GameReplay(record)
+        for eventCount, state in replay.states():
+            if state.phase == PLAY_PHASE and eventCount % every == 0:
+                states.append(state)
+    return states
+
+
+##
+# _StateRecorder
+# Description: A GameRecorder that also keeps the encoding of its Game's state
+#       before each event it records (for testing)
+##
+class _StateRecorder(GameRecorder):
+
+    def __init__(self, game):
+        super(_StateRecorder, self).__init__()
+        self.game = game
+        self.states = []
+
+    def keepState(self):
+        from Serialization import encodeState
+        self.states.append(encodeState(self.game.state))
+
+    def recordPlacement(self, coordsList):
+        self.keepState()
+        super(_StateRecorder, self).recordPlacement(coordsList)
+
+    def recordMove(self, move):
+        self.keepState()
+        super(_StateRecorder, self).recordMove(move)
+
+    def recordAttack(self, coords):
+        self.keepState()
+        super(_StateRecorder, self).recordAttack(coords)
+
+
+##
+# test_gameRecorder
+#
+# python -m unittest GameRecorder
+# (from the folder of Game.py, which loads the AIs from the AI folder)
+#
+class test_gameRecorder(unittest.TestCase):
+
+    ##
+    # playGame
+    #
+    # Description: Plays a headless game between two of the AIs in the AI
+    #       folder, recording it
+    #
+    # Parameters:
+    #   authors - the two AIs' authors, player one first
+    #   seed - the game's random seed
+    #   undoChance - the chance that player one takes its last move back
+    #       instead of moving (as only a human player may)
+    #
+    # Return: (the _StateRecorder, the encoding of the game's final state)
+    #
+    def playGame(self, authors, seed, undoChance = 0.0):
+        from Game import Game, GameData
+        from GameStats import GameStats
+        from Move import Move
+        from Serialization import encodeState
+        game = Game(testing=True, commandLine=False)
+        players = dict((player[0].author, player[0]) for player in game.players)
+        p1, p2 = players[authors[0]], players[authors[1]]
+        if undoChance > 0:
+            rnd = random.Random(seed)
+            getMove = p1.getMove
+            p1.getMove = lambda state: Move(UNDO, None, None) if rnd.random() < undoChance else getMove(state)
+
+        game.recorder = _StateRecorder(game)
+        game.setup(GameData(p1, p2, 1), 0, seed)
+        game.hasHumanPlayer = undoChance > 0
+        game.currentPlayerScores = [[authors[0], 0, 0], [authors[1], 0, 0]]
+        game.stats = GameStats()
+        game.runGame()
+        self.assertTrue(game.gameOver)
+        return game.recorder, encodeState(game.state)
+
+    ##
+    # assertReplayIsExact
+    # Description: Checks that the replay of a recorded game has the game's
+    #       state before every event and at the end
+    ##
+    def assertReplayIsExact(self, recorder, finalState):
+        from Serialization import encodeState
+        replay = GameReplay(recorder.records[0])
+        for data in recorder.states:
+            self.assertEqual(encodeState(replay.state), data)
+            replay.step()
+        self.assertTrue(replay.done())
+        self.assertEqual(encodeState(replay.state), finalState)
+
+    def testReplayIsExact(self):
+        for seed in range(3):
+            recorder, finalState = self.playGame(["Booger", "Random"], seed)
+            self.assertTrue(any(event[0] == ATTACK for event in recorder.records[0]["events"]))
+            self.assertIsNotNone(recorder.records[0]["winner"])
+            self.assertReplayIsExact(recorder, finalState)
+
+    def testReplayUndoes(self):
+        recorder, finalState = self.playGame(["Booger", "Random"], 4, 0.2)
+        self.assertTrue(any(event[0] == MOVE and event[1] == UNDO for event in recorder.records[0]["events"]))
+        self.assertReplayIsExact(recorder, finalState)
+
+    def testFilesRoundTrip(self):
+        recorder, finalState = self.playGame(["Booger", "Random"], 3, 0.2)
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ("games.json", "games.bin"):
+                path = os.path.join(directory, name)
+                recorder.write(path)
+                self.assertEqual(loadRecords(path), recorder.records)
+
+    def testStatesRoundTrip(self):
+        from Serialization import encodeState, decodeState
+        recorder, finalState = self.playGame(["Booger", "Random"], 5)
+        for data in recorder.states + [finalState]:
+            state = decodeState(data)
+            self.assertEqual(encodeState(state), data)
+            self.assertEqual(encodeState(decodeState(data, False)), data)
+            for inv in state.inventories:
+                for ant in inv.ants:
+                    self.assertIs(state.board[ant.coords[0]][ant.coords[1]].ant, ant)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,6 +27,15 @@ def subtractCoords(tuple1, tuple2):
 #   inventories - A tuple containing the Inventory for each player.
 #   phase - The current phase of the game.
 #    whoseTurn - The ID of the Player who's turn it currently is.
+#   antIndex - Optional dict mapping coords to the Ant there (None if not built)
+#   constrIndex - Optional dict mapping coords to the Construction there
+#       (None if not built)
+#   hashValue - Optional Zobrist hash of the state (see Zobrist.py); None if
+#       not known.  Clones never copy it.
+#   distanceTable - Optional DistanceTable of the state's constructions (see
+#       DistanceTable.py); None if not looked up yet.  It is only kept once
+#       the play phase starts, when constructions stop moving, and clones
+#       share it.  Code that moves constructions by hand must set it to None.
 ##
 class GameState(object):
 
@@ -46,6 +55,41 @@ class GameState(object):
         self.inventories = inputInventories
         self.phase = inputPhase
         self.whoseTurn = inputTurn
+        self.antIndex = None
+        self.constrIndex = None
+        self.hashValue = None
+        self.distanceTable = None
+
+    ##
+    #buildIndex
+    #Description: Builds the coordinate indexes (antIndex and constrIndex)
+    #   from the inventories.  As with getAntAt/getConstrAt, the first ant or
+    #   construction found at a coordinate wins.
+    #
+    #   The indexes are not updated when ants or constructions are changed
+    #   directly.  Code that modifies an indexed state by hand must call
+    #   clearIndex() (or buildIndex() again) afterwards.
+    ##
+    def buildIndex(self):
+        antIndex = {}
+        constrIndex = {}
+        for inv in self.inventories:
+            for ant in inv.ants:
+                if ant.coords not in antIndex:
+                    antIndex[ant.coords] = ant
+            for constr in inv.constrs:
+                if constr.coords not in constrIndex:
+                    constrIndex[constr.coords] = constr
+        self.antIndex = antIndex
+        self.constrIndex = constrIndex
+
+    ##
+    #clearIndex
+    #Description: Discards the coordinate indexes
+    ##
+    def clearIndex(self):
+        self.antIndex = None
+        self.constrIndex = None
 
     ##
     #coordLookup
@@ -79,6 +123,7 @@ class GameState(object):
                 ant.coords = self.coordLookup(ant.coords, PLAYER_TWO)
             for constr in inv.constrs:
                 constr.coords = self.coordLookup(constr.coords, PLAYER_TWO)
+        self.distanceTable = None
       
     ##
     #clearConstrs
@@ -178,7 +223,9 @@ class GameState(object):
         newInventories = [Inventory(PLAYER_ONE, ants1, cons1, food1),
                           Inventory(PLAYER_TWO, ants2, cons2, food2),
                           Inventory(NEUTRAL, [], cons3, 0)]
-        return GameState(newBoard, newInventories, self.phase, self.whoseTurn)
+        newState = GameState(newBoard, newInventories, self.phase, self.whoseTurn)
+        newState.distanceTable = self.distanceTable
+        return newState
 
 
     ##
@@ -188,9 +235,13 @@ class GameState(object):
     # to None).  Omitting the board makes the clone run much faster and, if
     # necessary, the board can be reconstructed from the inventories.
     #
+    #Parameters:
+    #   withIndex - if True, the coordinate indexes of the clone are built
+    #       while the inventories are copied (see buildIndex)
+    #
     #Return: a GameState object _almost_ identical to the original
     ##
-    def fastclone(self):
+    def fastclone(self, withIndex = False):
         newBoard = None
         #For speed, preallocate the lists at their eventual size 
         ants1 = [ None ] * len(self.inventories[PLAYER_ONE].ants)
@@ -227,5 +278,21 @@ class GameState(object):
         newInventories = [ Inventory(PLAYER_ONE, ants1, cons1, food1),
                            Inventory(PLAYER_TWO, ants2, cons2, food2),
                            Inventory(NEUTRAL, [], cons3, 0) ]
-        
-        return GameState(newBoard, newInventories, self.phase, self.whoseTurn)
+
+        newState = GameState(newBoard, newInventories, self.phase, self.whoseTurn)
+        newState.distanceTable = self.distanceTable
+
+        #index the freshly cloned objects (first one at a coord wins)
+        if withIndex:
+            antIndex = {}
+            for ant in ants1 + ants2:
+                if ant.coords not in antIndex:
+                    antIndex[ant.coords] = ant
+            constrIndex = {}
+            for constr in cons1 + cons2 + cons3:
+                if constr.coords not in constrIndex:
+                    constrIndex[constr.coords] = constr
+            newState.antIndex = antIndex
+            newState.constrIndex = constrIndex
+
+        return newState
@@ -0,0 +1,221 @@
+import csv
+import json
+
+#
+# GameStats.py
+#
+# Counters that Game keeps about the agents it runs: how long each call to
+# getPlacement, getMove and getAttack took (as a histogram per agent and
+# method) and, for agents that report it through Player.getSearchStats, how
+# much searching they did.  The totals can be written out as JSON or CSV at
+# the end of a tournament (python Game.py --headless ... --stats FILE).
+#
+
+#the methods of a Player that are timed
+TIMED_METHODS = ("getPlacement", "getMove", "getAttack")
+
+#the search counters an agent can report, see Player.getSearchStats
+SEARCH_COUNTERS = ("nodesExpanded", "nodesPruned")
+
+#upper bounds (in seconds) of the latency histogram buckets; anything slower
+#than the last bound goes in one more bucket
+LATENCY_BOUNDS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10)
+
+
+##
+#LatencyHistogram
+#Description: The number of calls that took each range of time
+#
+#Variables:
+#   buckets - buckets[i] is the number of calls that took at most
+#       LATENCY_BOUNDS[i] seconds (and more than LATENCY_BOUNDS[i - 1]); the
+#       last bucket holds the calls that took longer than every bound
+#   count - the number of calls
+#   total - the total time of the calls (seconds)
+#   longest - the time of the slowest call (seconds)
+##
+class LatencyHistogram(object):
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+
+    ##
+    #add
+    #Description: Records one call that took the given number of seconds
+    ##
+    def add(self, seconds):
+        index = 0
+        while index < len(LATENCY_BOUNDS) and seconds > LATENCY_BOUNDS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.longest = max(self.longest, seconds)
+
+    ##
+    #merge
+    #Description: Adds the calls recorded by another histogram to this one
+    ##
+    def merge(self, other):
+        for i in range(len(self.buckets)):
+            self.buckets[i] += other.buckets[i]
+        self.count += other.count
+        self.total += other.total
+        self.longest = max(self.longest, other.longest)
+
+    ##
+    #mean
+    #
+    #Return: the average time of a call (seconds), 0 if there were none
+    ##
+    def mean(self):
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def toDict(self):
+        return {"count": self.count, "total": self.total, "mean": self.mean(),
+                "max": self.longest, "buckets": list(self.buckets)}
+
+
+##
+#AgentStats
+#Description: Everything recorded about one agent
+#
+#Variables:
+#   author - the agent's name
+#   latency - {method name : LatencyHistogram}
+#   searches - the number of moves the agent reported search counters for
+#   nodesExpanded, nodesPruned - totals of the reported counters
+#   maxDepth - the deepest search reported
+##
+class AgentStats(object):
+
+    def __init__(self, author):
+        self.author = author
+        self.latency = {method : LatencyHistogram() for method in TIMED_METHODS}
+        self.searches = 0
+        self.nodesExpanded = 0
+        self.nodesPruned = 0
+        self.maxDepth = 0
+
+    ##
+    #addSearch
+    #Description: Adds the counters an agent reported for one move
+    #
+    #Parameters:
+    #   searchStats - the dict returned by Player.getSearchStats
+    ##
+    def addSearch(self, searchStats):
+        self.searches += 1
+        for counter in SEARCH_COUNTERS:
+            setattr(self, counter, getattr(self, counter) + searchStats.get(counter, 0))
+        self.maxDepth = max(self.maxDepth, searchStats.get("maxDepth", 0))
+
+    def merge(self, other):
+        for method in TIMED_METHODS:
+            self.latency[method].merge(other.latency[method])
+        self.searches += other.searches
+        for counter in SEARCH_COUNTERS:
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+        self.maxDepth = max(self.maxDepth, other.maxDepth)
+
+    def toDict(self):
+        result = {"author": self.author, "searches": self.searches, "maxDepth": self.maxDepth}
+        for counter in SEARCH_COUNTERS:
+            result[counter] = getattr(self, counter)
+        result["latency"] = {method : self.latency[method].toDict() for method in TIMED_METHODS}
+        return result
+
+
+##
+#GameStats
+#Description: The AgentStats of every agent that has played, by author
+##
+class GameStats(object):
+
+    def __init__(self):
+        self.agents = {}
+
+    ##
+    #getAgent
+    #
+    #Return: the AgentStats for the given author, created if needed
+    ##
+    def getAgent(self, author):
+        if author not in self.agents:
+            self.agents[author] = AgentStats(author)
+        return self.agents[author]
+
+    ##
+    #recordCall
+    #Description: Records how long one call to an agent took
+    #
+    #Parameters:
+    #   player - the Player that was called
+    #   method - the name of the method (one of TIMED_METHODS)
+    #   seconds - how long the call took
+    ##
+    def recordCall(self, player, method, seconds):
+        self.getAgent(player.author).latency[method].add(seconds)
+
+    ##
+    #recordSearch
+    #Description: Asks a player for the search counters of the move it just
+    #   made and records them (players that don't report any are skipped)
+    ##
+    def recordSearch(self, player):
+        searchStats = player.getSearchStats()
+        if searchStats is not None:
+            self.getAgent(player.author).addSearch(searchStats)
+
+    ##
+    #merge
+    #Description: Adds everything recorded by another GameStats (e.g., from a
+    #   Tournament worker) to this one
+    ##
+    def merge(self, other):
+        for author, agent in other.agents.items():
+            self.getAgent(author).merge(agent)
+
+    def toDict(self):
+        return {"latencyBounds": list(LATENCY_BOUNDS),
+                "agents": [self.agents[author].toDict() for author in sorted(self.agents)]}
+
+    ##
+    #writeJSON
+    #Description: Writes everything recorded to a JSON file
+    ##
+    def writeJSON(self, path):
+        with open(path, "w") as f:
+            json.dump(self.toDict(), f, indent=2)
+
+    ##
+    #writeCSV
+    #Description: Writes one row per agent and timed method to a CSV file.
+    #   The search counters are repeated on each of an agent's rows.
+    ##
+    def writeCSV(self, path):
+        bucketNames = ["<=%gs" % bound for bound in LATENCY_BOUNDS] + [">%gs" % LATENCY_BOUNDS[-1]]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["author", "method", "calls", "totalSeconds", "meanSeconds", "maxSeconds"] +
+                            bucketNames + ["searches"] + list(SEARCH_COUNTERS) + ["maxDepth"])
+            for author in sorted(self.agents):
+                agent = self.agents[author]
+                for method in TIMED_METHODS:
+                    histogram = agent.latency[method]
+                    writer.writerow([author, method, histogram.count, histogram.total, histogram.mean(),
+                                     histogram.longest] + histogram.buckets + [agent.searches] +
+                                    [getattr(agent, counter) for counter in SEARCH_COUNTERS] + [agent.maxDepth])
+
+    ##
+    #write
+    #Description: Writes a CSV file if the path ends in .csv, JSON otherwise
+    ##
+    def write(self, path):
+        if path.lower().endswith(".csv"):
+            self.writeCSV(path)
+        else:
+            self.writeJSON(path)
@@ -0,0 +1,114 @@
+import os, time
+from TranspositionTable import EXACT
+from Zobrist import stateHash
+
+#
+# IterativeDeepening.py
+#
+# Lets a minimax agent (Max, Diego) search for a set time instead of to a set
+# depth: the root is searched to depth 1, then 2, 3... until the agent's
+# moveTime (seconds) runs out, and the move of the deepest search that
+# finished is made.
+#
+# Each finished search leaves the best move of every node it searched in the
+# agent's transposition table (the root's too), so the next, deeper search
+# tries the previous best line first and gets more cutoffs.  A search still
+# going when the time is up stops at the next node it expands (the agent's
+# alphaBeta calls checkDeadline) and is thrown away.  The depth 1 search
+# always finishes, so there is always a move.  A search isn't started when
+# the last one took longer than the time that is left, since each search
+# takes longer than the one before.
+#
+# The time per move comes from the agent's moveTime: None (the default)
+# searches to the agent's depth_limit as before.  It can be set with
+# python Game.py ... --move-time SECONDS, and with --timeout the agents get
+# half of the time limit unless --move-time says otherwise.
+#
+
+#environment variable holding the default time per move
+MOVE_TIME_VARIABLE = "ANTICS_MOVE_TIME"
+
+#deepest search ever started
+MAX_DEPTH = 20
+
+
+##
+#SearchTimeout
+#Description: Raised in a search that has run out of time
+##
+class SearchTimeout(Exception):
+    pass
+
+
+##
+# defaultMoveTime
+#
+# Return: the seconds per move agents start with, or None to search to their
+#         depth_limit
+#
+def defaultMoveTime():
+    try:
+        moveTime = float(os.environ.get(MOVE_TIME_VARIABLE, ""))
+    except ValueError:
+        return None
+    return moveTime if moveTime > 0 else None
+
+##
+# setDefaultMoveTime
+# Description: Sets the seconds per move for agents created from now on, in
+#              this process and the ones it starts
+#
+def setDefaultMoveTime(moveTime):
+    os.environ[MOVE_TIME_VARIABLE] = str(moveTime)
+
+##
+# checkDeadline
+# Description: Raises SearchTimeout if the agent's search is out of time
+#
+def checkDeadline(agent):
+    if agent.deadline is not None and time.time() > agent.deadline:
+        raise SearchTimeout()
+
+
+##
+# iterativeDeepening
+#
+# Parameters:
+#   agent - the agent searching (its depth_limit is changed during the
+#           searches and put back afterwards)
+#   makeRoot - makes a new root node for the current state
+#   search - searches a root node (e.g., agent.minimax(root, 0)) and returns
+#            it with its nextMove set
+#   moveTime - seconds to search for
+#
+# Return: the root of the deepest finished search
+#
+def iterativeDeepening(agent, makeRoot, search, moveTime):
+    depthLimit = agent.depth_limit
+    start = time.time()
+    best = None
+    try:
+        for depth in range(1, MAX_DEPTH + 1):
+            agent.depth_limit = depth
+            agent.deadline = None if best is None else start + moveTime
+            searchStart = time.time()
+            root = makeRoot()
+            try:
+                search(root)
+            except SearchTimeout:
+                break
+            best = root
+            if root.nextMove is None:
+                break
+            # the root isn't stored by minimax, but its best move should be
+            # tried first next time
+            agent.transpositions.store(stateHash(root.state), depth, root.min, EXACT,
+                                       root.nextMove.move)
+            # stop once a win is certain or the game tree has run out
+            now = time.time()
+            if root.min >= 1 or agent.maxDepth < depth or now - start + (now - searchStart) > moveTime:
+                break
+    finally:
+        agent.depth_limit = depthLimit
+        agent.deadline = None
+    return best
@@ -0,0 +1,288 @@
+import os, random, unittest
+from Constants import *
+from Ant import UNIT_STATS
+from Move import Move
+from AIPlayerUtils import getCurrPlayerInventory, getAntAt, listAttackable, \
+    listShortestMovementPaths, listAllBuildMoves, listAllLegalMoves, getNextStateAdversarial
+from Bitboard import Bitboards
+from TranspositionTable import moveKey
+from Zobrist import stateHash
+
+#
+# MacroMoves.py
+#
+# Whole turns as single moves, for searches (Max, Diego).  A turn is any
+# number of MOVE_ANT and BUILD moves followed by END, and listAllLegalMoves
+# lists one ant's move at a time, so a search goes through every order the
+# ants can be moved in: two ants that don't get in each other's way moved
+# A then B and B then A are two paths to the same state, and a turn with
+# several ants has thousands of them.
+#
+# listMacroMoves makes each turn one move instead (a MacroMove): the ants
+# are moved in a fixed order (by their cell), each one either staying where
+# it is or making one of its moves from where the ants before it left the
+# board, then a BUILD can be made, then END.  Turns that reach the same state
+# are only listed once.  With these a search's ply is a player's whole turn.
+#
+# This doesn't list every turn: an ant can't move into a cell an ant later in
+# the order leaves, and nothing is built before an ant moves.  A state with
+# many ants can still have more turns than can be searched, so at each ant
+# (and at the build) at most limit ways of going on from the partial turns so
+# far are kept: the one doing nothing more and others picked at random.
+#
+# An agent with macroMoves set searches these and then makes the moves of
+# the turn it chose one at a time (see nextLegalMove).  It is off by default;
+# python Game.py ... --macro-moves turns it on.
+#
+
+#environment variable that turns macro moves on for new agents
+MACRO_MOVES_VARIABLE = "ANTICS_MACRO_MOVES"
+
+#most ways of going on from the partial turns kept at each step
+MACRO_LIMIT = 64
+
+
+##
+#MacroMove
+#Description: A whole turn, made as a single move by a search
+#
+#Variables:
+#   moves - the Moves of the turn, the last one END
+#   moveType - MACRO
+#   coordList - the keys of the moves (see TranspositionTable.moveKey), so
+#       that a MacroMove has a key like any other move
+#   buildType - None
+##
+class MacroMove(object):
+
+    def __init__(self, moves):
+        self.moves = moves
+        self.moveType = MACRO
+        self.coordList = [moveKey(move) for move in moves]
+        self.buildType = None
+
+    def __str__(self):
+        return "<MacroMove: " + ", ".join(str(move) for move in self.moves) + ">"
+
+
+##
+# defaultMacroMoves
+#
+# Return: whether agents start out searching macro moves
+#
+def defaultMacroMoves():
+    return os.environ.get(MACRO_MOVES_VARIABLE, "") == "1"
+
+##
+# setDefaultMacroMoves
+# Description: Turns macro moves on or off for agents created from now on, in
+#              this process and the ones it starts
+#
+def setDefaultMacroMoves(macroMoves):
+    os.environ[MACRO_MOVES_VARIABLE] = "1" if macroMoves else "0"
+
+
+##
+# _antMoves
+#
+# Return: the moves the ant at coords can make in state, leaving out standing
+#         still when it has no enemy to attack (the same as not moving it)
+#
+def _antMoves(state, coords):
+    ant = getAntAt(state, coords)
+    stats = UNIT_STATS[ant.type]
+    boards = Bitboards.fromGameState(state)
+    paths = listShortestMovementPaths(state, coords, stats[MOVEMENT], stats[IGNORES_GRASS],
+                                      ant.type == QUEEN, boards)
+    canAttack = stats[ATTACK] > 0 and any(
+        enemy is not None and enemy.player != ant.player
+        for enemy in (getAntAt(state, coord) for coord in listAttackable(coords, stats[RANGE])))
+    return [Move(MOVE_ANT, path, None) for path in paths if len(path) > 1 or canAttack]
+
+##
+# _keep
+#
+# Description: Cuts a list of ways to carry on partial turns down to limit,
+#              keeping the first one (doing nothing more)
+#
+def _keep(options, limit):
+    if limit is None or len(options) <= limit:
+        return options
+    return [options[0]] + random.sample(options[1:], limit - 1)
+
+##
+# _extend
+#
+# Return: the partial turns reached by options, [(partial turn's state,
+#         moves so far, move to add or None)], once each
+#
+def _extend(options, nextState):
+    partials = []
+    seen = set()
+    for partial, moves, move in options:
+        if move is not None:
+            partial = nextState(partial, move)
+            moves = moves + [move]
+        key = stateHash(partial)
+        if key not in seen:
+            seen.add(key)
+            partials.append((partial, moves))
+    return partials
+
+##
+# _nextState
+#
+# Return: the indexed state after a move (see AIPlayerUtils.getNextState), so
+#         the partial turns' hashes don't have to be worked out from scratch
+#
+def _nextState(state, move):
+    return getNextStateAdversarial(state, move, True)
+
+##
+# listMacroMoves
+#
+# Parameters:
+#   state - the state to move from
+#   nextState - makes a move in a state (e.g., an agent's
+#               getNextStateAdversarial), returning a new state (by default
+#               AIPlayerUtils.getNextStateAdversarial)
+#   limit - the most ways to carry on the partial turns kept at each step
+#           (None for no limit)
+#
+# Return: a list of (MacroMove, the state after it) for the player whose
+#         turn it is, the first one doing nothing but END
+#
+def listMacroMoves(state, nextState = _nextState, limit = MACRO_LIMIT):
+    # ants that moved before the search started have had their turn
+    antCoords = sorted(ant.coords for ant in getCurrPlayerInventory(state).ants if not ant.hasMoved)
+
+    # [(state, moves so far)], doing nothing first
+    partials = [(state, [])]
+    for coords in antCoords:
+        options = []
+        for partial, moves in partials:
+            options.append((partial, moves, None))
+            options.extend((partial, moves, move) for move in _antMoves(partial, coords))
+        # cut before making the moves, since copying the states is the slow part
+        partials = _extend(_keep(options, limit), nextState)
+
+    options = []
+    for partial, moves in partials:
+        options.append((partial, moves, None))
+        options.extend((partial, moves, move) for move in listAllBuildMoves(partial))
+    partials = _extend(_keep(options, limit), nextState)
+
+    result = []
+    for partial, moves in partials:
+        end = Move(END, None, None)
+        result.append((MacroMove(moves + [end]), nextState(partial, end)))
+    return result
+
+##
+# nextLegalMove
+#
+# Description: Checks a move planned in a macro move against the game, which
+#              can have gone differently from what the search expected (e.g.,
+#              an ant attacked a different enemy)
+#
+# Return: the legal move in state doing the same thing as move (the same ant
+#         to the same cell, or the same build), or None if there isn't one
+#
+def nextLegalMove(state, move):
+    if move.moveType == END:
+        return move
+    for legal in listAllLegalMoves(state):
+        if legal.moveType != move.moveType:
+            continue
+        if move.moveType == MOVE_ANT:
+            if legal.coordList[0] == move.coordList[0] and legal.coordList[-1] == move.coordList[-1]:
+                return legal
+        elif legal.buildType == move.buildType:
+            return legal
+    return None
+
+
+##
+# test_macroMoves
+#
+# python -m unittest MacroMoves
+#
+class test_macroMoves(unittest.TestCase):
+
+    def testMovesAreLegal(self):
+        from Benchmark import buildCorpus, BENCH_SEED
+        from Serialization import encodeState
+        random.seed(BENCH_SEED)
+        for state in buildCorpus(games = 3, every = 10):
+            macros = listMacroMoves(state)
+            self.assertEqual([moveKey(move) for move in macros[0][0].moves], [moveKey(Move(END, None, None))])
+            for macro, after in macros:
+                self.assertEqual(macro.moves[-1].moveType, END)
+                partial = state
+                for move in macro.moves:
+                    self.assertIn(moveKey(move), [moveKey(legal) for legal in listAllLegalMoves(partial)])
+                    self.assertEqual(nextLegalMove(partial, move).moveType, move.moveType)
+                    partial = getNextStateAdversarial(partial, move)
+                self.assertEqual(encodeState(partial), encodeState(after))
+
+    ##
+    # agents
+    #
+    # Return: the Max and Diego agents, as loaded by a Game from the AI folder
+    #         (so run the tests from the folder of Game.py)
+    #
+    def agents(self):
+        from Game import Game
+        game = Game(testing=True, commandLine=False)
+        return [player[0] for player in game.players if player[0].author in ("Max", "Diego")]
+
+    def testAgentMovesAreLegal(self):
+        # the agents' own getNextStateAdversarial has no food handling and
+        # marks the ant at the end of a move as moved; the turns it lists
+        # have to be legal under the game's rules all the same
+        from Benchmark import buildCorpus, BENCH_SEED
+        random.seed(BENCH_SEED)
+        agents = self.agents()
+        self.assertEqual(len(agents), 2)
+        for agent in agents:
+            for state in buildCorpus(games = 3, every = 10):
+                for macro, after in listMacroMoves(state, agent.getNextStateAdversarial):
+                    partial = state
+                    for move in macro.moves:
+                        self.assertIn(moveKey(move), [moveKey(legal) for legal in listAllLegalMoves(partial)])
+                        partial = getNextStateAdversarial(partial, move)
+
+    def testAgentsMakeTheirTurns(self):
+        # getMove makes the turn it chose one move at a time (without the
+        # attacks the game would ask for, so the ants it expected to kill live)
+        from Benchmark import buildCorpus, BENCH_SEED
+        random.seed(BENCH_SEED)
+        for agent in self.agents():
+            agent.macroMoves = True
+            agent.depth_limit = 1
+            for state in buildCorpus(games = 3, every = 10):
+                agent.resetSearch()
+                move = agent.getMove(state)
+                planned = [move] + agent.pendingMoves
+                made = []
+                partial = state
+                while True:
+                    self.assertIn(moveKey(move), [moveKey(legal) for legal in listAllLegalMoves(partial)])
+                    made.append(move)
+                    partial = getNextStateAdversarial(partial, move)
+                    if move.moveType == END:
+                        break
+                    move = agent.getMove(partial)
+                self.assertEqual(len(made), len(planned))
+                self.assertEqual(agent.pendingMoves, [])
+
+    def testTurnsListedOnce(self):
+        from Benchmark import buildCorpus, BENCH_SEED
+        random.seed(BENCH_SEED)
+        for state in buildCorpus(games = 3, every = 10):
+            hashes = [stateHash(after) for macro, after in listMacroMoves(state)]
+            self.assertEqual(len(hashes), len(set(hashes)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,598 @@
+from Player import Player
+from Constants import *
+from Ant import Ant, UNIT_STATS
+from Move import Move
+from AIPlayerUtils import *
+from TranspositionTable import *
+from Zobrist import stateHash, antKey, constrKey, foodKey, TURN_KEYS
+from ParallelSearch import parallelSearch, defaultProcesses
+from IterativeDeepening import iterativeDeepening, checkDeadline, defaultMoveTime
+from MoveOrdering import MoveOrdering
+from SearchNode import SearchNode
+from MacroMoves import listMacroMoves, nextLegalMove, defaultMacroMoves
+
+#
+# MinimaxAgent.py
+#
+# The minimax search shared by the Max and Diego agents: alpha-beta over
+# SearchNodes, with the transposition table, move ordering, parallel root,
+# iterative deepening and macro moves (see the modules of the same names).
+# An agent subclasses MinimaxAgent and provides getPlacement, getAttack and
+# evaluateState; it can also change how leaves are evaluated (evaluateNodes,
+# evaluateStates, leafBatchSize) and when the transposition table is used
+# (usesTranspositions).
+#
+
+# number of states whose legal moves are cached (see AIPlayerUtils.MoveCache)
+MOVE_CACHE_SIZE = 4096
+# number of slots in the transposition table
+TRANSPOSITION_TABLE_SIZE = 1 << 16
+
+
+##
+# MinimaxAgent
+# Description: A player that picks its moves with a minimax search
+#
+# Variables:
+#   depth_limit - how many plies deep to search
+#   me - the id of the player searching
+#   move, nextMove - the node of the move being made and of the one after it
+#       in the line found by the last search
+#   pendingMoves - the moves left to make of a turn chosen as a macro move
+##
+class MinimaxAgent(Player):
+
+    ##
+    # __init__
+    # Description: Creates a new Player
+    #
+    # Parameters:
+    #   inputPlayerId - The id to give the new player (int)
+    #   inputAuthor   - The player's name
+    ##
+    def __init__(self, inputPlayerId, inputAuthor):
+        super(MinimaxAgent, self).__init__(inputPlayerId, inputAuthor)
+        self.depth_limit = 3
+        self.me = 0
+        self.move = None
+        self.nextMove = None
+        self.prunedMoves = 0
+        # nodes expanded and deepest ply reached by the last search
+        self.nodesExpanded = 0
+        self.maxDepth = 0
+        # transpositions reach the same state many times during a search
+        self.moveCache = MoveCache(MOVE_CACHE_SIZE)
+        # values of states already searched, keyed by Zobrist hash
+        self.transpositions = TranspositionTable(TRANSPOSITION_TABLE_SIZE)
+        # orders the moves searched, learning from the cutoffs (see MoveOrdering.py)
+        self.ordering = MoveOrdering()
+        # worker processes to split the search over (see ParallelSearch.py)
+        self.searchProcesses = defaultProcesses()
+        # seconds to search each move for, or None to search to depth_limit
+        # (see IterativeDeepening.py), and when the current search must stop
+        self.moveTime = defaultMoveTime()
+        self.deadline = None
+        # search whole turns as single moves (see MacroMoves.py), and the
+        # moves left to make of the turn chosen
+        self.macroMoves = defaultMacroMoves()
+        self.pendingMoves = []
+
+    ##
+    # getMove
+    # Description: Gets the next move from the Player.
+    #
+    # Parameters:
+    #   currentState - The state of the current game waiting for the player's move (GameState)
+    #
+    # Return: The Move to be made
+    ##
+    def getMove(self, currentState):
+        # stored values are from the point of view of self.me
+        if self.me != currentState.whoseTurn:
+            self.transpositions.clear()
+        self.me = currentState.whoseTurn
+        # rotate to the next move
+        self.move = self.nextMove
+        # set number of pruned nodes to zero
+        self.prunedMoves = 0
+        self.nodesExpanded = 0
+        self.maxDepth = 0
+        # carry on with the turn chosen by a macro move search, unless the
+        # game has gone differently than the search expected
+        if self.pendingMoves:
+            move = nextLegalMove(currentState, self.pendingMoves.pop(0))
+            if move is not None:
+                return move
+            self.pendingMoves = []
+        # if the list of moves is empty or move holds an enemy move, do minimax()
+        if self.move is None or self.move.minmax == -1:
+            self.transpositions.newSearch()
+            self.ordering.newSearch()
+            if self.moveTime is not None:
+                root = iterativeDeepening(self, lambda: self.newRoot(currentState), self.searchRoot, self.moveTime)
+            else:
+                root = self.searchRoot(self.newRoot(currentState))
+            # root has no move associated with it so automatically update self.move to minimax.nextMove
+            self.move = root.nextMove
+            # if minimax returns no moves, do an end move
+            if self.move is None:
+                self.nextMove = None  # done so the code at the start of getMove work
+                return Move(END, None, None)
+            elif self.move.move.moveType == MACRO:
+                # make the turn's moves one at a time
+                self.nextMove = None
+                self.pendingMoves = list(self.move.move.moves)
+                return self.pendingMoves.pop(0)
+            else:
+                self.nextMove = self.move.nextMove
+        else:
+            # so move is not None AND move is our move
+            self.nextMove = self.move.nextMove
+        # if you want the number of pruned moves to be printed, use the two lines below
+        #if self.prunedMoves != 0:
+        #    print("Pruned ", self.prunedMoves, " moves")
+        return self.move.move
+
+    ##
+    # newRoot
+    #
+    # the root node of a search from the given state
+    #
+    def newRoot(self, currentState):
+        return SearchNode(None, currentState, 1)
+
+    ##
+    # searchRoot
+    #
+    # searches from a root node to depth_limit, over several processes if
+    # searchProcesses is more than 1, and returns the root
+    #
+    def searchRoot(self, root):
+        if self.searchProcesses > 1:
+            return parallelSearch(self, root, self.searchProcesses)
+        return self.minimax(root, 0)
+
+    ##
+    # getSearchStats
+    #
+    # reports the size of the search done for the last move (see GameStats.py)
+    #
+    def getSearchStats(self):
+        return {"nodesExpanded": self.nodesExpanded, "nodesPruned": self.prunedMoves,
+                "maxDepth": self.maxDepth}
+
+    ##
+    # getSearchSettings
+    #
+    # what the worker processes of a parallel search need to search like this
+    # agent (see ParallelSearch.py)
+    #
+    def getSearchSettings(self):
+        return {"depth_limit": self.depth_limit, "macroMoves": self.macroMoves}
+
+    ##
+    # resetSearch
+    #
+    # forgets the last game's search (call from registerWin) so it does not
+    # interfere with the next game
+    #
+    def resetSearch(self):
+        self.move = None
+        self.nextMove = None
+        self.pendingMoves = []
+        self.transpositions.clear()
+        self.ordering.clear()
+
+    ##
+    # usesTranspositions
+    #
+    # whether the search looks states up in the transposition table (an agent
+    # whose evaluation is still changing can't reuse old values)
+    #
+    def usesTranspositions(self):
+        return True
+
+    ##
+    # leafBatchSize
+    #
+    # how many sibling leaves evaluateNodes is given at once; more than one
+    # only pays off when evaluating a batch is faster than one at a time
+    #
+    def leafBatchSize(self):
+        return 1
+
+    ##
+    # evaluateState
+    #
+    # Return: how good a state is for self.me, from -1.0 (lost) to 1.0 (won)
+    #
+    def evaluateState(self, currentState):
+        #method template, implemented by the agent
+        pass
+
+    ##
+    # expandNode
+    #
+    # This function takes a node (SearchNode) as input finds all the legal moves from that state
+    # and creates a list of new node with states resulting from each of those nodes and returns that list
+    # (with macroMoves set, one node per whole turn the player can make)
+    #
+    def expandNode(self, node):
+        if self.macroMoves:
+            return [node.child(macro, state)
+                    for macro, state in listMacroMoves(node.state, self.getNextStateAdversarial)]
+        moves = listAllLegalMoves(node.state, cache=self.moveCache)
+        states = []
+        for move in moves:
+            states.append(node.child(move, self.getNextStateAdversarial(node.state, move)))
+        return states
+
+    ##
+    # evalListNodes
+    #
+    # This function takes a list of nodes and takes the best node dependent on 
+    # the move being a min or max move. If a node has a "minmax" of 1 it is a max move,
+    # if a node has a "minmax" of -1 it is a min move.
+    #
+    def evalListNodes(self, nodes):
+        if nodes and len(nodes) > 1:
+            randomNode = nodes[0]
+            if randomNode.minmax == 1: 
+                bestNodeValue = -1
+                for node in nodes:
+                    if node.value >= bestNodeValue:
+                        bestNodeValue = node.value
+            elif randomNode.minmax == -1: 
+                bestNodeValue = 1
+                for node in nodes:
+                    if node.value <= bestNodeValue:
+                        bestNodeValue = node.value
+            return bestNodeValue
+        elif nodes:
+            return nodes[0].value
+        else:
+            return -1
+
+    ##
+    # minimax
+    #
+    # This function preforms minimax search
+    # It takes a node and the depth
+    # The nodes are expanded until the depth limit is reached
+    # Then the values of the nodes are propagated up based on being the best min or max move
+    # The method returns a node that contains a squence of moves (when depth == 0)
+    # This assumes both players are rational
+    # Alpha-beta pruning is used to make this process faster by pruning nodes that for certain
+    # do not hold better outcomes
+    #
+    # States reached through a different order of moves are looked up in the
+    # transposition table instead of being searched again.
+    #
+    def minimax(self, node, depth):
+        # the root is always searched since getMove needs its nextMove
+        if depth == 0 or not self.usesTranspositions():
+            return self.alphaBeta(node, depth)
+        key = stateHash(node.state)
+        remaining = self.depth_limit - depth
+        alpha = node.min
+        beta = node.max
+        value = self.transpositions.probe(key, remaining, alpha, beta)
+        if value is not None:
+            return value
+        value = self.alphaBeta(node, depth)
+        # the value only bounds the real one if the search was cut off
+        if value > beta or (node.minmax == -1 and value >= beta):
+            bound = LOWER_BOUND
+        elif value < alpha or (node.minmax == 1 and value <= alpha):
+            bound = UPPER_BOUND
+        else:
+            bound = EXACT
+        bestMove = None
+        if node.nextMove is not None:
+            bestMove = node.nextMove.move
+        self.transpositions.store(key, remaining, value, bound, bestMove)
+        return value
+
+    ##
+    # alphaBeta
+    #
+    # The search done by minimax for a single node
+    #
+    def alphaBeta(self, node, depth):
+        # stop if the time for the move has run out
+        checkDeadline(self)
+        newNodes = self.expandNode(node)
+        self.nodesExpanded += 1
+        self.maxDepth = max(self.maxDepth, depth + 1)
+        # likely good moves first (see MoveOrdering.py)
+        self.ordering.order(node.state, newNodes, depth)
+        # try the best move from an earlier search of this state first
+        self.orderNodes(node, newNodes)
+        # create pruning counter to see how many nodes get pruned
+        counter = 0
+        # it is depth + 1 since we just expanded the node and are
+        # now evaluating nodes at depth + 1
+        if depth+1 < self.depth_limit:
+            # if the next set of nodes are inside the depth limit,
+            for n in newNodes:
+                # increment pruning counter
+                counter += 1
+                # update the bounds of each newNode since a previous newNode could have updated node's bounds
+                n.min = node.min
+                n.max = node.max
+                # minimax updates the min and max bounds of the parent node, not the children
+                if node.minmax == 1:                   
+                    temp = node.min  # used so we don't do minimax() twice
+                    node.min = max(self.minimax(n, depth+1), node.min)
+                    n.state = None  # done with the child's subtree
+                    # if the value was updated, update nextMove to n
+                    if temp != node.min:
+                        node.nextMove = n
+                    # if the bounds cross each other, prune remaining nodes
+                    # if min bound equals 1, just return it
+                    if node.min > node.max or node.min == 1: 
+                        # updated global variable
+                        self.prunedMoves += len(newNodes) - counter
+                        self.ordering.recordCutoff(n.move, depth, self.depth_limit - depth)
+                        if depth == 0:
+                            return node
+                        else: 
+                            return node.min
+                else: # here the same happens for "minmax" == -1
+                    temp = node.max
+                    node.max = min(self.minimax(n, depth+1), node.max)
+                    n.state = None  # done with the child's subtree
+                    if temp != node.max:
+                        node.nextMove = n
+                    if node.min > node.max:
+                        self.prunedMoves += len(newNodes) - counter
+                        self.ordering.recordCutoff(n.move, depth, self.depth_limit - depth)
+                        if depth == 0:
+                            return node
+                        else:
+                            return node.max
+        else:
+            # the leaves are evaluated leafBatchSize() at a time as the loop
+            # gets to them, so few leaves past a cutoff are evaluated
+            batchSize = self.leafBatchSize()
+            values = []
+            # else find the best value for min/max
+            for i, n in enumerate(newNodes):
+                if i == len(values):
+                    values.extend(self.evaluateNodes(newNodes[i:i + batchSize]))
+                # increment pruning counter
+                counter += 1
+                if node.minmax == 1:
+                    temp = node.min
+                    node.min = max(values[i], node.min)
+                    n.state = None  # done with the child's subtree
+                    # if the bounds cross each other, prune remaining nodes
+                    if node.min > node.max:
+                        self.prunedMoves += len(newNodes) - counter
+                        self.ordering.recordCutoff(n.move, depth, self.depth_limit - depth)
+                        return node.min
+                    # if the value was updated, update nextMove to n
+                    if temp != node.min:
+                        node.nextMove = n
+                    if node.min == 1:
+                        return node.min
+                else: # here the same happens for "minmax" == -1
+                    temp = node.max
+                    node.max = min(values[i], node.max)
+                    n.state = None  # done with the child's subtree
+                    if node.min > node.max:
+                        self.prunedMoves += len(newNodes) - counter
+                        self.ordering.recordCutoff(n.move, depth, self.depth_limit - depth)
+                        return node.max
+                    # if the value was updated, update nextMove to n
+                    if temp != node.max:
+                        node.nextMove = n
+        # if we are not at depth 0 we return a value, otherwise we return a node
+        if depth > 0:
+            if node.minmax == 1:
+                return node.min
+            else:
+                return node.max
+        else:
+            # when we've finished minimax, return the root node with all the updated values
+            return node
+
+    ##
+    # evaluateNodes
+    #
+    # evaluates the states of a list of sibling leaf nodes, reusing the values
+    # from the transposition table of states seen before and handing the rest
+    # to evaluateStates together
+    #
+    # Return: the values, in the order of the nodes
+    #
+    def evaluateNodes(self, nodes):
+        values = []
+        missing = []
+        for i, n in enumerate(nodes):
+            key = stateHash(n.state)
+            value = self.transpositions.probe(key, 0, -1000, 1000)
+            if value is None:
+                missing.append((i, key))
+            values.append(value)
+        if missing:
+            outputs = self.evaluateStates([nodes[i].state for i, key in missing])
+            for (i, key), value in zip(missing, outputs):
+                self.transpositions.store(key, 0, value, EXACT)
+                values[i] = value
+        return values
+
+    ##
+    # evaluateStates
+    #
+    # Return: the evaluateState value of each of a list of states
+    #
+    def evaluateStates(self, states):
+        return [self.evaluateState(state) for state in states]
+
+    ##
+    # orderNodes
+    #
+    # moves the child whose move was the best one in an earlier search of
+    # the node's state (if any) to the front of the list
+    #
+    def orderNodes(self, node, newNodes):
+        entry = self.transpositions.lookup(stateHash(node.state))
+        if entry is None or entry.bestMove is None:
+            return
+        for i, n in enumerate(newNodes):
+            if moveKey(n.move) == entry.bestMove:
+                newNodes.insert(0, newNodes.pop(i))
+                return
+
+    ##
+    # getNextState
+    #
+    # Author:  Jordan Goldey (Class of 2017)
+    #
+    # Description: Creates a copy of the given state and modifies the inventories in
+    # it to reflect what they would look like after a given move.  For efficiency,
+    # only the inventories are modified and the board is set to None.  The original
+    # (given) state is not modified. It NOW correctly reflects how to food is picked
+    # up in the game
+    #
+    # CAVEAT: To facilitate longer term analysis without having to take enemy moves
+    # into consideration, MOVE_ANT commands do not cause the hasMoved property of
+    # the ant to change to True.  Furthermore the END move type is ignored.
+    #
+    # Parameters:
+    #   currentState - A clone of the current state (GameState)
+    #   move - The move that the agent would take (Move)
+    #
+    # Return: A clone of what the state would look like if the move was made
+    ##
+    def getNextState(self, currentState, move):
+        # variables I will need
+        myGameState = currentState.fastclone()
+        hashValue = stateHash(currentState)
+        myInv = getCurrPlayerInventory(myGameState)
+        me = myGameState.whoseTurn
+        myAnts = myInv.ants
+        myTunnels = myInv.getTunnels()
+        myAntHill = myInv.getAnthill()
+
+        # If enemy ant is on my anthill or tunnel update capture health
+        ant = getAntAt(myGameState, myAntHill.coords)
+        if ant is not None:
+            if ant.player != me:
+                hashValue ^= constrKey(myAntHill, me)
+                myAntHill.captureHealth -= 1
+                hashValue ^= constrKey(myAntHill, me)
+
+        # If an ant is built update list of ants
+        antTypes = [WORKER, DRONE, SOLDIER, R_SOLDIER]
+        if move.moveType == BUILD:
+            if move.buildType in antTypes:
+                ant = Ant(myInv.getAnthill().coords, move.buildType, me)
+                myInv.ants.append(ant)
+                hashValue ^= antKey(ant)
+                # Update food count depending on ant built
+                hashValue ^= foodKey(me, myInv.foodCount)
+                if move.buildType == WORKER:
+                    myInv.foodCount -= 1
+                elif move.buildType == DRONE or move.buildType == R_SOLDIER:
+                    myInv.foodCount -= 2
+                elif move.buildType == SOLDIER:
+                    myInv.foodCount -= 3
+                hashValue ^= foodKey(me, myInv.foodCount)
+            # ants are no longer allowed to build tunnels, so this is an error
+            elif move.buildType == TUNNEL:
+                print("Attempted tunnel build in getNextState()")
+                return currentState
+
+        # If an ant is moved update their coordinates and has moved
+        elif move.moveType == MOVE_ANT:
+            newCoord = move.coordList[-1]
+            startingCoord = move.coordList[0]
+            for ant in myAnts:
+                if ant.coords == startingCoord:
+                    hashValue ^= antKey(ant)
+                    ant.coords = newCoord
+                    ant.hasMoved = False
+                    hashValue ^= antKey(ant)
+                    # If an ant is carrying food and ends on the anthill or tunnel drop the food
+                    # THIS CODE IS NOT WHAT GAME.PY DOES
+                    # if ant.carrying and ant.coords == myInv.getAnthill().coords:
+                    #     myInv.foodCount += 1
+                    #     ant.carrying = False
+                    # for tunnels in myTunnels:
+                    #     if ant.carrying and (ant.coords == tunnels.coords):
+                    #         myInv.foodCount += 1
+                    #         ant.carrying = False
+                    # # If an ant doesn't have food and ends on the food grab food
+                    # if not ant.carrying and ant.type == WORKER:
+                    #     foods = getConstrList(myGameState, 2, [FOOD])
+                    #     for food in foods:
+                    #         if food.coords == ant.coords:
+                    #             ant.carrying = True
+                    # If my ant is close to an enemy ant attack it
+                    attackable = listAttackable(ant.coords, UNIT_STATS[ant.type][RANGE])
+                    for coord in attackable:
+                        foundAnt = getAntAt(myGameState, coord)
+                        if foundAnt is not None:  # If ant is adjacent my ant
+                            if foundAnt.player != me:  # if the ant is not me
+                                hashValue ^= antKey(foundAnt)
+                                foundAnt.health = foundAnt.health - UNIT_STATS[ant.type][ATTACK]  # attack
+                                # If an enemy is attacked and looses all its health remove it from the other players
+                                # inventory
+                                if foundAnt.health <= 0:
+                                    myGameState.inventories[1 - me].ants.remove(foundAnt)
+                                else:
+                                    hashValue ^= antKey(foundAnt)
+                                # If attacked an ant already don't attack any more
+                                break
+        myGameState.hashValue = hashValue
+        return myGameState
+
+    ##
+    # getNextStateAdversarial
+    #
+    # Description: This is the same as getNextState (above) except that it properly
+    # updates the hasMoved property on ants and the END move is processed correctly.
+    # It has been updated to reflect this description.
+    #
+    # Parameters:
+    #   currentState - A clone of the current state (GameState)
+    #   move - The move that the agent would take (Move)
+    #
+    # Return: A clone of what the state would look like if the move was made
+    ##
+    def getNextStateAdversarial(self, currentState, move):
+        # variables I will need
+        nextState = self.getNextState(currentState, move)
+        myInv = getCurrPlayerInventory(nextState)
+        myAnts = myInv.ants
+        hashValue = stateHash(nextState)
+
+        # If an ant is moved update their coordinates and has moved
+        if move.moveType == MOVE_ANT:
+            # startingCoord = move.coordList[0]
+            startingCoord = move.coordList[len(move.coordList) - 1]
+            for ant in myAnts:
+                if ant.coords == startingCoord:
+                    hashValue ^= antKey(ant)
+                    ant.hasMoved = True
+                    hashValue ^= antKey(ant)
+        elif move.moveType == END:
+            for ant in myAnts:
+                hashValue ^= antKey(ant)
+                ant.hasMoved = False
+                hashValue ^= antKey(ant)
+            nextState.whoseTurn = 1 - currentState.whoseTurn
+            hashValue ^= TURN_KEYS[currentState.whoseTurn] ^ TURN_KEYS[nextState.whoseTurn]
+        ## NEW STUFF
+        elif move.moveType == BUILD:
+            for ant in myAnts:
+                if ant.coords == myInv.getAnthill().coords:
+                    hashValue ^= antKey(ant)
+                    ant.hasMoved = True
+                    hashValue ^= antKey(ant)
+        if nextState is not currentState:
+            nextState.hashValue = hashValue
+        return nextState
+
@@ -0,0 +1,160 @@
+import random
+from Constants import *
+from Ant import UNIT_STATS
+from TranspositionTable import moveKey
+
+#
+# MoveOrdering.py
+#
+# Orders the children of a node before alpha-beta searches them (Max, Diego).
+# Alpha-beta prunes the most when the best move is searched first, so the
+# moves most likely to be good go first:
+#
+#   1. moves that put an ant in range of an enemy ant it can attack
+#   2. moves onto an enemy anthill or tunnel (capturing it)
+#   3. killer moves: moves that caused a cutoff at the same ply recently
+#   4. a worker going to food, or carrying food home
+#   5. every other move, by its history score (how much cutting off it has
+#      done anywhere in the tree, deeper searches counting more)
+#   6. END
+#
+# Moves that tie are left in random order so the agents still vary their
+# play.  The killer and history tables are kept from search to search (the
+# history is halved at each new search so old results fade).  The agent's
+# orderNodes still puts the transposition table's best move first after this.
+# Whole turns searched as single moves (see MacroMoves.py) are only ordered
+# by the killer and history tables.
+#
+# RandomOrdering is the old ordering (just a shuffle), for comparing how much
+# is pruned with and without this (see getSearchStats' nodesPruned).
+#
+
+#the tiers the moves are sorted into (higher first)
+ATTACK_TIER = 5
+CAPTURE_TIER = 4
+KILLER_TIER = 3
+FOOD_TIER = 2
+QUIET_TIER = 1
+END_TIER = 0
+
+#killer moves kept per ply
+KILLERS_PER_PLY = 2
+
+
+##
+#MoveOrdering
+#Description: Sorts a node's children, learning from the cutoffs reported
+#   by the search
+#
+#Variables:
+#   killers - {ply : [move keys]} the latest moves to cause a cutoff at each
+#       ply, most recent first
+#   history - {move key : score}
+##
+class MoveOrdering(object):
+
+    def __init__(self):
+        self.killers = {}
+        self.history = {}
+
+    ##
+    #order
+    #Description: Sorts a list of child nodes, best first
+    #
+    #Parameters:
+    #   state - the state the children's moves are made from
+    #   nodes - the children (SearchNodes)
+    #   ply - how deep in the search the parent is (0 for the root)
+    ##
+    def order(self, state, nodes, ply):
+        random.shuffle(nodes)
+        me = state.whoseTurn
+        myAnts = {}
+        for ant in state.inventories[me].ants:
+            myAnts[ant.coords] = ant
+        enemyCoords = [ant.coords for ant in state.inventories[1 - me].ants]
+        enemyBuildings = set(constr.coords for constr in state.inventories[1 - me].constrs)
+        myBuildings = set(constr.coords for constr in state.inventories[me].constrs)
+        foodCoords = set(constr.coords for constr in state.inventories[NEUTRAL].constrs if constr.type == FOOD)
+        killers = self.killers.get(ply, ())
+        history = self.history
+
+        def sortKey(node):
+            move = node.move
+            if move.moveType == END:
+                return (END_TIER, 0)
+            key = moveKey(move)
+            tier = QUIET_TIER
+            if move.moveType == MOVE_ANT:
+                end = move.coordList[-1]
+                ant = myAnts.get(move.coordList[0])
+                if ant is not None and UNIT_STATS[ant.type][ATTACK] > 0 and \
+                        any(abs(end[0] - x) + abs(end[1] - y) <= UNIT_STATS[ant.type][RANGE] for x, y in enemyCoords):
+                    tier = ATTACK_TIER
+                elif end in enemyBuildings:
+                    tier = CAPTURE_TIER
+                elif key in killers:
+                    tier = KILLER_TIER
+                elif ant is not None and ant.type == WORKER and \
+                        ((not ant.carrying and end in foodCoords) or (ant.carrying and end in myBuildings)):
+                    tier = FOOD_TIER
+            elif key in killers:
+                tier = KILLER_TIER
+            return (tier, history.get(key, 0))
+
+        nodes.sort(key=sortKey, reverse=True)
+
+    ##
+    #recordCutoff
+    #Description: Remembers a move that caused a cutoff
+    #
+    #Parameters:
+    #   move - the move
+    #   ply - how deep in the search the node it was made from is
+    #   remaining - how many plies were left to search below that node
+    ##
+    def recordCutoff(self, move, ply, remaining):
+        if move.moveType == END:
+            return
+        key = moveKey(move)
+        killers = self.killers.setdefault(ply, [])
+        if key in killers:
+            killers.remove(key)
+        killers.insert(0, key)
+        del killers[KILLERS_PER_PLY:]
+        self.history[key] = self.history.get(key, 0) + remaining * remaining
+
+    ##
+    #newSearch
+    #Description: Called before each search; halves the history scores
+    ##
+    def newSearch(self):
+        for key in list(self.history):
+            score = self.history[key] // 2
+            if score > 0:
+                self.history[key] = score
+            else:
+                del self.history[key]
+
+    def clear(self):
+        self.killers = {}
+        self.history = {}
+
+
+##
+#RandomOrdering
+#Description: Searches the children in random order
+##
+class RandomOrdering(object):
+
+    def order(self, state, nodes, ply):
+        random.shuffle(nodes)
+
+    def recordCutoff(self, move, ply, remaining):
+        pass
+
+    def newSearch(self):
+        pass
+
+    def clear(self):
+        pass
@@ -0,0 +1,357 @@
+import os, sys, json, random, argparse, importlib
+import multiprocessing
+from Constants import *
+from GameRecorder import loadRecords, GameReplay
+import NetworkWeights
+
+#
+# NetworkTrainer.py
+#
+# Trains the neural network of the Diego agent (AI/Diego_ripple19_apenesj20.py)
+# offline instead of during its searches.  Training pairs are made from the
+# states of recorded games (python Game.py ... --record FILE): the inputs are
+# what the agent's getStateInputs gives for the state and the target is its
+# evaluateState heuristic scaled to 0..1, the same value backPropagate trains
+# towards.  The network is then trained on them with mini-batch gradient
+# descent in numpy, shuffling every epoch and keeping part of the data back
+# to report the validation error.
+#
+#   python NetworkTrainer.py games.jsonl -o weights.json
+#   python NetworkTrainer.py games.jsonl --save-data pairs.npz -j 8
+#   python NetworkTrainer.py pairs.npz --epochs 200 -o AI/Diego_weights.bin
+#
+# Weights written to a .bin file are in the agent's binary weights format
+# (see NetworkWeights.py); writing AI/Diego_weights.bin replaces the weights
+# the agent plays with, and running agents pick them up after their current
+# game.  Other files get JSON holding inputWeights, outputWeights,
+# inputBiasWeights and outputBiasWeight, laid out like the agent's.
+#
+# numpy is needed to train.
+#
+
+#the module of the agent whose network is trained (in the AI folder)
+AGENT_MODULE = "Diego_ripple19_apenesj20"
+
+#the agent statePairs is run with in each process, see _recordPairs
+_agent = None
+
+#training defaults
+EPOCHS = 50
+BATCH_SIZE = 32
+LEARNING_RATE = 0.5
+VALIDATION = 0.1
+
+
+##
+# loadAgent
+#
+# Return: a new AIPlayer of AGENT_MODULE, loaded from the AI folder the way
+#         Game.loadAIs does
+#
+def loadAgent():
+    aiDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "AI")
+    if aiDir not in sys.path:
+        sys.path.insert(0, aiDir)
+    return importlib.import_module(AGENT_MODULE).AIPlayer(PLAYER_ONE)
+
+##
+# statePairs
+#
+# Return: ([inputs], [target]) for the given states, from each player's
+#         point of view
+#
+def statePairs(agent, states):
+    inputs = []
+    targets = []
+    for state in states:
+        for me in (PLAYER_ONE, PLAYER_TWO):
+            agent.me = me
+            inputs.append(agent.getStateInputs(state))
+            # backPropagate's target: evaluateState scaled from -1..1 to 0..1
+            targets.append((agent.evaluateState(state) + 1) / 2)
+    return inputs, targets
+
+##
+# _recordPairs
+#
+# Description: Makes the training pairs of one recorded game (in a worker
+#              process when building with -j)
+#
+# Parameters:
+#   task - (the recording, keep every this many play phase states)
+#
+def _recordPairs(task):
+    global _agent
+    record, every = task
+    if _agent is None:
+        _agent = loadAgent()
+    states = []
+    for eventCount, state in GameReplay(record).states():
+        if state.phase == PLAY_PHASE and eventCount % every == 0:
+            states.append(state)
+    return statePairs(_agent, states)
+
+##
+# buildDataset
+#
+# Parameters:
+#   paths - recording files (see GameRecorder.py)
+#   every - use every this many states of each game
+#   processes - worker processes to replay the games in
+#
+# Return: (inputs, targets) as numpy arrays
+#
+def buildDataset(paths, every = 1, processes = 1):
+    import numpy
+    tasks = [(record, every) for path in paths for record in loadRecords(path)]
+    if processes > 1:
+        pool = multiprocessing.get_context("spawn").Pool(processes)
+        try:
+            results = pool.map(_recordPairs, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_recordPairs(task) for task in tasks]
+    inputs = [pair for result in results for pair in result[0]]
+    targets = [target for result in results for target in result[1]]
+    inputs = numpy.array(inputs, dtype=float).reshape(len(targets), -1)
+    return inputs, numpy.array(targets, dtype=float)
+
+def saveDataset(path, inputs, targets):
+    import numpy
+    numpy.savez_compressed(path, inputs=inputs, targets=targets)
+
+def loadDataset(path):
+    import numpy
+    data = numpy.load(path)
+    return data["inputs"], data["targets"]
+
+
+##
+# NetworkTrainer
+# Description: The agent's network as numpy arrays, trained with mini-batch
+#   gradient descent on the squared error of its sigmoid output (the error
+#   backPropagate follows one pair at a time)
+#
+# Variables:
+#   hiddenWeights - NODES x INPUTS, row i holds hidden node i's input weights
+#   hiddenBiases - the hidden nodes' bias weights
+#   outputWeights - the hidden node to output weights
+#   outputBias - the output node's bias weight
+##
+class NetworkTrainer(object):
+
+    ##
+    # __init__
+    # Description: Starts from the weights of an agent (an AIPlayer, or a
+    #   dict in the format of toDict())
+    ##
+    def __init__(self, weights):
+        import numpy
+        self.numpy = numpy
+        if not isinstance(weights, dict):
+            weights = weightsOf(weights)
+        self.outputWeights = numpy.array(weights["outputWeights"], dtype=float)
+        nodes = len(self.outputWeights)
+        self.hiddenWeights = numpy.array(weights["inputWeights"], dtype=float).reshape(nodes, -1)
+        self.hiddenBiases = numpy.array(weights["inputBiasWeights"], dtype=float)
+        self.outputBias = float(weights["outputBiasWeight"])
+
+    ##
+    # forward
+    #
+    # Return: (hidden node values, outputs) for a matrix of inputs (a row each)
+    ##
+    def forward(self, inputs):
+        numpy = self.numpy
+        hidden = 1 / (1 + numpy.exp(-(inputs.dot(self.hiddenWeights.T) + self.hiddenBiases)))
+        outputs = 1 / (1 + numpy.exp(-(hidden.dot(self.outputWeights) + self.outputBias)))
+        return hidden, outputs
+
+    ##
+    # error
+    #
+    # Return: the mean squared error over a set of pairs
+    ##
+    def error(self, inputs, targets):
+        if len(targets) == 0:
+            return 0.0
+        return float(((targets - self.forward(inputs)[1]) ** 2).mean())
+
+    ##
+    # step
+    # Description: One gradient descent step on a batch of pairs, moving by
+    #   the batch's average of the updates backPropagate would make
+    ##
+    def step(self, inputs, targets, learningRate):
+        hidden, outputs = self.forward(inputs)
+        outputDeltas = outputs * (1 - outputs) * (targets - outputs)
+        hiddenDeltas = hidden * (1 - hidden) * self.numpy.outer(outputDeltas, self.outputWeights)
+        rate = learningRate / len(targets)
+        self.hiddenWeights += rate * hiddenDeltas.T.dot(inputs)
+        self.hiddenBiases += rate * hiddenDeltas.sum(axis=0)
+        self.outputWeights += rate * hidden.T.dot(outputDeltas)
+        self.outputBias += rate * float(outputDeltas.sum())
+
+    ##
+    # train
+    # Description: Trains on the pairs, keeping a fraction back for validation
+    #
+    # Parameters:
+    #   inputs, targets - the pairs (numpy arrays)
+    #   epochs - passes over the training pairs
+    #   batchSize - pairs per step
+    #   learningRate - size of the steps
+    #   validation - fraction of the pairs kept back
+    #   seed - seed of the split and the shuffling
+    #   report - called with (epoch, training error, validation error) after
+    #            each epoch, or None
+    #
+    # Return: [(training error, validation error)] for each epoch
+    ##
+    def train(self, inputs, targets, epochs = EPOCHS, batchSize = BATCH_SIZE,
+              learningRate = LEARNING_RATE, validation = VALIDATION, seed = None, report = None):
+        rnd = self.numpy.random.RandomState(seed)
+        order = rnd.permutation(len(targets))
+        held = int(len(targets) * validation)
+        validInputs, validTargets = inputs[order[:held]], targets[order[:held]]
+        trainInputs, trainTargets = inputs[order[held:]], targets[order[held:]]
+
+        history = []
+        for epoch in range(epochs):
+            order = rnd.permutation(len(trainTargets))
+            for start in range(0, len(order), batchSize):
+                batch = order[start:start + batchSize]
+                self.step(trainInputs[batch], trainTargets[batch], learningRate)
+            errors = (self.error(trainInputs, trainTargets), self.error(validInputs, validTargets))
+            history.append(errors)
+            if report is not None:
+                report(epoch + 1, errors[0], errors[1])
+        return history
+
+    ##
+    # toDict
+    #
+    # Return: the weights as lists named and laid out like the agent's
+    ##
+    def toDict(self):
+        return {"inputWeights": self.hiddenWeights.reshape(-1).tolist(),
+                "outputWeights": self.outputWeights.tolist(),
+                "inputBiasWeights": self.hiddenBiases.tolist(),
+                "outputBiasWeight": self.outputBias}
+
+
+##
+# weightsOf
+#
+# Return: an agent's network weights as a dict in the format of
+#         NetworkTrainer.toDict
+#
+def weightsOf(agent):
+    return {"inputWeights": list(agent.inputWeights), "outputWeights": list(agent.outputWeights),
+            "inputBiasWeights": list(agent.inputBiasWeights), "outputBiasWeight": agent.outputBiasWeight}
+
+##
+# setWeights
+# Description: Gives an agent the weights in a dict from NetworkTrainer.toDict
+#
+def setWeights(agent, weights):
+    agent.inputWeights = list(weights["inputWeights"])
+    agent.outputWeights = list(weights["outputWeights"])
+    agent.inputBiasWeights = list(weights["inputBiasWeights"])
+    agent.outputBiasWeight = weights["outputBiasWeight"]
+    agent.weightArrays = None
+
+##
+# writeWeights / readWeights
+#
+# save and load weights in the format of NetworkTrainer.toDict: the agent's
+# binary weights file (see NetworkWeights.py) if the path ends in .bin, JSON
+# otherwise
+#
+def writeWeights(path, weights):
+    if path.lower().endswith(".bin"):
+        NetworkWeights.writeWeights(path, weights)
+        return
+    with open(path, "w") as f:
+        json.dump(weights, f, indent=2)
+
+def readWeights(path):
+    if path.lower().endswith(".bin"):
+        return NetworkWeights.readWeights(path)
+    with open(path) as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the Diego agent\'s network on recorded games')
+    parser.add_argument('data', metavar='FILE', nargs='+',
+                        help='recorded games (see GameRecorder.py) or pairs saved with --save-data (.npz)')
+    parser.add_argument('-o', '--output', metavar='FILE', default=None,
+                        help='write the trained weights to FILE (binary if it ends in .bin, JSON otherwise)')
+    parser.add_argument('--save-data', metavar='FILE', default=None,
+                        help='save the training pairs to FILE (.npz) to train on later')
+    parser.add_argument('--every', type=int, default=1,
+                        help='use every EVERY-th state of each recorded game (default %(default)s)')
+    parser.add_argument('-j', '--processes', type=int, default=1,
+                        help='worker processes to replay the recorded games in (default %(default)s)')
+    parser.add_argument('--start', metavar='FILE', default=None,
+                        help='start from these weights (.bin or JSON) instead of the agent\'s final ones')
+    parser.add_argument('--random', action='store_true', default=False,
+                        help='start from random weights instead of the agent\'s final ones')
+    parser.add_argument('--epochs', type=int, default=EPOCHS, help='(default %(default)s)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='(default %(default)s)')
+    parser.add_argument('--learning-rate', type=float, default=LEARNING_RATE, help='(default %(default)s)')
+    parser.add_argument('--validation', type=float, default=VALIDATION,
+                        help='fraction of the pairs kept back for validation (default %(default)s)')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the weights, split and shuffling')
+    args = parser.parse_args()
+
+    try:
+        import numpy
+    except ImportError:
+        print("NetworkTrainer needs numpy")
+        return 1
+
+    inputs, targets = [], []
+    recordings = [path for path in args.data if not path.endswith(".npz")]
+    for path in args.data:
+        if path.endswith(".npz"):
+            pairs = loadDataset(path)
+            inputs.append(pairs[0])
+            targets.append(pairs[1])
+    if recordings:
+        pairs = buildDataset(recordings, args.every, args.processes)
+        inputs.append(pairs[0])
+        targets.append(pairs[1])
+    inputs = numpy.concatenate(inputs)
+    targets = numpy.concatenate(targets)
+    print("%d training pairs" % len(targets))
+    if args.save_data is not None:
+        saveDataset(args.save_data, inputs, targets)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    agent = loadAgent()
+    if args.start is not None:
+        setWeights(agent, readWeights(args.start))
+    elif args.random:
+        agent.initializeNetwork()
+    else:
+        agent.initializeFinalNetwork()
+
+    trainer = NetworkTrainer(agent)
+    def report(epoch, trainError, validError):
+        print("epoch %4d  training error %.6f  validation error %.6f" % (epoch, trainError, validError))
+    if args.epochs > 0:
+        trainer.train(inputs, targets, args.epochs, args.batch_size, args.learning_rate,
+                      args.validation, args.seed, report)
+
+    weights = trainer.toDict()
+    if args.output is not None:
+        writeWeights(args.output, weights)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
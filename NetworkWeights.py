@@ -0,0 +1,82 @@
+import os, sys, mmap, struct
+from array import array
+
+#
+# NetworkWeights.py
+#
+# A binary file format for the weights of a one hidden layer network like
+# the Diego agent's, so that learned weights live in a data file (written by
+# NetworkTrainer.py) instead of as literals in the agent's source.
+#
+# The file is a 16 byte header, magic, version, number of inputs and number
+# of hidden nodes (little-endian):
+#
+#   b"ANNW", version (4 bytes), inputs (4 bytes), nodes (4 bytes)
+#
+# followed by little-endian doubles: the nodes * inputs input weights (all of
+# hidden node 0's first), the nodes hidden node biases, the nodes output
+# weights and the output bias.
+#
+# readWeights memory-maps the file read-only, so every process that loads it
+# (e.g., the workers of a tournament) shares the same pages, and hands out
+# views of it instead of copies.
+#
+
+WEIGHTS_MAGIC = b"ANNW"
+WEIGHTS_VERSION = 1
+
+_HEADER = struct.Struct("<4sIII")
+
+
+##
+# writeWeights
+#
+# Parameters:
+#   path - the file to write
+#   weights - a dict of the inputWeights, inputBiasWeights, outputWeights
+#             and outputBiasWeight of the network (lists and a number)
+#
+def writeWeights(path, weights):
+    nodes = len(weights["outputWeights"])
+    inputs = len(weights["inputWeights"]) // nodes
+    values = array("d", list(weights["inputWeights"]) + list(weights["inputBiasWeights"]) +
+                   list(weights["outputWeights"]) + [weights["outputBiasWeight"]])
+    if sys.byteorder != "little":
+        values.byteswap()
+    # written to a new file and moved into place so that a running agent
+    # reloading the weights never sees half a file
+    tempPath = path + ".tmp"
+    with open(tempPath, "wb") as f:
+        f.write(_HEADER.pack(WEIGHTS_MAGIC, WEIGHTS_VERSION, inputs, nodes))
+        f.write(values.tobytes())
+    os.replace(tempPath, path)
+
+##
+# readWeights
+#
+# Return: a dict of the weights in the file, in the format writeWeights
+#         takes.  The lists are read-only sequences backed by the mapped file
+#         (use list() on them to get ones that can be changed).
+#
+def readWeights(path):
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, inputs, nodes = _HEADER.unpack_from(mapped, 0)
+    if magic != WEIGHTS_MAGIC:
+        raise ValueError(path + " is not a network weights file")
+    if version != WEIGHTS_VERSION:
+        raise ValueError("unsupported network weights version: " + str(version))
+    count = nodes * inputs + 2 * nodes + 1
+    if len(mapped) != _HEADER.size + 8 * count:
+        raise ValueError(path + " has the wrong size for its network")
+
+    if sys.byteorder == "little":
+        values = memoryview(mapped)[_HEADER.size:].cast("d")
+    else:
+        values = array("d", mapped[_HEADER.size:])
+        values.byteswap()
+    start = nodes * inputs
+    return {"inputWeights": values[:start],
+            "inputBiasWeights": values[start:start + nodes],
+            "outputWeights": values[start + nodes:start + 2 * nodes],
+            "outputBiasWeight": values[start + 2 * nodes]}
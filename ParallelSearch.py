@@ -0,0 +1,282 @@
+import os, sys, random, importlib, unittest
+import multiprocessing
+from Constants import *
+from SearchNode import SearchNode
+
+#
+# ParallelSearch.py
+#
+# Splits the minimax search of an agent (Max, Diego) over worker processes at
+# the root: the root is expanded here and each of its children is searched
+# by a worker holding its own copy of the agent, with its own transposition
+# table.  The best value found so far (the root's alpha) is shared through a
+# multiprocessing.Value, so a child searched after a good move has been found
+# is searched with the tighter bound, and once a win is found the children
+# not yet started are skipped.
+#
+# A child's value counts only if it is above the alpha it was searched with;
+# otherwise it is just a bound.  The move chosen is the first child (in the
+# agent's order) with the best value, as in the sequential search: the index
+# of the child that set alpha is shared too, and a child before it is
+# searched with alpha lowered by TIE_MARGIN, so that a tie still counts.
+#
+# The number of workers comes from the agent's searchProcesses (set with
+# python Game.py ... --search-processes N, default 1: no parallel search).
+# Workers can't be started from daemonic processes, so searches run inside
+# the -j tournament workers and --isolate AI processes stay sequential.
+#
+# An agent that supports this provides:
+#
+#   getSearchSettings() - a picklable dict of attributes to copy to the
+#                         workers' agents before searching, or None if the
+#                         search can't be split right now
+#   expandNode, ordering, orderNodes, minimax - see MinimaxAgent.py
+#
+
+#environment variable holding the default number of search processes
+SEARCH_PROCESSES_VARIABLE = "ANTICS_SEARCH_PROCESSES"
+
+_context = multiprocessing.get_context("spawn")
+
+#how far below alpha the children before the best one so far are searched
+TIE_MARGIN = 1e-9
+
+#{(module name, processes) : (Pool, shared alpha, index of the child that set
+#it, number of the current search)}
+_pools = {}
+
+#in a worker: the agent, the shared alpha and the index of the child that
+#set it, the number of the search the pool is doing now and of the last one
+#this worker took part in
+_agent = None
+_alpha = None
+_bestChild = None
+_currentSearch = None
+_searchId = None
+
+
+##
+# defaultProcesses
+#
+# Return: the number of search processes agents start with
+#
+def defaultProcesses():
+    try:
+        return max(1, int(os.environ.get(SEARCH_PROCESSES_VARIABLE, "1")))
+    except ValueError:
+        return 1
+
+##
+# setDefaultProcesses
+# Description: Sets the number of search processes for agents created from
+#              now on, in this process and the ones it starts
+#
+def setDefaultProcesses(processes):
+    os.environ[SEARCH_PROCESSES_VARIABLE] = str(processes)
+
+
+##
+# _initWorker
+#
+# Description: Loads the agent in a new worker process
+#
+def _initWorker(moduleName, alpha, bestChild, currentSearch):
+    global _agent, _alpha, _bestChild, _currentSearch
+    aiDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "AI")
+    if aiDir not in sys.path:
+        sys.path.insert(0, aiDir)
+    _agent = importlib.import_module(moduleName).AIPlayer(PLAYER_ONE)
+    _alpha = alpha
+    _bestChild = bestChild
+    _currentSearch = currentSearch
+
+##
+# _searchChild
+#
+# Description: Searches one child of the root in a worker
+#
+# Parameters:
+#   task - (search number, index of the child, the agent's settings, the
+#          player searching, the child's move, state and minmax, seed)
+#
+# Return: (index, value, alpha searched with, [(move, minmax)] of the child
+#          and the moves the search expects to follow it, nodes expanded,
+#          nodes pruned, deepest ply), or None if the child was skipped
+#
+def _searchChild(task):
+    global _searchId
+    searchId, index, settings, me, move, state, minmax, seed = task
+    agent = _agent
+    with _alpha.get_lock():
+        alpha = _alpha.value
+        bestChild = _bestChild.value
+    # a win has been found already by an earlier child, or the search was
+    # given up (it ran out of time, see IterativeDeepening.py)
+    if (alpha >= 1 and bestChild < index) or _currentSearch.value != searchId:
+        return None
+    # an earlier child that ties with the best one is still the one chosen
+    if index < bestChild:
+        alpha -= TIE_MARGIN
+
+    for name, value in settings.items():
+        setattr(agent, name, value)
+    # stored values are from the point of view of agent.me
+    if agent.me != me:
+        agent.transpositions.clear()
+    agent.me = me
+    if searchId != _searchId:
+        agent.transpositions.newSearch()
+        agent.ordering.newSearch()
+        _searchId = searchId
+    agent.prunedMoves = 0
+    agent.nodesExpanded = 0
+    agent.maxDepth = 0
+    random.seed(seed)
+
+    node = SearchNode(move, state, minmax, 1, alpha)
+    value = agent.minimax(node, 1)
+    with _alpha.get_lock():
+        if value > alpha and _currentSearch.value == searchId and \
+                (value > _alpha.value or (value == _alpha.value and index < _bestChild.value)):
+            _alpha.value = value
+            _bestChild.value = index
+
+    line = []
+    while node is not None:
+        line.append((node.move, node.minmax))
+        node = node.nextMove
+    return (index, value, alpha, line, agent.nodesExpanded, agent.prunedMoves, agent.maxDepth)
+
+##
+# _getPool
+#
+# Return: (Pool, shared alpha, index of the child that set it, number of
+#         the current search) for an agent module, started the first time
+#
+def _getPool(moduleName, processes):
+    if (moduleName, processes) not in _pools:
+        alpha = _context.Value("d", -1000.0)
+        bestChild = _context.Value("i", 0)
+        currentSearch = _context.Value("L", 0)
+        pool = _context.Pool(processes, _initWorker, (moduleName, alpha, bestChild, currentSearch))
+        _pools[(moduleName, processes)] = (pool, alpha, bestChild, currentSearch)
+    return _pools[(moduleName, processes)]
+
+##
+# closePools
+# Description: Stops every worker started by this process
+#
+def closePools():
+    for pool, alpha, bestChild, currentSearch in _pools.values():
+        pool.terminate()
+        pool.join()
+    _pools.clear()
+
+
+##
+# parallelSearch
+#
+# Description: Does agent.minimax(root, 0) with the root's children searched
+#              in parallel, counting the search in the agent's
+#              nodesExpanded, prunedMoves and maxDepth
+#
+# Parameters:
+#   agent - the agent searching
+#   root - the root node, as made by the agent's getMove
+#   processes - the number of worker processes
+#
+# Return: the root, with nextMove set to the chosen child (whose own
+#         nextMoves hold the moves expected to follow), or None there if
+#         there are no moves
+#
+def parallelSearch(agent, root, processes):
+    settings = agent.getSearchSettings()
+    if processes < 2 or settings is None or agent.depth_limit < 2 or \
+            multiprocessing.current_process().daemon:
+        return agent.minimax(root, 0)
+
+    children = agent.expandNode(root)
+    agent.nodesExpanded += 1
+    agent.maxDepth = max(agent.maxDepth, 1)
+    agent.ordering.order(root.state, children, 0)
+    agent.orderNodes(root, children)
+    if not children:
+        return root
+
+    pool, alpha, bestChild, currentSearch = _getPool(type(agent).__module__, processes)
+    searchId = random.getrandbits(32)
+    with alpha.get_lock():
+        alpha.value = root.min
+        bestChild.value = len(children)
+        currentSearch.value = searchId
+    # the workers stop when the agent's time is up too
+    settings["deadline"] = getattr(agent, "deadline", None)
+    tasks = [(searchId, i, settings, agent.me, n.move, n.state, n.minmax, random.getrandbits(32))
+             for i, n in enumerate(children)]
+
+    best = None
+    skipped = 0
+    try:
+        for result in pool.imap_unordered(_searchChild, tasks):
+            if result is None:
+                skipped += 1
+                continue
+            index, value, searchedAlpha, line, nodesExpanded, prunedMoves, maxDepth = result
+            agent.nodesExpanded += nodesExpanded
+            agent.prunedMoves += prunedMoves
+            agent.maxDepth = max(agent.maxDepth, maxDepth + 1)
+            # a value that didn't beat the bound it was searched with is only a bound
+            if value > searchedAlpha and value > root.min and \
+                    (best is None or value > best[1] or (value == best[1] and index < best[0])):
+                best = (index, value, line)
+    finally:
+        # tasks of this search still queued (if it ran out of time) are skipped
+        currentSearch.value = 0
+    agent.prunedMoves += skipped
+
+    if best is not None:
+        root.min = best[1]
+        # rebuild the chosen line of nodes for getMove
+        nextNode = None
+        for move, minmax in reversed(best[2]):
+            node = SearchNode(move, None, minmax, 1)
+            node.nextMove = nextNode
+            nextNode = node
+        root.nextMove = nextNode
+    return root
+
+
+##
+# test_parallelSearch
+#
+# python -m unittest ParallelSearch
+#
+class test_parallelSearch(unittest.TestCase):
+
+    def tearDown(self):
+        closePools()
+
+    def testSameMoveAsSequential(self):
+        from Benchmark import buildCorpus, BENCH_SEED
+        from TranspositionTable import moveKey
+        aiDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "AI")
+        if aiDir not in sys.path:
+            sys.path.insert(0, aiDir)
+        agent = importlib.import_module("Max_schutten19_apenesj20").AIPlayer(PLAYER_ONE)
+        for state in buildCorpus(games = 3, every = 20):
+            agent.me = state.whoseTurn
+            # the children of the root are shuffled before they are ordered
+            random.seed(BENCH_SEED)
+            agent.transpositions.clear()
+            agent.ordering.clear()
+            sequential = agent.minimax(SearchNode(None, state, 1), 0)
+            random.seed(BENCH_SEED)
+            agent.transpositions.clear()
+            agent.ordering.clear()
+            parallel = parallelSearch(agent, SearchNode(None, state, 1), 2)
+            self.assertEqual(parallel.min, sequential.min)
+            self.assertEqual(moveKey(parallel.nextMove.move), moveKey(sequential.nextMove.move))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -72,3 +72,14 @@ class Player(object):
     def registerWin(self, hasWon):
         #method templaste, not implemented
         pass
+
+    ##
+    #getSearchStats
+    #Description: Optional hook for agents that search.  Called by the game
+    #   after each getMove to collect statistics (see GameStats.py).
+    #
+    #Return: None, or a dict with any of "nodesExpanded", "nodesPruned" and
+    #   "maxDepth" describing the search done for the last move
+    ##
+    def getSearchStats(self):
+        return None
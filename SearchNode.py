@@ -0,0 +1,51 @@
+from Constants import *
+
+#
+# SearchNode.py
+#
+# The nodes of the Max and Diego agents' minimax searches.  A search makes
+# one per move it looks at, so they use __slots__ (a fraction of the memory
+# of a dict) and don't point back at their parent: once a node's value has
+# been passed up, only the chain of best moves (nextMove) is still
+# referenced, and the search drops the states of the children it is done
+# with, so a turn's tree doesn't stay in memory until the search ends.
+#
+
+
+##
+#SearchNode
+#Description: A state reached in a search and what the search found out
+#   about it
+#
+#Variables:
+#   move - the move that led here (None at the root)
+#   state - the GameState (None once the node has been searched)
+#   value - unused by the search, for evaluations that keep one
+#   min, max - the alpha and beta bounds
+#   depth - the ply of the node (0 at the root)
+#   minmax - 1 if the searching player moves here, -1 if the opponent does
+#   nextMove - the best child found, or None
+##
+class SearchNode(object):
+    __slots__ = ("move", "state", "value", "min", "max", "depth", "minmax", "nextMove")
+
+    def __init__(self, move, state, minmax, depth = 0, low = -1000, high = 1000):
+        self.move = move
+        self.state = state
+        self.value = 0
+        self.min = low
+        self.max = high
+        self.depth = depth
+        self.minmax = minmax
+        self.nextMove = None
+
+    ##
+    #child
+    #
+    #Return: the node reached from this one by a move (END, and a whole turn
+    #   made as one MACRO move, pass the turn to the other player), with this
+    #   node's bounds
+    ##
+    def child(self, move, state):
+        minmax = -self.minmax if move.moveType == END or move.moveType == MACRO else self.minmax
+        return SearchNode(move, state, minmax, self.depth + 1, self.min, self.max)
@@ -0,0 +1,355 @@
+import struct
+from Constants import *
+from Ant import Ant
+from Building import Building
+from Construction import Construction
+from Inventory import Inventory
+from Move import Move
+from GameState import GameState
+from BoardTables import ALL_COORDS, cellIndex
+from GameRecorder import RECORD_VERSION
+
+#
+# Serialization.py
+#
+# A compact binary encoding of GameStates, Moves and game recordings (see
+# GameRecorder.py), for replay logs, training data and sending states between
+# processes.  A mid-game state takes about 80-100 bytes, against several
+# kilobytes pickled.
+#
+# Every encoding starts with FORMAT_VERSION so that old data can be
+# recognized.  Coordinates are stored as one byte, their
+# BoardTables.cellIndex.
+#
+# State layout (all single bytes unless noted):
+#
+#   version, phase, whoseTurn, food of each player (signed),
+#   number of ants of each player, number of constructions in each of the
+#   three inventories, number of board only constructions,
+#   each ant:           cell, type | carrying << 3 | hasMoved << 4, health (signed)
+#   each construction:  cell, kind [, capture health (signed)]
+#
+# A construction's kind is its type + 4 (types are negative, see
+# Constants.py), plus BUILDING_FLAG for Buildings and HEALTH_FLAG when a
+# capture health follows.  Ants and constructions keep their inventory order
+# and belong to the player of the inventory they are in.  Board only
+# constructions are ones on the board but in no inventory (Game puts tunnels
+# built during play only on the board); each is followed by one more byte,
+# its player.
+#
+
+#version written at the start of every encoding
+FORMAT_VERSION = 1
+
+#flags in a construction's kind byte
+BUILDING_FLAG = 0x08
+HEALTH_FLAG = 0x10
+
+#stand-in for None in signed byte fields (buildType, seed flags...)
+NONE_BYTE = -128
+
+#coordinate count that stands for a Move whose coordList is None
+NO_COORD_LIST = 255
+
+#first bytes of files written by writeStates and writeRecords
+STATES_MAGIC = b"ANTS"
+RECORDS_MAGIC = b"ANTR"
+
+_HEADER = struct.Struct("<BBBbbBBBBBB")
+_ANT = struct.Struct("<BBb")
+_LENGTH = struct.Struct("<I")
+
+
+##
+# _cell
+#
+# Return: the cell number of on-board coordinates (raises ValueError otherwise)
+#
+def _cell(coords):
+    if coords is None or not (0 <= coords[0] < BOARD_LENGTH and 0 <= coords[1] < BOARD_LENGTH):
+        raise ValueError("can't encode coordinates " + str(coords))
+    return cellIndex(coords)
+
+##
+# _encodeConstr
+#
+# adds the encoding of a construction to out (a bytearray)
+#
+def _encodeConstr(out, constr):
+    kind = constr.type + 4
+    if type(constr) is Building:
+        kind |= BUILDING_FLAG
+        if constr.captureHealth is not None:
+            out += struct.pack("<BBb", _cell(constr.coords), kind | HEALTH_FLAG, constr.captureHealth)
+            return
+    out += struct.pack("<BB", _cell(constr.coords), kind)
+
+##
+# _decodeConstr
+#
+# Return: (the construction at offset in data, the offset after it)
+#
+def _decodeConstr(data, offset, player):
+    cell, kind = data[offset], data[offset + 1]
+    offset += 2
+    constrType = (kind & 0x07) - 4
+    coords = ALL_COORDS[cell]
+    if kind & BUILDING_FLAG:
+        constr = Building(coords, constrType, player)
+        if kind & HEALTH_FLAG:
+            constr.captureHealth = struct.unpack_from("<b", data, offset)[0]
+            offset += 1
+        else:
+            constr.captureHealth = None
+    else:
+        constr = Construction(coords, constrType)
+    return constr, offset
+
+
+##
+# encodeState
+#
+# Parameters:
+#   state - the GameState to encode (fastclone()d states, which have no
+#           board, are fine)
+#
+# Return: the encoding (bytes)
+#
+def encodeState(state):
+    inventories = state.inventories
+    # constructions that are on the board but in no inventory
+    boardOnly = []
+    if state.board is not None:
+        inInventory = set((constr.coords, constr.type) for inv in inventories for constr in inv.constrs)
+        for col in state.board:
+            for loc in col:
+                if loc.constr is not None and (loc.constr.coords, loc.constr.type) not in inInventory:
+                    boardOnly.append(loc.constr)
+
+    out = bytearray(_HEADER.pack(FORMAT_VERSION, state.phase, state.whoseTurn,
+                                 inventories[PLAYER_ONE].foodCount, inventories[PLAYER_TWO].foodCount,
+                                 len(inventories[PLAYER_ONE].ants), len(inventories[PLAYER_TWO].ants),
+                                 len(inventories[PLAYER_ONE].constrs), len(inventories[PLAYER_TWO].constrs),
+                                 len(inventories[NEUTRAL].constrs), len(boardOnly)))
+    for player in (PLAYER_ONE, PLAYER_TWO):
+        for ant in inventories[player].ants:
+            out += _ANT.pack(_cell(ant.coords), ant.type | (ant.carrying << 3) | (ant.hasMoved << 4), ant.health)
+    for inv in inventories:
+        for constr in inv.constrs:
+            _encodeConstr(out, constr)
+    for constr in boardOnly:
+        _encodeConstr(out, constr)
+        out.append(getattr(constr, "player", NEUTRAL))
+    return bytes(out)
+
+##
+# decodeState
+#
+# Parameters:
+#   data - bytes from encodeState
+#   withBoard - False to leave the board out (like fastclone()), which is
+#               faster
+#
+# Return: the GameState
+#
+def decodeState(data, withBoard = True):
+    return _decodeState(data, 0, withBoard)[0]
+
+##
+# _decodeState
+#
+# Return: (the GameState encoded at offset in data, the offset after it)
+#
+def _decodeState(data, offset, withBoard):
+    version, phase, whoseTurn, food1, food2, ants1, ants2, constrs1, constrs2, constrs3, boardOnly = \
+        _HEADER.unpack_from(data, offset)
+    if version != FORMAT_VERSION:
+        raise ValueError("unsupported state encoding version: " + str(version))
+    offset += _HEADER.size
+
+    antLists = ([], [])
+    for player, count in ((PLAYER_ONE, ants1), (PLAYER_TWO, ants2)):
+        for i in range(count):
+            cell, bits, health = _ANT.unpack_from(data, offset)
+            offset += _ANT.size
+            ant = Ant(ALL_COORDS[cell], bits & 0x07, player)
+            ant.carrying = bool(bits & 0x08)
+            ant.hasMoved = bool(bits & 0x10)
+            ant.health = health
+            antLists[player].append(ant)
+
+    constrLists = ([], [], [])
+    for player, count in ((PLAYER_ONE, constrs1), (PLAYER_TWO, constrs2), (NEUTRAL, constrs3)):
+        for i in range(count):
+            constr, offset = _decodeConstr(data, offset, player)
+            constrLists[player].append(constr)
+    extraConstrs = []
+    for i in range(boardOnly):
+        constr, offset = _decodeConstr(data, offset, NEUTRAL)
+        if type(constr) is Building:
+            constr.player = data[offset]
+        offset += 1
+        extraConstrs.append(constr)
+
+    inventories = [Inventory(PLAYER_ONE, antLists[PLAYER_ONE], constrLists[PLAYER_ONE], food1),
+                   Inventory(PLAYER_TWO, antLists[PLAYER_TWO], constrLists[PLAYER_TWO], food2),
+                   Inventory(NEUTRAL, [], constrLists[NEUTRAL], 0)]
+    board = None
+    if withBoard:
+        board = GameState.getBlankState().board
+        for constr in extraConstrs + constrLists[0] + constrLists[1] + constrLists[2]:
+            board[constr.coords[0]][constr.coords[1]].constr = constr
+        for ant in antLists[PLAYER_ONE] + antLists[PLAYER_TWO]:
+            board[ant.coords[0]][ant.coords[1]].ant = ant
+    return GameState(board, inventories, phase, whoseTurn), offset
+
+
+##
+# encodeMove
+#
+# Return: the encoding of a Move (bytes): version, moveType, buildType (both
+#         signed, NONE_BYTE for None), number of coordinates, cells
+#
+def encodeMove(move):
+    buildType = NONE_BYTE if move.buildType is None else move.buildType
+    if move.coordList is None:
+        return struct.pack("<BbbB", FORMAT_VERSION, move.moveType, buildType, NO_COORD_LIST)
+    return struct.pack("<BbbB", FORMAT_VERSION, move.moveType, buildType, len(move.coordList)) + \
+           bytes(_cell(coords) for coords in move.coordList)
+
+##
+# decodeMove
+#
+# Return: the Move encoded in data
+#
+def decodeMove(data):
+    version, moveType, buildType, count = struct.unpack_from("<BbbB", data, 0)
+    if version != FORMAT_VERSION:
+        raise ValueError("unsupported move encoding version: " + str(version))
+    if buildType == NONE_BYTE:
+        buildType = None
+    coordList = None
+    if count != NO_COORD_LIST:
+        coordList = [ALL_COORDS[cell] for cell in data[4:4 + count]]
+    return Move(moveType, coordList, buildType)
+
+
+##
+# encodeRecord
+#
+# Return: the encoding of a game recording from GameRecorder (bytes):
+#         version, has seed, seed (8 bytes, signed), winner (signed, -1 for
+#         None), the two authors (length then UTF-8), number of events
+#         (4 bytes), then each event as kind, number of values, values
+#         (signed; cells are below 100 so fit, and a MOVE's buildType None is
+#         NONE_BYTE)
+#
+def encodeRecord(record):
+    seed = record["seed"]
+    winner = record["winner"]
+    out = bytearray(struct.pack("<BBqb", FORMAT_VERSION, seed is not None,
+                                0 if seed is None else seed, -1 if winner is None else winner))
+    for author in record["players"]:
+        name = author.encode("utf-8")
+        out += struct.pack("<B", len(name)) + name
+    out += _LENGTH.pack(len(record["events"]))
+    for event in record["events"]:
+        values = [NONE_BYTE if value is None else value for value in event[1:]]
+        out += struct.pack("<BB%db" % len(values), event[0], len(values), *values)
+    return bytes(out)
+
+##
+# decodeRecord
+#
+# Return: the recording (a dict in the GameRecorder format) encoded in data
+#
+def decodeRecord(data):
+    return _decodeRecord(data, 0)[0]
+
+def _decodeRecord(data, offset):
+    version, hasSeed, seed, winner = struct.unpack_from("<BBqb", data, offset)
+    if version != FORMAT_VERSION:
+        raise ValueError("unsupported record encoding version: " + str(version))
+    offset += struct.calcsize("<BBqb")
+    players = []
+    for i in range(2):
+        length = data[offset]
+        players.append(bytes(data[offset + 1:offset + 1 + length]).decode("utf-8"))
+        offset += 1 + length
+    count = _LENGTH.unpack_from(data, offset)[0]
+    offset += _LENGTH.size
+    events = []
+    for i in range(count):
+        kind, length = data[offset], data[offset + 1]
+        values = [None if value == NONE_BYTE else value
+                  for value in struct.unpack_from("<%db" % length, data, offset + 2)]
+        offset += 2 + length
+        events.append([kind] + values)
+    record = {"v": RECORD_VERSION, "seed": seed if hasSeed else None, "players": players,
+              "events": events, "winner": None if winner == -1 else winner}
+    return record, offset
+
+
+##
+# _writeItems
+#
+# writes a magic string then each item's encoding preceded by its length
+#
+def _writeItems(path, magic, encodings):
+    with open(path, "wb") as f:
+        f.write(magic + bytes([FORMAT_VERSION]))
+        for encoding in encodings:
+            f.write(_LENGTH.pack(len(encoding)))
+            f.write(encoding)
+
+##
+# _readItems
+#
+# Return: the encodings in a file written by _writeItems
+#
+def _readItems(path, magic):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:len(magic)] != magic:
+        raise ValueError(path + " is not a file of this kind")
+    if data[len(magic)] != FORMAT_VERSION:
+        raise ValueError("unsupported file version: " + str(data[len(magic)]))
+    offset = len(magic) + 1
+    encodings = []
+    while offset < len(data):
+        length = _LENGTH.unpack_from(data, offset)[0]
+        offset += _LENGTH.size
+        encodings.append(data[offset:offset + length])
+        offset += length
+    return encodings
+
+##
+# writeStates / readStates
+#
+# save and load a list of GameStates (e.g., a training data set)
+#
+def writeStates(path, states):
+    _writeItems(path, STATES_MAGIC, [encodeState(state) for state in states])
+
+def readStates(path, withBoard = True):
+    return [decodeState(encoding, withBoard) for encoding in _readItems(path, STATES_MAGIC)]
+
+##
+# writeRecords / readRecords
+#
+# save and load a list of game recordings (see GameRecorder.py)
+#
+def writeRecords(path, records):
+    _writeItems(path, RECORDS_MAGIC, [encodeRecord(record) for record in records])
+
+def readRecords(path):
+    return [decodeRecord(encoding) for encoding in _readItems(path, RECORDS_MAGIC)]
+
+##
+# isRecordsFile
+#
+# Return: True if the file at path was written by writeRecords
+#
+def isRecordsFile(path):
+    with open(path, "rb") as f:
+        return f.read(len(RECORDS_MAGIC)) == RECORDS_MAGIC
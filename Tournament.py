@@ -0,0 +1,206 @@
+import multiprocessing
+import os
+import random
+import unittest
+
+#
+# Tournament.py
+#
+# Plays the games queued in a Game's gamesToPlay on a pool of worker
+# processes.  Games are independent of each other, so each one is sent to
+# whichever worker is free.  Every worker builds its own headless Game, which
+# loads its own AIPlayer instances from the AI folder (see Game.loadAIs), and
+# sends back only the names of the winner and loser, the game's GameStats
+# and (when games are recorded) its recording; these are added to the Game's
+# playerScores, stats and recorder here, in the parent process.  Seeded games
+# get the same seeds they would get when played one after another.
+#
+# Used by Game's headless mode (python Game.py --headless --RRall -n 100 -j 6).
+#
+
+#the headless Game owned by this worker process
+_game = None
+#copies of AIs made for self play in this worker process, by author
+_copies = {}
+
+##
+# _initWorker
+#
+# Description: Runs once in each worker process.  Creates the worker's Game
+#              (without a GUI or command line) with the parent Game's timeout
+#              and verbose settings, so its games are played under the same
+#              rules as games played one after another.  Unless the tournament
+#              is seeded the worker gets its own random numbers, since forked
+#              workers start with identical ones.
+#
+# Parameters:
+#   seed - the tournament's seed, or None
+#   timeoutOn - True if the AIs' answers are timed
+#   timeoutLimit - the time limit for each answer, in seconds
+#   verbose - True to print each game's moves and results
+#
+def _initWorker(seed, timeoutOn, timeoutLimit, verbose):
+    global _game
+    from Game import Game
+    random.seed(seed)
+    _game = Game(testing=True, commandLine=False)
+    _game.timeoutOn = timeoutOn
+    _game.timeout_limit = timeoutLimit
+    _game.verbose = verbose
+
+##
+# _findPlayer
+#
+# Return: the worker's AIPlayer with the given author.  Copies made for
+#         self play (authors ending in "@@") are created once per worker.
+#
+def _findPlayer(author):
+    for player in _game.players:
+        if player[0].author == author:
+            return player[0]
+    if author not in _copies:
+        _copies[author] = _game.createAICopy(author[:-2])
+    return _copies[author]
+
+##
+# _playGame
+#
+# Description: Plays one game in a worker process
+#
+# Parameters:
+#   task - (number of the game in the tournament, player one's author,
+#          player two's author, number of the game in its match, the game's
+#          seed or None, True to record the game)
+#
+# Return: (task, winner's author, loser's author, the game's GameStats, the
+#         game's recording or None)
+#
+def _playGame(task):
+    from Game import GameData
+    from GameStats import GameStats
+    from GameRecorder import GameRecorder
+    index, author1, author2, count, seed, record = task
+    p1 = _findPlayer(author1)
+    p2 = _findPlayer(author2)
+
+    _game.recorder = GameRecorder() if record else None
+    _game.setup(GameData(p1, p2, 1), count, seed)
+    _game.currentPlayerScores = [[author1, 0, 0], [author2, 0, 0]]
+    _game.stats = GameStats()
+    _game.runGame()
+    _game.errored = False
+
+    winner = p1 if _game.winner == p1.playerId else p2
+    loser = p2 if winner is p1 else p1
+    recording = _game.recorder.records[0] if record else None
+    return task, winner.author, loser.author, _game.stats, recording
+
+##
+# runTournament
+#
+# Description: Plays every game in game.gamesToPlay across a pool of worker
+#              processes and adds the results to game.playerScores,
+#              game.stats and game.recorder (and prints each match's scores in
+#              verbose mode).  The queue is left empty.
+#
+# Parameters:
+#   game - the (headless) Game whose queue should be played
+#   processes - the number of worker processes
+#
+def runTournament(game, processes):
+    tasks = []
+    matchScores = {}
+    while len(game.gamesToPlay) > 0:
+        match = game.gamesToPlay.pop(0)
+        pair = (match.p1.author, match.p2.author)
+        matchScores[pair] = [[game.truncateName(author, 24), 0, 0] for author in pair]
+        for count in range(match.n):
+            seed = None if game.seed is None else game.seed + game.gamesStarted
+            tasks.append((game.gamesStarted, pair[0], pair[1], count, seed, game.recorder is not None))
+            game.gamesStarted += 1
+
+    #index of each loaded AI in playerScores (copies have no entry)
+    scoreIndex = {}
+    for i in range(len(game.players)):
+        scoreIndex[game.players[i][0].author] = i
+
+    recordings = {}
+    pool = multiprocessing.Pool(processes, initializer=_initWorker, initargs=(game.seed, game.timeoutOn, game.timeout_limit, game.verbose))
+    try:
+        for task, winner, loser, stats, recording in pool.imap_unordered(_playGame, tasks):
+            game.stats.merge(stats)
+            recordings[task[0]] = recording
+            if winner in scoreIndex:
+                game.playerScores[scoreIndex[winner]][1] += 1
+            if loser in scoreIndex:
+                game.playerScores[scoreIndex[loser]][2] += 1
+
+            scores = matchScores[(task[1], task[2])]
+            scores[0 if winner == task[1] else 1][1] += 1
+            scores[0 if loser == task[1] else 1][2] += 1
+    except:
+        #don't leave workers playing games nobody will see
+        pool.terminate()
+        raise
+    pool.close()
+    pool.join()
+
+    # keep the recordings in the order the games were queued
+    if game.recorder is not None:
+        for index in sorted(recordings):
+            game.recorder.records.append(recordings[index])
+
+    if game.verbose:
+        for scores in matchScores.values():
+            game.currentPlayerScores = scores
+            print(game.tournamentStr(True), "\n")
+
+
+# python -m unittest Tournament
+# (from the folder of Game.py, which loads the AIs from the AI folder)
+
+#an AI that takes too long to place its constructions
+SLOW_AI = """from Random import AIPlayer as RandomPlayer
+import time
+
+class AIPlayer(RandomPlayer):
+    def __init__(self, inputPlayerId):
+        super(AIPlayer, self).__init__(inputPlayerId)
+        self.author = "SlowPlacement"
+
+    def getPlacement(self, currentState):
+        time.sleep(1)
+        return super(AIPlayer, self).getPlacement(currentState)
+"""
+
+class test_tournament(unittest.TestCase):
+
+    def testWorkersTimeOut(self):
+        from Game import Game, GameData
+        from GameRecorder import GameRecorder
+        path = os.path.join("AI", "ZzSlowPlacement.py")
+        with open(path, "w") as f:
+            f.write(SLOW_AI)
+        #the workers load the AIs too, so the file stays until they are done
+        try:
+            game = Game(testing=True, commandLine=False)
+            players = dict((player[0].author, player[0]) for player in game.players)
+            game.timeoutOn = True
+            game.timeout_limit = 0.25
+            game.recorder = GameRecorder()
+            game.gamesToPlay = [GameData(players["SlowPlacement"], players["Random"], 2)]
+
+            runTournament(game, 2)
+        finally:
+            os.remove(path)
+
+        scores = dict((score[0], score[1:]) for score in game.playerScores)
+        self.assertEqual(scores["SlowPlacement"], [0, 2])
+        self.assertEqual(scores["Random"], [2, 0])
+        #the games end at the slow AI's first placement
+        for record in game.recorder.records:
+            self.assertEqual(record["events"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+#
+# TranspositionTable.py
+#
+# A fixed size table of search results keyed by Zobrist hash (see Zobrist.py)
+# so that a search can recognize a state it has already searched, e.g., after
+# moving ant A then ant B instead of B then A.
+#
+# Each entry records the value found for a state, what kind of bound that
+# value is (alpha-beta only finds an exact value when no cutoff happened),
+# the number of plies that were searched below the state and the best move
+# found there.
+#
+
+#kinds of values stored in an entry
+EXACT = 0        #the value is the minimax value of the state
+LOWER_BOUND = 1  #the search failed high; the real value is at least this
+UPPER_BOUND = 2  #the search failed low; the real value is at most this
+
+
+##
+#TTEntry
+#Description: One search result stored in a TranspositionTable
+#
+#Variables:
+#   key - the full hash of the state (to detect slot collisions)
+#   depth - the number of plies searched below the state
+#   value - the value found for the state
+#   bound - EXACT, LOWER_BOUND or UPPER_BOUND
+#   bestMove - the best move found as a (moveType, coordList, buildType) tuple,
+#       or None
+#   generation - the search that stored the entry
+##
+class TTEntry(object):
+    __slots__ = ("key", "depth", "value", "bound", "bestMove", "generation")
+
+    def __init__(self, key, depth, value, bound, bestMove, generation):
+        self.key = key
+        self.depth = depth
+        self.value = value
+        self.bound = bound
+        self.bestMove = bestMove
+        self.generation = generation
+
+
+##
+#TranspositionTable
+#Description: A hash table of TTEntry with one entry per slot.  When two
+#   states map to the same slot the one searched deeper is kept (depth
+#   preferred replacement), except that entries left over from an earlier
+#   search (see newSearch) are always replaced.
+#
+#Variables:
+#   size - the number of slots
+#   hits - lookups that found an entry for the state
+#   misses - lookups that did not
+#   stores - entries written
+##
+class TranspositionTable(object):
+
+    ##
+    #__init__
+    #Description: Creates an empty table
+    #
+    #Parameters:
+    #   size - the number of slots (int)
+    ##
+    def __init__(self, size = 1 << 16):
+        self.size = size
+        self.slots = [None] * size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    ##
+    #newSearch
+    #Description: Marks the start of a new search.  Entries from earlier
+    #   searches are still returned by lookup but no longer protected from
+    #   replacement.
+    ##
+    def newSearch(self):
+        self.generation += 1
+
+    ##
+    #lookup
+    #
+    #Return: the TTEntry stored for the given hash, or None
+    ##
+    def lookup(self, key):
+        entry = self.slots[key % self.size]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    ##
+    #probe
+    #Description: Looks for a stored value that can stand in for searching
+    #   the state depth plies deep with the window (alpha, beta)
+    #
+    #Return: the stored value, or None if the state must be searched
+    ##
+    def probe(self, key, depth, alpha, beta):
+        entry = self.lookup(key)
+        if entry is None or entry.depth < depth:
+            return None
+        if entry.bound == EXACT:
+            return entry.value
+        if entry.bound == LOWER_BOUND and entry.value > beta:
+            return entry.value
+        if entry.bound == UPPER_BOUND and entry.value < alpha:
+            return entry.value
+        return None
+
+    ##
+    #store
+    #Description: Records a search result unless its slot holds a deeper
+    #   result from the current search
+    #
+    #Parameters:
+    #   key - the hash of the state (int)
+    #   depth - plies searched below the state (int)
+    #   value - the value found (number)
+    #   bound - EXACT, LOWER_BOUND or UPPER_BOUND
+    #   bestMove - the best Move found, or None
+    ##
+    def store(self, key, depth, value, bound, bestMove = None):
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is not None and entry.key != key and \
+                entry.generation == self.generation and entry.depth > depth:
+            return
+        if bestMove is not None:
+            bestMove = moveKey(bestMove)
+        elif entry is not None and entry.key == key:
+            #keep the move from a previous search of the same state
+            bestMove = entry.bestMove
+        self.slots[index] = TTEntry(key, depth, value, bound, bestMove, self.generation)
+        self.stores += 1
+
+    ##
+    #clear
+    #Description: Empties the table and resets the counters
+    ##
+    def clear(self):
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def __len__(self):
+        return self.size - self.slots.count(None)
+
+    def __str__(self):
+        return "<TranspositionTable: %d/%d entries, %d hits, %d misses>" % \
+               (len(self), self.size, self.hits, self.misses)
+
+
+##
+#moveKey
+#
+#Return: a hashable tuple that identifies a Move
+##
+def moveKey(move):
+    coordList = None if move.coordList is None else tuple(move.coordList)
+    return (move.moveType, coordList, move.buildType)
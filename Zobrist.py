@@ -0,0 +1,188 @@
+from Constants import *
+from Building import Building
+from BoardTables import NUM_CELLS, cellIndex
+
+#
+# Zobrist.py
+#
+# Zobrist hashing for GameStates.  Every (feature, cell) pair -- an ant of a
+# given type and owner, its health, whether it is carrying food or has moved,
+# a construction and its capture health -- has a fixed 64-bit key, and the
+# hash of a state is the XOR of the keys of everything in it.  Two states
+# with the same ants, constructions, food, phase and turn get the same hash
+# no matter which order of moves produced them, and a move only changes the
+# keys of the cells it touches so the hash can be updated incrementally.
+#
+# The keys are derived from their feature with a fixed mixing function
+# instead of a random number generator so that every process (e.g., parallel
+# tournament or search workers) computes identical hashes.
+#
+
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+#feature categories used to derive the keys
+_ANT = 1
+_ANT_HEALTH = 2
+_CARRYING = 3
+_MOVED = 4
+_CONSTR = 5
+_CAPTURE_HEALTH = 6
+_FOOD = 7
+_TURN = 8
+_PHASE = 9
+
+##
+# _mix
+#
+# the splitmix64 finalizer; spreads the bits of a small integer over all
+# 64 bits of the result
+#
+def _mix(value):
+    value = (value + 0x9E3779B97F4A7C15) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+##
+# zobristKey
+#
+# returns the key of a feature.  Each part must be a small integer (between
+# -512 and 511).
+#
+def zobristKey(*parts):
+    value = 0
+    for part in parts:
+        value = (value << 10) | ((part + 512) & 0x3FF)
+    return _mix(value)
+
+
+#Precomputed keys for the common cases
+#ANT_KEYS[player][antType][cell]
+ANT_KEYS = [[[zobristKey(_ANT, player, antType, cell) for cell in range(NUM_CELLS)]
+             for antType in range(R_SOLDIER + 1)]
+            for player in (PLAYER_ONE, PLAYER_TWO)]
+#CARRYING_KEYS[cell], MOVED_KEYS[cell]
+CARRYING_KEYS = [zobristKey(_CARRYING, cell) for cell in range(NUM_CELLS)]
+MOVED_KEYS = [zobristKey(_MOVED, cell) for cell in range(NUM_CELLS)]
+#CONSTR_KEYS[player][constrType][cell] (constrType is negative, see Constants.py)
+CONSTR_KEYS = [{constrType : [zobristKey(_CONSTR, player, constrType, cell)
+                              for cell in range(NUM_CELLS)]
+                for constrType in (ANTHILL, TUNNEL, GRASS, FOOD)}
+               for player in (PLAYER_ONE, PLAYER_TWO, NEUTRAL)]
+#TURN_KEYS[player]
+TURN_KEYS = [zobristKey(_TURN, player) for player in (PLAYER_ONE, PLAYER_TWO)]
+
+#Range of values with precomputed keys; anything outside is derived on demand
+_MAX_HEALTH = 16
+_MIN_CAPTURE_HEALTH = -8
+_MAX_CAPTURE_HEALTH = 8
+_MAX_FOOD = 32
+_ANT_HEALTH_KEYS = [[zobristKey(_ANT_HEALTH, cell, health) for health in range(_MAX_HEALTH)]
+                    for cell in range(NUM_CELLS)]
+_CAPTURE_HEALTH_KEYS = [[zobristKey(_CAPTURE_HEALTH, cell, health)
+                         for health in range(_MIN_CAPTURE_HEALTH, _MAX_CAPTURE_HEALTH)]
+                        for cell in range(NUM_CELLS)]
+_FOOD_KEYS = [[zobristKey(_FOOD, player, food) for food in range(_MAX_FOOD)]
+              for player in (PLAYER_ONE, PLAYER_TWO)]
+
+##
+# antHealthKey
+#
+# returns the key for an ant with the given health in the given cell
+#
+def antHealthKey(cell, health):
+    if 0 <= health < _MAX_HEALTH:
+        return _ANT_HEALTH_KEYS[cell][health]
+    return zobristKey(_ANT_HEALTH, cell, health)
+
+##
+# captureHealthKey
+#
+# returns the key for a building with the given capture health in the given
+# cell
+#
+def captureHealthKey(cell, captureHealth):
+    if _MIN_CAPTURE_HEALTH <= captureHealth < _MAX_CAPTURE_HEALTH:
+        return _CAPTURE_HEALTH_KEYS[cell][captureHealth - _MIN_CAPTURE_HEALTH]
+    return zobristKey(_CAPTURE_HEALTH, cell, captureHealth)
+
+##
+# foodKey
+#
+# returns the key for a player holding the given amount of food
+#
+def foodKey(player, foodCount):
+    if 0 <= foodCount < _MAX_FOOD:
+        return _FOOD_KEYS[player][foodCount]
+    return zobristKey(_FOOD, player, foodCount)
+
+##
+# phaseKey
+#
+# returns the key for the given game phase
+#
+def phaseKey(phase):
+    return zobristKey(_PHASE, phase)
+
+
+##
+# antKey
+#
+# returns the combined key of every feature of a single ant
+#
+def antKey(ant):
+    cell = cellIndex(ant.coords)
+    key = ANT_KEYS[ant.player][ant.type][cell] ^ antHealthKey(cell, ant.health)
+    if ant.carrying:
+        key ^= CARRYING_KEYS[cell]
+    if ant.hasMoved:
+        key ^= MOVED_KEYS[cell]
+    return key
+
+##
+# constrKey
+#
+# returns the combined key of a construction owned by the given player
+# (NEUTRAL for grass and food)
+#
+def constrKey(constr, player):
+    cell = cellIndex(constr.coords)
+    key = CONSTR_KEYS[player][constr.type][cell]
+    if type(constr) is Building and constr.captureHealth is not None:
+        key ^= captureHealthKey(cell, constr.captureHealth)
+    return key
+
+
+##
+# hashState
+#
+# computes the Zobrist hash of a GameState from scratch.  Only the
+# inventories are read so this is safe for fastclone()d states.
+#
+# Parameters:
+#    state - the GameState to hash
+#
+# Return: the hash (a 64-bit integer)
+def hashState(state):
+    result = TURN_KEYS[state.whoseTurn] ^ phaseKey(state.phase)
+    for inv in state.inventories:
+        player = inv.player
+        for ant in inv.ants:
+            result ^= antKey(ant)
+        for constr in inv.constrs:
+            result ^= constrKey(constr, player)
+        if player != NEUTRAL:
+            result ^= foodKey(player, inv.foodCount)
+    return result
+
+##
+# stateHash
+#
+# returns the hash of a state, using the one kept up to date by
+# getNextState/getNextStateAdversarial when the state has it
+#
+def stateHash(state):
+    hashValue = getattr(state, 'hashValue', None)
+    if hashValue is None:
+        hashValue = hashState(state)
+    return hashValue